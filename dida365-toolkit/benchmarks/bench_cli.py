@@ -0,0 +1,196 @@
+# /// script
+# requires-python = ">=3.10"
+# ///
+"""dida365_cli 端到端基准：对本地 mock Open API（mock_server.py）运行代表性工作负载。
+
+测量项（每项取 --runs 次冷启动子进程的中位数）:
+    - cold_start: schema / --dry-run 等不联网调用的耗时
+    - commands:   各子命令的端到端耗时、子进程峰值 RSS、输出字节数
+                  （含 10 / 100 / 5000 任务项目的 get-project-data，json 与 ndjson）
+    - batch:      batch 子命令执行 N 条 create-task 的吞吐（条/秒）
+
+结果写为 JSON（含 git 提交与配置），可用 --compare 与另一次结果对比，比值 > 1 表示变慢/变大。
+
+用法:
+    uv run benchmarks/bench_cli.py --output bench.json
+    uv run benchmarks/bench_cli.py --latency-ms 30 --runs 10 --compare bench-main.json
+
+CLI 在子进程中以当前解释器运行，需已安装 httpx（uv run scripts/dida365_cli.py 时由 uv 自动安装）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mock_server import add_config_args, config_from_args, start_server
+
+ROOT = Path(__file__).resolve().parent.parent
+CLI = ROOT / "scripts" / "dida365_cli.py"
+
+COLD_START = {
+    "schema": ["schema"],
+    "list-projects --dry-run": ["list-projects", "--dry-run"],
+    "create-task --dry-run": ["create-task", "--project", "p10", "--title", "t", "--dry-run"],
+}
+
+
+def _commands(sizes: tuple[int, ...]) -> dict[str, list[str]]:
+    cmds = {"list-projects": ["list-projects"], "get-project": ["get-project", f"p{sizes[0]}"]}
+    for size in sizes:
+        cmds[f"get-project-data p{size}"] = ["get-project-data", f"p{size}"]
+        cmds[f"get-project-data p{size} --format ndjson"] = [
+            "get-project-data", f"p{size}", "--format", "ndjson"]
+        cmds[f"get-project-data p{size} --fields tasks.id,tasks.title"] = [
+            "get-project-data", f"p{size}", "--fields", "tasks.id,tasks.title"]
+        cmds[f"get-project-data p{size} --compact"] = ["get-project-data", f"p{size}", "--compact"]
+    cmds.update({
+        "get-project-data --all": ["get-project-data", "--all"],
+        "filter-tasks": ["filter-tasks", "--priority", "5"],
+        "overdue-tasks": ["overdue-tasks", "--as-of", "2026-04-15"],
+        "stats (year, --source api)": ["stats", "--start-date", "2026-01-01", "--end-date", "2027-01-01",
+                                       "--as-of", "2026-04-15", "--source", "api"],
+        "query-completed (year, single)": ["query-completed", "--start-date", "2026-01-01",
+                                           "--end-date", "2026-12-31", "--window", "none"],
+        "query-completed (year, --window month)": ["query-completed", "--start-date", "2026-01-01",
+                                                   "--end-date", "2026-12-31", "--window", "month"],
+        "create-task": ["create-task", "--project", f"p{sizes[0]}", "--title", "基准任务"],
+        "complete-task": ["complete-task", f"p{sizes[0]}", f"p{sizes[0]}-t1"],
+    })
+    return cmds
+
+
+def _run(argv: list[str], env: dict, stdin: bytes | None = None) -> dict:
+    """运行一次 CLI 子进程，返回耗时、峰值 RSS（KB，不支持 wait4 的平台为 None）、输出字节数与退出码。"""
+    with tempfile.TemporaryFile() as out:
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, str(CLI), *argv], env=env,
+            stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+            stdout=out, stderr=subprocess.DEVNULL,
+        )
+        if stdin is not None:
+            proc.stdin.write(stdin)
+            proc.stdin.close()
+        rss_kb = None
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+        else:
+            proc.wait()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        out_bytes = out.seek(0, os.SEEK_END)
+    return {"ms": elapsed_ms, "rss_kb": rss_kb, "bytes": out_bytes, "exit_code": proc.returncode}
+
+
+def _measure(argv: list[str], env: dict, runs: int, stdin: bytes | None = None) -> dict:
+    samples = [_run(argv, env, stdin) for _ in range(runs)]
+    times = [s["ms"] for s in samples]
+    return {
+        "median_ms": round(statistics.median(times), 1),
+        "min_ms": round(min(times), 1),
+        "max_ms": round(max(times), 1),
+        "peak_rss_kb": max((s["rss_kb"] or 0) for s in samples) or None,
+        "output_bytes": samples[-1]["bytes"],
+        "exit_codes": sorted({s["exit_code"] for s in samples}),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(current: dict, baseline: dict) -> dict:
+    """按同名测量项计算 current / baseline 比值。"""
+    ratios: dict = {}
+    for section, metric in (("cold_start", "median_ms"), ("commands", "median_ms"),
+                            ("commands", "output_bytes"), ("commands", "peak_rss_kb")):
+        for name, result in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name, {}).get(metric)
+            if base and result.get(metric) is not None:
+                ratios.setdefault(section, {}).setdefault(name, {})[metric] = round(result[metric] / base, 3)
+    base_tp = baseline.get("batch", {}).get("ops_per_s")
+    if base_tp:
+        ratios["batch"] = {"ops_per_s": round(current["batch"]["ops_per_s"] / base_tp, 3)}
+    return ratios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="dida365_cli 端到端基准（本地 mock Open API）")
+    parser.add_argument("--runs", type=int, default=5, help="每个测量项的运行次数（默认 5）")
+    parser.add_argument("--batch-size", type=int, default=200, help="batch 吞吐测试的 create-task 条数")
+    parser.add_argument("--batch-concurrency", type=int, default=8, help="batch 的 --concurrency")
+    parser.add_argument("--output", help="结果 JSON 输出文件（默认只打印）")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比，输出比值")
+    add_config_args(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    server, domain = start_server(config)
+    cache_dir = tempfile.mkdtemp(prefix="dida365-bench-")
+    env = {
+        **os.environ,
+        "DIDA365_API_DOMAIN": domain,
+        "DIDA365_API_TOKEN": "bench-token",
+        "DIDA365_NO_DAEMON": "1",
+        "XDG_CACHE_HOME": cache_dir,
+    }
+    env.pop("DIDA365_CACHE_TTL", None)
+
+    try:
+        cold = {name: _measure(argv, env, args.runs) for name, argv in COLD_START.items()}
+        commands = {name: _measure(argv, env, args.runs)
+                    for name, argv in _commands(config.project_sizes).items()}
+        plan = "".join(
+            json.dumps({"command": "create-task", "args": {"project": f"p{config.project_sizes[0]}",
+                                                            "title": f"批量 {i}"}},
+                       ensure_ascii=False) + "\n"
+            for i in range(args.batch_size)
+        ).encode("utf-8")
+        batch_argv = ["batch", "--concurrency", str(args.batch_concurrency)]
+        batch = _measure(batch_argv, env, max(1, args.runs // 2), stdin=plan)
+        batch["ops"] = args.batch_size
+        batch["ops_per_s"] = round(args.batch_size / (batch["median_ms"] / 1000), 1)
+    finally:
+        server.shutdown()
+
+    report = {
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "config": {
+            "runs": args.runs,
+            "latency_ms": config.latency_ms,
+            "jitter_ms": config.jitter_ms,
+            "content_bytes": config.content_bytes,
+            "error_rate": config.error_rate,
+            "throttle_rate": config.throttle_rate,
+            "project_sizes": list(config.project_sizes),
+            "completed_tasks": config.completed_tasks,
+        },
+        "server": dict(config.stats),
+        "cold_start": cold,
+        "commands": commands,
+        "batch": batch,
+    }
+    if args.compare:
+        report["comparison"] = _compare(report, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
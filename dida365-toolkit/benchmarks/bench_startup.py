@@ -0,0 +1,125 @@
+# /// script
+# requires-python = ">=3.10"
+# ///
+"""dida365_cli 启动耗时基准。
+
+对不联网的调用（schema / --help / --dry-run）各冷启动若干次，报告中位数与最小值，
+并扣除同一解释器 `python -c pass` 的基线，得到 CLI 自身的启动开销。
+同时检查这些调用没有导入 httpx / asyncio / sqlite3。
+
+实现模块 dida365_core.py 的字节码缓存在 scripts/__pycache__ 中；计时前先预热一次，
+并忽略环境里的 PYTHONDONTWRITEBYTECODE，测的是缓存命中后的常态启动。
+
+用法:
+    uv run benchmarks/bench_startup.py
+    uv run benchmarks/bench_startup.py --runs 30 --target-ms 50 --output startup.json
+
+任一命令的开销中位数超过 --target-ms，或导入了重模块时退出码为 1。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+CLI = Path(__file__).resolve().parent.parent / "scripts" / "dida365_cli.py"
+
+CASES = {
+    "schema": ["schema"],
+    "schema <command>": ["schema", "create-task"],
+    "--help": ["--help"],
+    "list-projects --dry-run": ["list-projects", "--dry-run"],
+    "create-task --dry-run": ["create-task", "--project", "p", "--title", "t", "--dry-run"],
+}
+
+HEAVY_MODULES = ("httpx", "asyncio", "sqlite3")
+
+# 在 CLI 退出时把已导入的重模块写到 stderr 最后一行
+_PROBE = (
+    "import atexit, runpy, sys\n"
+    "atexit.register(lambda: sys.stderr.write('\\nLOADED=' + ','.join("
+    "m for m in {mods!r} if m in sys.modules) + '\\n'))\n"
+    "sys.argv = [{cli!r}] + {argv!r}\n"
+    "runpy.run_path({cli!r}, run_name='__main__')\n"
+)
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("DIDA365_API_TOKEN", "bench-token")
+    env["DIDA365_NO_DAEMON"] = "1"
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def _time_runs(argv: list[str], runs: int, env: dict) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _loaded_modules(argv: list[str], env: dict) -> list[str]:
+    code = _PROBE.format(mods=HEAVY_MODULES, cli=str(CLI), argv=argv)
+    proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    for line in reversed(proc.stderr.splitlines()):
+        if line.startswith("LOADED="):
+            return [m for m in line[len("LOADED="):].split(",") if m]
+    return []
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="dida365_cli 启动耗时基准")
+    parser.add_argument("--runs", type=int, default=15, help="每个命令的冷启动次数（默认 15）")
+    parser.add_argument("--target-ms", type=float, default=50.0,
+                        help="CLI 启动开销（扣除解释器基线）的中位数上限，默认 50")
+    parser.add_argument("--output", help="把结果 JSON 另存到该文件")
+    args = parser.parse_args()
+
+    env = _env()
+    baseline = _time_runs([sys.executable, "-c", "pass"], args.runs, env)
+    baseline_ms = statistics.median(baseline)
+
+    results = {}
+    ok = True
+    _time_runs([sys.executable, str(CLI), "--help"], 1, env)  # 预热：写入 dida365_core 的字节码缓存
+    for name, argv in CASES.items():
+        samples = _time_runs([sys.executable, str(CLI), *argv], args.runs, env)
+        median = statistics.median(samples)
+        loaded = _loaded_modules(argv, env)
+        overhead = median - baseline_ms
+        passed = overhead <= args.target_ms and not loaded
+        ok = ok and passed
+        results[name] = {
+            "median_ms": round(median, 1),
+            "min_ms": round(min(samples), 1),
+            "overhead_ms": round(overhead, 1),
+            "heavy_imports": loaded,
+            "pass": passed,
+        }
+
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "target_ms": args.target_ms,
+        "interpreter_baseline_ms": round(baseline_ms, 1),
+        "results": results,
+        "pass": ok,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
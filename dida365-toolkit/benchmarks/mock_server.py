@@ -0,0 +1,279 @@
+# /// script
+# requires-python = ">=3.10"
+# ///
+"""滴答清单 Open API 的本地替身（仅用于基准测试）。
+
+实现 dida365_cli 用到的 /open/v1 端点，数据在启动时按配置生成：收集箱与若干
+项目，每个项目的任务数由 --project-sizes 指定（默认 10/100/5000），另有 --completed-tasks
+条已完成任务均匀分布在 2026 全年（/task/completed 按 startDate/endDate 过滤）。可配置
+每个请求的延迟、任务内容大小与错误率（503 / 429 带 Retry-After）。
+
+用法:
+    uv run benchmarks/mock_server.py --port 8765 --latency-ms 30
+    DIDA365_API_DOMAIN=http://127.0.0.1:8765 DIDA365_API_TOKEN=x uv run scripts/dida365_cli.py list-projects
+
+也可在基准脚本中 import 后用 start_server() 在后台线程启动。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PROJECT_SIZES = (10, 100, 5000)
+DEFAULT_COMPLETED_TASKS = 2000
+_COMPLETED_YEAR_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    content_bytes: int = 64
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    project_sizes: tuple[int, ...] = DEFAULT_PROJECT_SIZES
+    completed_tasks: int = DEFAULT_COMPLETED_TASKS
+    seed: int = 42
+    stats: dict = field(default_factory=lambda: {"requests": 0, "errors": 0, "throttled": 0})
+
+
+def _make_task(project_id: str, n: int, content: str) -> dict:
+    day = 1 + n % 28
+    return {
+        "id": f"{project_id}-t{n}",
+        "projectId": project_id,
+        "title": f"任务 {n}",
+        "content": content,
+        "status": 0,
+        "priority": (0, 1, 3, 5)[n % 4],
+        "tags": ["工作"] if n % 3 == 0 else [],
+        "startDate": f"2026-04-{day:02d}T00:00:00.000+0000",
+        "dueDate": f"2026-04-{day:02d}T10:00:00.000+0000",
+        "modifiedTime": "2026-04-01T00:00:00.000+0000",
+        "sortOrder": -n,
+    }
+
+
+def _api_time(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000%z")
+
+
+def _parse_api_time(s: str) -> datetime:
+    s = s[:-2] + ":" + s[-2:] if s[-5] in "+-" else s
+    dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _make_completed(project_id: str, n: int, total: int, content: str) -> dict:
+    completed = _COMPLETED_YEAR_START + timedelta(seconds=n * (365 * 86400 // max(total, 1)))
+    return {**_make_task(project_id, n, content), "id": f"{project_id}-c{n}", "status": 2,
+            "completedTime": _api_time(completed)}
+
+
+class MockData:
+    """启动时生成的项目与任务；项目数据的响应体预先序列化，避免基准测到 mock 自身的编码耗时。"""
+
+    def __init__(self, config: MockConfig) -> None:
+        content = "x" * config.content_bytes
+        self.projects = [
+            {"id": f"p{size}", "name": f"项目-{size}", "kind": "TASK", "viewMode": "list"}
+            for size in config.project_sizes
+        ]
+        self.tasks: dict[str, list[dict]] = {"inbox": [_make_task("inbox", n, content) for n in range(10)]}
+        for project, size in zip(self.projects, config.project_sizes):
+            self.tasks[project["id"]] = [_make_task(project["id"], n, content) for n in range(size)]
+        pids = [p["id"] for p in self.projects] or ["inbox"]
+        self.completed = [
+            _make_completed(pids[n % len(pids)], n, config.completed_tasks, content)
+            for n in range(config.completed_tasks)
+        ]
+        self.completed_at = [_parse_api_time(t["completedTime"]) for t in self.completed]
+        self.project_data_bodies = {
+            pid: json.dumps({"project": self.project(pid), "tasks": tasks, "columns": []},
+                            ensure_ascii=False).encode("utf-8")
+            for pid, tasks in self.tasks.items()
+        }
+        self.lock = threading.Lock()
+
+    def project(self, project_id: str) -> dict | None:
+        if project_id == "inbox":
+            return {"id": "inbox", "name": "收集箱"}
+        return next((p for p in self.projects if p["id"] == project_id), None)
+
+    def find_task(self, project_id: str, task_id: str) -> dict | None:
+        return next((t for t in self.tasks.get(project_id, []) if t["id"] == task_id), None)
+
+    def completed_between(self, body: dict) -> list[dict]:
+        """按 startDate/endDate（含两端）与 projectIds 过滤已完成任务。"""
+        lo = _parse_api_time(body["startDate"]) if body.get("startDate") else None
+        hi = _parse_api_time(body["endDate"]) if body.get("endDate") else None
+        wanted = set(body.get("projectIds") or ())
+        return [
+            t for t, at in zip(self.completed, self.completed_at)
+            if (lo is None or at >= lo) and (hi is None or at <= hi)
+            and (not wanted or t["projectId"] in wanted)
+        ]
+
+
+_PROJECT_DATA = re.compile(r"^/open/v1/project/([^/]+)/data$")
+_PROJECT = re.compile(r"^/open/v1/project/([^/]+)$")
+_TASK_GET = re.compile(r"^/open/v1/project/([^/]+)/task/([^/]+)$")
+_TASK_COMPLETE = re.compile(r"^/open/v1/project/([^/]+)/task/([^/]+)/complete$")
+_TASK_UPDATE = re.compile(r"^/open/v1/task/([^/]+)$")
+
+
+def make_handler(config: MockConfig, data: MockData, rng: random.Random) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+        def _send_bytes(self, status: int, body: bytes, headers: dict | None = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send(self, status: int, obj: object) -> None:
+            self._send_bytes(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+        def _body(self) -> object:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            return json.loads(raw) if raw else None
+
+        def _pre(self) -> bool:
+            """模拟延迟与错误；返回 False 表示已发送错误响应。"""
+            with data.lock:
+                config.stats["requests"] += 1
+                roll = rng.random()
+                delay = config.latency_ms + rng.uniform(0, config.jitter_ms)
+            if delay:
+                time.sleep(delay / 1000)
+            if roll < config.throttle_rate:
+                with data.lock:
+                    config.stats["throttled"] += 1
+                self._send_bytes(429, b'{"errorCode":"rate_limit"}', {"Retry-After": "0"})
+                return False
+            if roll < config.throttle_rate + config.error_rate:
+                with data.lock:
+                    config.stats["errors"] += 1
+                self._send_bytes(503, b'{"errorCode":"unavailable"}', {"Retry-After": "0"})
+                return False
+            return True
+
+        def do_GET(self) -> None:
+            if not self._pre():
+                return
+            path = self.path
+            if path == "/open/v1/project":
+                return self._send(200, data.projects)
+            if m := _PROJECT_DATA.match(path):
+                body = data.project_data_bodies.get(m.group(1))
+                if body is None:
+                    return self._send(404, {"errorCode": "project_not_found"})
+                return self._send_bytes(200, body)
+            if m := _TASK_GET.match(path):
+                task = data.find_task(*m.groups())
+                return self._send(200, task) if task else self._send(404, {"errorCode": "task_not_found"})
+            if m := _PROJECT.match(path):
+                project = data.project(m.group(1))
+                return self._send(200, project) if project else self._send(404, {"errorCode": "project_not_found"})
+            self._send(404, {"errorCode": "not_found"})
+
+        def do_POST(self) -> None:
+            body = self._body()
+            if not self._pre():
+                return
+            path = self.path
+            if path == "/open/v1/task/filter":
+                wanted = set((body or {}).get("projectIds") or data.tasks)
+                return self._send(200, [t for pid in wanted for t in data.tasks.get(pid, [])][:500])
+            if path == "/open/v1/task/completed":
+                return self._send(200, data.completed_between(body or {}))
+            if path == "/open/v1/task/move":
+                return self._send(200, [{"id": op.get("taskId"), "etag": "e"} for op in body or []])
+            if path == "/open/v1/task":
+                return self._send(200, {"id": f"new-{time.monotonic_ns()}", "status": 0,
+                                        "modifiedTime": "2026-04-02T00:00:00.000+0000", **(body or {})})
+            if _TASK_COMPLETE.match(path):
+                return self._send_bytes(200, b"")
+            if m := _TASK_UPDATE.match(path):
+                return self._send(200, {"id": m.group(1), "modifiedTime": "2026-04-02T00:00:00.000+0000",
+                                        **(body or {})})
+            if path == "/open/v1/project":
+                return self._send(200, {"id": f"np-{time.monotonic_ns()}", **(body or {})})
+            if m := _PROJECT.match(path):
+                return self._send(200, {"id": m.group(1), **(body or {})})
+            self._send(404, {"errorCode": "not_found"})
+
+        def do_DELETE(self) -> None:
+            if not self._pre():
+                return
+            self._send_bytes(200, b"")
+
+    return Handler
+
+
+def start_server(config: MockConfig, port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """在后台线程启动 mock 服务，返回 (server, base_domain)；base_domain 可直接用作 DIDA365_API_DOMAIN。"""
+    data = MockData(config)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config, data, random.Random(config.seed)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def add_config_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="在固定延迟上叠加 0~N 毫秒的随机抖动")
+    parser.add_argument("--content-bytes", type=int, default=64, help="每个任务 content 字段的字节数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的请求比例（0~1）")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的请求比例（0~1）")
+    parser.add_argument("--project-sizes", default=",".join(map(str, DEFAULT_PROJECT_SIZES)),
+                        help="各项目的任务数，逗号分隔（默认 10,100,5000，项目 ID 为 p<任务数>）")
+    parser.add_argument("--completed-tasks", type=int, default=DEFAULT_COMPLETED_TASKS,
+                        help=f"2026 年内均匀分布的已完成任务数（默认 {DEFAULT_COMPLETED_TASKS}）")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        content_bytes=args.content_bytes,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        project_sizes=tuple(int(x) for x in args.project_sizes.split(",") if x.strip()),
+        completed_tasks=args.completed_tasks,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="滴答清单 Open API 本地 mock 服务")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口（默认 8765）")
+    add_config_args(parser)
+    args = parser.parse_args()
+    server, domain = start_server(config_from_args(args), args.port)
+    print(json.dumps({"domain": domain}, ensure_ascii=False), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3829 @@
+"""dida365_cli 的实现模块。
+
+入口脚本 dida365_cli.py 只负责导入本模块并调用 main()：作为被导入的模块，
+本文件的字节码会缓存在 __pycache__ 中，每次启动不必重新编译全部源码
+（直接运行的 __main__ 脚本不会被缓存）。命令行用法见 dida365_cli.py。
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextvars
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext, redirect_stderr
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+
+
+class _LazyModule:
+    """首次访问属性时才导入的模块代理，导入后替换同名全局变量，之后访问无额外开销。
+
+    schema / --help / --dry-run 等不联网的调用因此不必承担 httpx、asyncio、sqlite3 的导入耗时。
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __getattr__(self, attr: str) -> object:
+        module = importlib.import_module(self._name)
+        globals()[self._name] = module
+        return getattr(module, attr)
+
+
+asyncio = _LazyModule("asyncio")
+httpx = _LazyModule("httpx")
+sqlite3 = _LazyModule("sqlite3")
+
+# 命令行入口脚本（serve --detach 以它启动后台守护进程）
+CLI_SCRIPT = Path(__file__).with_name("dida365_cli.py")
+
+BASE_DOMAIN = os.environ.get("DIDA365_API_DOMAIN", "api.dida365.com")
+_API_PREFIX = "/open/v1"
+# 域名可带协议前缀（如 http://127.0.0.1:8080，供本地 mock 服务与基准测试使用），默认 https
+BASE_URL = (
+    f"{BASE_DOMAIN.rstrip('/')}{_API_PREFIX}" if "://" in BASE_DOMAIN
+    else f"https://{BASE_DOMAIN}{_API_PREFIX}"
+)
+TOKEN = os.environ.get("DIDA365_API_TOKEN", "")
+
+# 语义化退出码（Agent-Native 设计规范）
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_NOT_FOUND = 3
+EXIT_PERMISSION = 4
+EXIT_PARTIAL = 5
+EXIT_DRYRUN = 10
+
+# HTTP 状态码到语义退出码的映射
+_STATUS_TO_EXIT = {401: EXIT_PERMISSION, 403: EXIT_PERMISSION, 404: EXIT_NOT_FOUND}
+
+
+def _client_options(*, http2: bool, pool_size: int | None) -> dict:
+    if not TOKEN:
+        _fail("CONFIG_ERROR", "未设置环境变量 DIDA365_API_TOKEN",
+              suggestion="在滴答清单网页版 头像→设置→账户与安全→API 口令 中创建，然后设置环境变量",
+              exit_code=EXIT_USAGE)
+    return {
+        "base_url": BASE_URL,
+        "headers": {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"},
+        "timeout": 30.0,
+        "http2": http2,
+        "limits": (
+            httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            if pool_size else httpx.Limits()
+        ),
+    }
+
+
+def get_client(*, http2: bool = False, pool_size: int | None = None) -> httpx.Client:
+    return httpx.Client(**_client_options(http2=http2, pool_size=pool_size))
+
+
+def get_async_client(*, pool_size: int | None = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(**_client_options(http2=False, pool_size=pool_size))
+
+
+class CliError(Exception):
+    """统一错误。单命令模式由 main() 输出错误信封并以 exit_code 退出；batch 逐项捕获。"""
+
+    def __init__(
+        self, code: str, message: str, *, suggestion: str = "", exit_code: int = EXIT_ERROR,
+        details: dict | None = None,
+    ) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.suggestion = suggestion
+        self.exit_code = exit_code
+        self.details = details
+
+    def envelope(self) -> dict:
+        envelope: dict = {
+            "success": False,
+            "error": {"code": self.code, "message": self.message},
+        }
+        if self.suggestion:
+            envelope["error"]["suggestion"] = self.suggestion
+        if self.details:
+            envelope["error"].update(self.details)
+        return envelope
+
+
+def _fail(
+    code: str, message: str, *, suggestion: str = "", exit_code: int = EXIT_ERROR,
+    details: dict | None = None,
+) -> None:
+    """抛出 CliError（最终输出统一 JSON 错误信封并以 exit_code 退出）。
+
+    details 中的字段并入 error 对象（如 AMBIGUOUS_NAME 的 candidates）。
+    """
+    raise CliError(code, message, suggestion=suggestion, exit_code=exit_code, details=details)
+
+
+def _merge_field_trees(a: dict | bool, b: dict | bool) -> dict | bool:
+    if a is True or b is True:
+        return True
+    merged = dict(a)
+    for key, sub in b.items():
+        merged[key] = _merge_field_trees(merged[key], sub) if key in merged else sub
+    return merged
+
+
+def _spread_wildcard(tree: dict | bool) -> dict | bool:
+    """把 * 的子规则并入同层的具名 key（* 也匹配它们），自底向上处理。"""
+    if tree is True:
+        return True
+    tree = {k: _spread_wildcard(v) for k, v in tree.items()}
+    if "*" in tree:
+        for key in tree:
+            if key != "*":
+                tree[key] = _merge_field_trees(tree[key], tree["*"])
+    return tree
+
+
+def _compile_projector(tree: dict | bool):
+    if tree is True:
+        return lambda obj: obj
+    children = {k: _compile_projector(v) for k, v in tree.items() if k != "*"}
+    wildcard = _compile_projector(tree["*"]) if "*" in tree else None
+    get = children.get
+
+    def project(obj: object) -> object:
+        if isinstance(obj, dict):
+            if wildcard is None:
+                return {k: f(v) for k, v in obj.items() if (f := get(k)) is not None}
+            return {k: get(k, wildcard)(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [project(item) for item in obj]
+        return obj
+
+    return project
+
+
+class FieldProjection:
+    """--fields 编译后的投影计划，调用时单次遍历数据完成裁剪。
+
+    规则树的叶子为 True（保留整个值）；list 透明处理（逐元素套用同一层规则）；
+    非 dict/list 的值原样保留。
+    """
+
+    def __init__(self, tree: dict | bool) -> None:
+        self.tree = tree
+        self._project = _compile_projector(tree)
+
+    def __call__(self, data: object) -> object:
+        return self._project(data)
+
+    def child(self, key: str) -> FieldProjection | None:
+        """key 下一层的投影计划（流式输出逐项裁剪用）；key 未被选中时返回 None。"""
+        if self.tree is True:
+            return self
+        sub = self.tree.get(key, self.tree.get("*"))
+        return None if sub is None else FieldProjection(sub)
+
+
+@lru_cache(maxsize=32)
+def compile_fields(fields_str: str) -> FieldProjection | None:
+    """把 `id,tasks.title,project.*` 形式的字段列表编译为 FieldProjection（空列表返回 None）。
+
+    点号分隔嵌套路径，`*` 匹配任意 key；同一前缀的多条路径合并，短路径覆盖长路径。
+    """
+    tree: dict = {}
+    for raw in fields_str.split(","):
+        path = raw.strip()
+        if not path:
+            continue
+        parts = path.split(".")
+        if any(not p for p in parts):
+            _fail("INVALID_PARAMETER", f"--fields 路径无效: {path!r}",
+                  suggestion="用点号分隔嵌套字段，如 tasks.id,project.name", exit_code=EXIT_USAGE)
+        branch: dict = {}
+        for part in reversed(parts):
+            branch = {part: branch or True}
+        tree = _merge_field_trees(tree, branch)
+    return FieldProjection(_spread_wildcard(tree)) if tree else None
+
+
+def apply_fields_mask(data: object, fields_str: str) -> object:
+    """按 --fields 裁剪数据：顶层 key 或点号嵌套路径（支持 * 通配），list 元素逐项处理。"""
+    projection = compile_fields(fields_str)
+    return data if projection is None else projection(data)
+
+
+def _split_csv(s: str, *, cast=str) -> list:
+    """逗号分隔字符串 → 列表，去空白、丢空项；可选 cast 转换元素类型。"""
+    return [cast(x.strip()) for x in s.split(",") if x.strip()]
+
+
+def output(
+    data: object,
+    *,
+    command: str,
+    took_ms: int | None = None,
+    fields: str | None = None,
+    extra_metadata: dict | None = None,
+) -> None:
+    """输出统一 JSON 成功信封。"""
+    with trace_span("envelope"):
+        envelope = build_envelope(
+            data, command=command, took_ms=took_ms, fields=fields, extra_metadata=extra_metadata
+        )
+    emit_envelope(envelope)
+
+
+def build_envelope(
+    data: object,
+    *,
+    command: str,
+    took_ms: int | None = None,
+    fields: str | None = None,
+    extra_metadata: dict | None = None,
+) -> dict:
+    """构造统一成功信封（应用字段掩码并汇总 metadata）。"""
+    if fields:
+        data = apply_fields_mask(data, fields)
+    metadata: dict = {"command": f"dida365_cli {command}"}
+    if took_ms is not None:
+        metadata["took_ms"] = took_ms
+    if isinstance(data, list):
+        metadata["result_count"] = len(data)
+    resolved = _resolved_names.get()
+    if resolved:
+        metadata["resolved"] = resolved
+    if extra_metadata:
+        metadata.update(extra_metadata)
+    return {"success": True, "data": data, "metadata": metadata}
+
+
+# 输出格式：json（默认，缩进的完整信封）、ndjson（逐项一行 + 信封尾行）或 table-json
+# （列表按列编码的单行信封，--compact 同义），由 main() 按 --format 设置
+_output_format: contextvars.ContextVar[str] = contextvars.ContextVar("_output_format", default="json")
+
+# --project-name / --task-title 的解析结果，由 main() 设置，写入 metadata.resolved
+_resolved_names: contextvars.ContextVar[dict | None] = contextvars.ContextVar("_resolved_names", default=None)
+
+# ndjson 模式下，对象响应中逐项输出的列表字段（get-project-data 的 tasks）
+_NDJSON_STREAM_KEY = "tasks"
+
+
+def _emit_line(obj: object) -> None:
+    sys.stdout.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n")
+    sys.stdout.flush()
+
+
+def emit_envelope(envelope: dict) -> None:
+    """按当前输出格式打印信封。
+
+    ndjson 模式：data 为 list（或含 tasks 列表的对象）时每个元素一行，最后一行是
+    去掉该列表后的信封（trailer）；其他信封直接压缩为一行。
+    """
+    if _tracer is not None and "metadata" in envelope:
+        envelope["metadata"]["trace"] = _tracer.summary()
+    with trace_span("serialise"):
+        _write_envelope(envelope)
+
+
+def encode_table(items: list) -> dict | None:
+    """对象列表 → {"columns": [...], "rows": [[...], ...]}，列为各对象键的并集（按首次出现顺序）。
+
+    含非对象元素时返回 None，调用方原样输出。
+    """
+    columns: dict[str, None] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        columns.update(dict.fromkeys(item))
+    names = list(columns)
+    return {"columns": names, "rows": [[item.get(name) for name in names] for item in items]}
+
+
+def decode_table(table: dict) -> list[dict]:
+    """encode_table 的逆变换；某对象原本缺少的键解码为 null。"""
+    columns = table["columns"]
+    return [dict(zip(columns, row)) for row in table["rows"]]
+
+
+def _write_table_envelope(envelope: dict) -> None:
+    """table-json：data 为对象列表（或含 tasks 列表的对象）时按列编码，信封压缩为一行。
+
+    metadata.encoding 标明编码；与默认 json 格式的字节数对比要额外序列化两次，只在 --trace 时给出。"""
+    data = envelope.get("data")
+    if isinstance(data, list):
+        table = encode_table(data)
+        encoded = table
+    elif isinstance(data, dict) and isinstance(data.get(_NDJSON_STREAM_KEY), list):
+        table = encode_table(data[_NDJSON_STREAM_KEY])
+        encoded = {**data, _NDJSON_STREAM_KEY: table}
+    else:
+        table = None
+    if table is None:
+        _emit_line(envelope)
+        return
+    compact = {**envelope, "data": encoded}
+    encoding: dict = {"format": "table-json"}
+    if _tracer is not None:
+        # 字节数均为整个信封（不含 encoding 字段本身）
+        json_bytes = len(json.dumps(envelope, ensure_ascii=False, indent=2).encode("utf-8"))
+        table_bytes = len(json.dumps(compact, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        encoding.update(bytes=table_bytes, json_bytes=json_bytes,
+                        saved_pct=round(100 * (1 - table_bytes / json_bytes), 1))
+    compact["metadata"] = {**envelope.get("metadata", {}), "encoding": encoding}
+    _emit_line(compact)
+
+
+def _write_envelope(envelope: dict) -> None:
+    fmt = _output_format.get()
+    if fmt == "table-json":
+        _write_table_envelope(envelope)
+        return
+    if fmt != "ndjson":
+        print(json.dumps(envelope, ensure_ascii=False, indent=2))
+        return
+    data = envelope.get("data")
+    if isinstance(data, list):
+        items, rest = data, None
+    elif isinstance(data, dict) and isinstance(data.get(_NDJSON_STREAM_KEY), list):
+        items = data[_NDJSON_STREAM_KEY]
+        rest = {k: v for k, v in data.items() if k != _NDJSON_STREAM_KEY}
+    else:
+        _emit_line(envelope)
+        return
+    for item in items:
+        _emit_line(item)
+    trailer = {**envelope, "data": rest}
+    trailer["metadata"] = {**envelope.get("metadata", {}), "result_count": len(items)}
+    _emit_line(trailer)
+
+
+_DATE_ONLY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def normalize_date(s: str | None) -> str | None:
+    """将 YYYY-MM-DD 自动补齐为 ISO 8601（默认 +0800 时区，零时整点）。
+
+    完整格式（含 T 与时区）原样返回，None 也原样返回。
+    """
+    if s and _DATE_ONLY_RE.match(s):
+        return f"{s}T00:00:00+0800"
+    return s
+
+
+# 与 normalize_date 的默认 +0800 保持一致：无时区的时间按此时区解释
+_DEFAULT_TZ = timezone(timedelta(hours=8))
+_TZ_OFFSET_RE = re.compile(r"([+-]\d{2})(\d{2})$")
+
+
+def parse_datetime(s: str | None) -> datetime | None:
+    """解析 API 返回或用户输入的时间为带时区 datetime，无法解析时返回 None。
+
+    兼容 API 的 `2026-04-05T00:00:00.000+0000`、`Z` 后缀与 YYYY-MM-DD（经 normalize_date 补齐）。
+    """
+    if not s:
+        return None
+    s = normalize_date(s.strip())
+    s = _TZ_OFFSET_RE.sub(r"\1:\2", s[:-1] + "+00:00" if s.endswith("Z") else s)
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=_DEFAULT_TZ)
+
+
+class _RelayedResponse:
+    """守护进程转发回来的响应，提供 handle_response 所需的最小 httpx.Response 接口。"""
+
+    def __init__(
+        self, status_code: int, text: str, elapsed_ms: int, headers: dict | None = None
+    ) -> None:
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.elapsed = timedelta(milliseconds=elapsed_ms)
+        self.headers = {k.lower(): v for k, v in (headers or {}).items()}
+
+    def json(self) -> object:
+        return json.loads(self.text)
+
+    def read(self) -> bytes:
+        return self.content
+
+    def iter_text(self, chunk_size: int = 65536):
+        for i in range(0, len(self.text), chunk_size):
+            yield self.text[i:i + chunk_size]
+
+    def close(self) -> None:
+        pass
+
+
+def handle_response(resp: httpx.Response | _RelayedResponse) -> object:
+    if resp.status_code >= 400:
+        exit_code = _STATUS_TO_EXIT.get(resp.status_code, EXIT_ERROR)
+        detail = ""
+        try:
+            detail = json.dumps(resp.json(), ensure_ascii=False)
+        except Exception:
+            detail = resp.text
+        _fail(
+            code=f"HTTP_{resp.status_code}",
+            message=f"API 返回 {resp.status_code}: {detail}",
+            suggestion="检查参数是否正确；401 表示 Token 无效或过期",
+            exit_code=exit_code,
+        )
+    if resp.status_code == 204 or not resp.content:
+        return {"status": "ok"}
+    return resp.json()
+
+
+# ── 阶段计时（--trace） ──────────────────────────────────────────────────────
+#
+# --trace 时记录各阶段 span（解释器启动、参数解析、客户端构造、建连/TLS、服务端耗时、
+# 响应体下载、JSON 解码、字段投影、序列化……），汇总进 metadata.trace；
+# --trace-file（或环境变量 DIDA365_TRACE_FILE）把 span 以 OpenTelemetry 的 span 结构
+# 逐行追加到 JSONL 文件，便于跨多次调用聚合延迟分布。
+
+# httpx trace 扩展事件前缀 → span 名（http2 与 http11 同名）
+_HTTPX_TRACE_PHASES = {
+    "connection.connect_tcp": "connect",
+    "connection.start_tls": "tls",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "server",
+    "receive_response_body": "download",
+}
+
+
+_CLIENT_SPANS = {"http", "daemon_call"}
+
+
+def _process_start_ns() -> int | None:
+    """本进程的启动时刻（Unix 纳秒，精度约 10ms）；仅 Linux 可得，其他平台返回 None。"""
+    try:
+        stat = Path("/proc/self/stat").read_text()
+        uptime = float(Path("/proc/uptime").read_text().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    started_s = int(stat.rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+    return time.time_ns() - int((uptime - started_s) * 1e9)
+
+
+class Tracer:
+    """一次 CLI 调用的 span 记录器（线程安全的追加；时间为 Unix 纳秒）。"""
+
+    def __init__(self, command: str, trace_file: str | None) -> None:
+        self.command = command
+        self.trace_file = trace_file
+        self.trace_id = os.urandom(16).hex()
+        self.root_id = os.urandom(8).hex()
+        self.spans: list[dict] = []
+        self._origin_ns = time.time_ns()
+        self._origin_pc = time.perf_counter_ns()
+        self._pending: dict[tuple[int, str], int] = {}
+        self.process_start_ns = _process_start_ns()
+
+    def now(self) -> int:
+        return self._origin_ns + (time.perf_counter_ns() - self._origin_pc)
+
+    def add(self, name: str, start_ns: int, end_ns: int, **attributes: object) -> None:
+        self.spans.append({"name": name, "start": start_ns, "end": end_ns, "attributes": attributes})
+
+    @contextmanager
+    def span(self, name: str, **attributes: object):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.add(name, start, self.now(), **attributes)
+
+    def httpx_hook(self, event_name: str, info: dict) -> None:
+        """httpx 请求的 extensions["trace"] 回调：把 started/complete 事件配对成 span。"""
+        prefix, _, stage = event_name.rpartition(".")
+        phase = next((v for k, v in _HTTPX_TRACE_PHASES.items() if prefix.endswith(k)), None)
+        if phase is None:
+            return
+        key = (threading.get_ident(), phase)
+        if stage == "started":
+            self._pending[key] = self.now()
+        elif key in self._pending:
+            self.add(phase, self._pending.pop(key), self.now(), failed=stage == "failed")
+
+    def summary(self) -> dict:
+        """按阶段名汇总耗时（同名 span 累加，保持首次出现顺序）。"""
+        phases: dict[str, float] = {}
+        for sp in self.spans:
+            phases[sp["name"]] = phases.get(sp["name"], 0.0) + (sp["end"] - sp["start"]) / 1e6
+        start = self.process_start_ns or min((sp["start"] for sp in self.spans), default=self.now())
+        return {
+            "total_ms": round((self.now() - start) / 1e6, 1),
+            "phases_ms": {name: round(ms, 2) for name, ms in phases.items()},
+        }
+
+    def export(self, exit_code: int) -> None:
+        """把根 span 与各阶段 span 追加到 trace 文件（每行一个 OTel 风格的 span）。"""
+        if not self.trace_file:
+            return
+        end = self.now()
+        start = self.process_start_ns or min((sp["start"] for sp in self.spans), default=end)
+        resource = {"service.name": "dida365_cli", "process.pid": os.getpid()}
+        root = {"name": f"dida365_cli {self.command}", "start": start, "end": end,
+                "attributes": {"dida365.command": self.command, "process.exit_code": exit_code}}
+        lines = []
+        for sp in [root, *self.spans]:
+            is_root = sp is root
+            lines.append(json.dumps({
+                "traceId": self.trace_id,
+                "spanId": self.root_id if is_root else os.urandom(8).hex(),
+                "parentSpanId": None if is_root else self.root_id,
+                "name": sp["name"],
+                "kind": "SPAN_KIND_CLIENT" if sp["name"] in _CLIENT_SPANS else "SPAN_KIND_INTERNAL",
+                "startTimeUnixNano": sp["start"],
+                "endTimeUnixNano": sp["end"],
+                "attributes": sp["attributes"],
+                "resource": resource,
+            }, ensure_ascii=False, default=str))
+        try:
+            path = Path(self.trace_file).expanduser()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"trace 文件写入失败: {e}", file=sys.stderr)
+
+
+_tracer: Tracer | None = None
+
+
+def trace_span(name: str, **attributes: object):
+    """未启用 --trace 时为空上下文，开销可忽略。"""
+    return _tracer.span(name, **attributes) if _tracer is not None else nullcontext()
+
+
+# ── 增量 JSON 解析 ────────────────────────────────────────────────────────────
+#
+# ndjson 模式下不等整个响应体下载完：边接收文本块边用 JSONDecoder.raw_decode 解析出
+# 顶层数组（或对象中 tasks 数组）的单个元素，解析完即可输出并丢弃，内存占用与结果
+# 规模无关。
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WS_RE = re.compile(r"[ \t\n\r]*")
+_STREAM_COMPACT_AT = 1 << 16
+
+
+class JsonItemStream:
+    """增量解析 JSON 文本块，迭代时逐个产出数组元素。
+
+    顶层为数组：产出每个元素；顶层为对象：产出 stream_key 对应数组的元素，
+    其余字段收集到 rest；其他值（含空响应体）不产出元素，存入 rest。
+    """
+
+    def __init__(self, chunks, *, stream_key: str = _NDJSON_STREAM_KEY) -> None:
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.stream_key = stream_key
+        self.rest: object = None
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            return False
+        if self._pos >= _STREAM_COMPACT_AT:
+            self._buf, self._pos = self._buf[self._pos:], 0
+        self._buf += chunk
+        return True
+
+    def _peek(self) -> str:
+        """跳过空白，返回下一个字符（流结束时返回空串），不前移。"""
+        while True:
+            self._pos = _JSON_WS_RE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _take(self, expected: str) -> str:
+        ch = self._peek()
+        if ch not in expected:
+            raise json.JSONDecodeError(f"Expecting one of {expected!r}", self._buf, self._pos)
+        self._pos += 1
+        return ch
+
+    def _value(self) -> object:
+        self._peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 值恰好停在缓冲区末尾时可能被截断（如数字），补读后重新解析
+            if end >= len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _array(self):
+        self._take("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._take(",]") == "]":
+                return
+
+    def __iter__(self):
+        ch = self._peek()
+        if ch == "[":
+            yield from self._array()
+        elif ch == "{":
+            self._pos += 1
+            self.rest = {}
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            while True:
+                key = self._value()
+                self._take(":")
+                if key == self.stream_key and self._peek() == "[":
+                    yield from self._array()
+                else:
+                    self.rest[key] = self._value()
+                if self._take(",}") == "}":
+                    return
+        elif ch:
+            self.rest = self._value()
+
+
+# ── 限流与重试 ────────────────────────────────────────────────────────────────
+#
+# 所有发请求的路径（execute / batch / 并发读取 / bulk）都经过同一个进程级令牌桶
+# 与重试策略：
+#   - 令牌桶按 --rate-limit（请求/秒）放行；收到 429 时速率减半（不低于 1/8），
+#     之后每次成功缓慢回升（AIMD）。Retry-After 会让整个桶暂停到指定时刻。
+#   - 429 / 5xx / 传输错误按带抖动的指数退避重试，至多 --max-retries 次；
+#     退避时间不短于 Retry-After。
+#   - 只重试幂等请求（GET / DELETE 与只读查询 POST）；其他写请求仅在
+#     --retry-writes 时重试。连接阶段失败（请求未发出）对任何方法都可安全重试。
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+DEFAULT_MAX_RETRIES = 3
+_RETRY_BASE_DELAY = 0.5
+_RETRY_MAX_DELAY = 30.0
+# Retry-After 超过该值时不再等待，直接报错
+_RETRY_AFTER_LIMIT = 120.0
+
+
+class _TransportFailure(Exception):
+    """网络层失败（未拿到 HTTP 响应）。connect_failed 表示请求确定未发出。"""
+
+    def __init__(self, message: str, *, connect_failed: bool = False) -> None:
+        super().__init__(message)
+        self.connect_failed = connect_failed
+
+    @classmethod
+    def from_httpx(cls, e: Exception) -> _TransportFailure:
+        return cls(f"{type(e).__name__}: {e}",
+                   connect_failed=isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)))
+
+
+class RateLimiter:
+    """线程安全的令牌桶；reserve() 返回调用方需等待的秒数，同步/异步调用方各自 sleep。"""
+
+    def __init__(self, rate: float | None) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1.0, rate) if rate else 0.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            wait = max(0.0, self.blocked_until - now)
+            if self.rate:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                self.tokens -= 1  # 允许透支：负值即排队中的预订
+                if self.tokens < 0:
+                    wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def on_throttled(self, retry_after: float | None) -> None:
+        with self.lock:
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            if self.rate:
+                self.rate = max(self.max_rate / 8, self.rate / 2)
+
+    def on_success(self) -> None:
+        if self.rate and self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+_limiter = RateLimiter(None)
+_retry_policy = {"max_retries": DEFAULT_MAX_RETRIES, "retry_writes": False}
+
+
+def configure_resilience(args: argparse.Namespace) -> None:
+    """按命令行参数（缺省时读环境变量）配置进程级限流与重试策略。"""
+    global _limiter
+    rate = getattr(args, "rate_limit", None)
+    max_retries = getattr(args, "max_retries", None)
+    try:
+        if rate is None and os.environ.get("DIDA365_RATE_LIMIT", "").strip():
+            rate = float(os.environ["DIDA365_RATE_LIMIT"])
+        if max_retries is None and os.environ.get("DIDA365_MAX_RETRIES", "").strip():
+            max_retries = int(os.environ["DIDA365_MAX_RETRIES"])
+    except ValueError:
+        _fail("CONFIG_ERROR", "DIDA365_RATE_LIMIT / DIDA365_MAX_RETRIES 必须是数字", exit_code=EXIT_USAGE)
+    if (rate is not None and rate < 0) or (max_retries is not None and max_retries < 0):
+        _fail("INVALID_PARAMETER", "--rate-limit 与 --max-retries 不能为负数", exit_code=EXIT_USAGE)
+    _limiter = RateLimiter(rate or None)
+    _retry_policy["max_retries"] = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+    _retry_policy["retry_writes"] = bool(getattr(args, "retry_writes", False))
+
+
+def _retry_after_seconds(resp: object) -> float | None:
+    value = resp.headers.get("retry-after") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _retry_delay(
+    method: str, path: str, attempt: int, resp: object | None, failure: _TransportFailure | None,
+) -> float | None:
+    """判定本次结果是否需要重试：需要则返回等待秒数，否则返回 None（并更新令牌桶状态）。"""
+    if resp is not None and resp.status_code not in _RETRY_STATUSES:
+        _limiter.on_success()
+        return None
+    retry_after = _retry_after_seconds(resp)
+    if resp is not None and resp.status_code == 429:
+        _limiter.on_throttled(retry_after)
+    if attempt >= _retry_policy["max_retries"]:
+        return None
+    safe = (
+        method.upper() in _IDEMPOTENT_METHODS
+        or path in _READONLY_POSTS
+        or _retry_policy["retry_writes"]
+        or (failure is not None and failure.connect_failed)
+    )
+    if not safe or (retry_after or 0) > _RETRY_AFTER_LIMIT:
+        return None
+    import random
+
+    backoff = random.uniform(0, min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** attempt))
+    return max(backoff, retry_after or 0.0)
+
+
+def _new_retry_stats() -> dict:
+    return {"retries": 0, "wait_ms": 0}
+
+
+def request_with_retry(send_once, method: str, path: str) -> tuple[object, dict]:
+    """同步重试循环。send_once() 返回响应或抛出 _TransportFailure。
+
+    返回 (最终响应, {"retries", "wait_ms"})；重试耗尽仍是传输错误时报 NETWORK_ERROR。
+    """
+    stats = _new_retry_stats()
+    attempt = 0
+    while True:
+        wait = _limiter.reserve()
+        if wait:
+            with trace_span("rate_limit_wait"):
+                time.sleep(wait)
+            stats["wait_ms"] += int(wait * 1000)
+        try:
+            resp, failure = send_once(), None
+        except _TransportFailure as e:
+            resp, failure = None, e
+        delay = _retry_delay(method, path, attempt, resp, failure)
+        if delay is None:
+            break
+        if resp is not None:
+            resp.close()
+        with trace_span("retry_wait", attempt=attempt + 1):
+            time.sleep(delay)
+        stats["retries"] += 1
+        stats["wait_ms"] += int(delay * 1000)
+        attempt += 1
+    if failure is not None:
+        _fail("NETWORK_ERROR", str(failure), suggestion="检查网络连接后重试")
+    return resp, stats
+
+
+async def arequest_with_retry(
+    client: httpx.AsyncClient, method: str, path: str, json_body: object | None,
+) -> tuple[httpx.Response, dict]:
+    """request_with_retry 的异步版本（直接使用给定的 AsyncClient）。"""
+    stats = _new_retry_stats()
+    attempt = 0
+    while True:
+        wait = _limiter.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+            stats["wait_ms"] += int(wait * 1000)
+        try:
+            resp, failure = await client.request(method, path, json=json_body), None
+        except httpx.TransportError as e:
+            resp, failure = None, _TransportFailure.from_httpx(e)
+        delay = _retry_delay(method, path, attempt, resp, failure)
+        if delay is None:
+            break
+        await asyncio.sleep(delay)
+        stats["retries"] += 1
+        stats["wait_ms"] += int(delay * 1000)
+        attempt += 1
+    if failure is not None:
+        _fail("NETWORK_ERROR", str(failure), suggestion="检查网络连接后重试")
+    return resp, stats
+
+
+def retry_metadata(stats_list: list[dict]) -> dict:
+    """汇总重试统计；无重试且无等待时返回空 dict（不污染 metadata）。"""
+    retries = sum(st["retries"] for st in stats_list)
+    wait_ms = sum(st["wait_ms"] for st in stats_list)
+    if not retries and not wait_ms:
+        return {}
+    return {"retry": {"retries": retries, "wait_ms": wait_ms}}
+
+
+_plan_sink: contextvars.ContextVar[list | None] = contextvars.ContextVar("_plan_sink", default=None)
+
+
+def dry_run_preview(method: str, path: str, json_body: object | None) -> dict:
+    preview: dict = {"would_call": f"{method.upper()} {_API_PREFIX}{path}"}
+    if json_body is not None:
+        preview["body"] = json_body
+    return preview
+
+
+def execute(
+    method: str,
+    path: str,
+    args: argparse.Namespace,
+    command: str,
+    *,
+    json_body: object | None = None,
+    extra_metadata: dict | None = None,
+) -> None:
+    """统一执行器：处理 --dry-run、HTTP 调用、计时、信封输出。
+
+    处于 batch 规划阶段（_plan_sink 已设置）时不发请求，只记录请求描述。
+    """
+    sink = _plan_sink.get()
+    if sink is not None:
+        sink.append({
+            "method": method,
+            "path": path,
+            "body": json_body,
+            "command": command,
+            "fields": getattr(args, "fields", None),
+            "dry_run": getattr(args, "dry_run", False),
+        })
+        return
+    if getattr(args, "dry_run", False):
+        output(dry_run_preview(method, path, json_body), command=command,
+               extra_metadata={"dry_run": True, **(extra_metadata or {})})
+        sys.exit(EXIT_DRYRUN)
+    ttl, refresh = cache_policy(args)
+    extra: dict = dict(extra_metadata or {})
+    if method == "GET" and is_cacheable(path) and (ttl is not None or refresh):
+        hit = None if refresh else cache_get(path, ttl)
+        if hit is not None:
+            data, age_s = hit
+            output(data, command=command, fields=getattr(args, "fields", None),
+                   extra_metadata={**extra, "cache": {"status": "hit", "age_s": age_s, "ttl_s": ttl}})
+            return
+        extra["cache"] = {"status": "refresh" if refresh else "miss", "ttl_s": ttl}
+    elif _output_format.get() == "ndjson" and (method == "GET" or path in _READONLY_POSTS):
+        stream_execute(method, path, args, command, json_body=json_body, extra_metadata=extra)
+        return
+    resp, via_daemon, stats = send_request(method, path, json_body)
+    extra.update(retry_metadata([stats]))
+    took_ms = int(resp.elapsed.total_seconds() * 1000)
+    with trace_span("decode"):
+        data = handle_response(resp)
+    if "cache" in extra:
+        cache_put(path, data)
+    elif method != "GET":
+        after_write(method, path, json_body, data)
+    if via_daemon:
+        extra["transport"] = "daemon"
+    output(
+        data,
+        command=command,
+        took_ms=took_ms,
+        fields=getattr(args, "fields", None),
+        extra_metadata=extra or None,
+    )
+
+
+def stream_execute(
+    method: str,
+    path: str,
+    args: argparse.Namespace,
+    command: str,
+    *,
+    json_body: object | None = None,
+    extra_metadata: dict | None = None,
+) -> None:
+    """ndjson 模式的只读请求：边下载边解析，每个元素解析完立即输出一行，最后输出信封尾行。"""
+    started = time.monotonic()
+    fields = getattr(args, "fields", None)
+    projection = compile_fields(fields) if fields else None
+    count = 0
+    with request_session(method, path, json_body, stream=True) as (resp, via_daemon, stats):
+        if resp.status_code >= 400 or resp.status_code == 204:
+            resp.read()
+            handle_response(resp)
+        stream = JsonItemStream(resp.iter_text())
+        # 顶层数组的元素套用根规则；对象中 tasks 的元素套用 tasks 子规则（未选中则不输出）
+        item_projection, selected = projection, None
+        try:
+            with trace_span("stream"):
+                for item in stream:
+                    if selected is None:
+                        if projection is not None and isinstance(stream.rest, dict):
+                            item_projection = projection.child(stream.stream_key)
+                        selected = projection is None or item_projection is not None
+                    if selected:
+                        _emit_line(item if item_projection is None else item_projection(item))
+                        count += 1
+        except (json.JSONDecodeError, httpx.HTTPError) as e:
+            _fail("STREAM_ERROR", f"响应流在第 {count} 项后中断: {type(e).__name__}: {e}",
+                  suggestion="已输出的行有效；可重试或改用默认 JSON 格式")
+    extra = {**(extra_metadata or {}), **retry_metadata([stats])}
+    if via_daemon:
+        extra["transport"] = "daemon"
+    envelope = build_envelope(stream.rest, command=command,
+                              took_ms=int((time.monotonic() - started) * 1000),
+                              fields=fields, extra_metadata=extra)
+    envelope["metadata"]["result_count"] = count
+    emit_envelope(envelope)
+
+
+@contextmanager
+def request_session(method: str, path: str, json_body: object | None = None, *, stream: bool = False):
+    """发送一次 API 请求（含限流与重试）：守护进程在运行时经其转发，否则直连。
+
+    产出 (响应, 是否经守护进程, 重试统计)；stream=True 时响应体在 with 块内按需读取。
+    """
+    state: dict = {"client": None, "via_daemon": False}
+
+    def send_once() -> httpx.Response | _RelayedResponse:
+        with trace_span("daemon_call"):
+            reply = _daemon_call({"op": "request", "method": method, "path": path, "body": json_body})
+        if reply is not None:
+            state["via_daemon"] = True
+            if "error" in reply:
+                raise _TransportFailure(f"守护进程请求失败: {reply['error']}",
+                                        connect_failed=reply.get("connect_failed", False))
+            return _RelayedResponse(reply["status"], reply["text"], reply["elapsed_ms"],
+                                    reply.get("headers"))
+        if state["client"] is None:
+            with trace_span("client"):
+                state["client"] = get_client()
+        client = state["client"]
+        extensions = {"trace": _tracer.httpx_hook} if _tracer is not None else None
+        try:
+            with trace_span("http", **{"http.request.method": method, "url.path": path}):
+                return client.send(
+                    client.build_request(method, path, json=json_body, extensions=extensions),
+                    stream=stream,
+                )
+        except httpx.TransportError as e:
+            raise _TransportFailure.from_httpx(e) from e
+
+    try:
+        resp, stats = request_with_retry(send_once, method, path)
+        try:
+            yield resp, state["via_daemon"], stats
+        finally:
+            resp.close()
+    finally:
+        if state["client"] is not None:
+            state["client"].close()
+
+
+def send_request(
+    method: str, path: str, json_body: object | None = None
+) -> tuple[httpx.Response | _RelayedResponse, bool, dict]:
+    """发送一次 API 请求并读完响应体，返回 (响应, 是否经守护进程, 重试统计)。"""
+    with request_session(method, path, json_body) as result:
+        return result
+
+
+# ── 常驻守护进程 ──────────────────────────────────────────────────────────────
+#
+# serve 子命令在后台进程中持有一个 keep-alive（可用时 HTTP/2）的 httpx.Client，
+# 监听本地 Unix socket。普通子命令通过 send_request() 先尝试连接该 socket，
+# 连不上（未启动 / 已退出 / 平台不支持 AF_UNIX）则回退为直连。
+#
+# 协议：每个连接一行 JSON 请求 + 一行 JSON 响应。
+#   请求 {"op": "request", "method", "path", "body"}
+#       → {"status", "text", "elapsed_ms", "headers"?} | {"error", "connect_failed"}
+#   请求 {"op": "ping"}                                → 守护进程状态
+#   请求 {"op": "shutdown"}                            → {"stopping": true}
+
+DEFAULT_IDLE_TIMEOUT = 900
+
+
+def _user_cache_dir() -> Path:
+    """用户级缓存目录（遵循 XDG / Windows LOCALAPPDATA 约定）。"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "dida365-toolkit"
+
+
+def _token_fingerprint() -> str:
+    """域名 + Token 的短哈希：隔离不同账号的本地状态，且不在文件名中暴露 Token。"""
+    return hashlib.sha256(f"{BASE_DOMAIN}\n{TOKEN}".encode("utf-8")).hexdigest()[:16]
+
+
+def daemon_socket_path() -> Path:
+    override = os.environ.get("DIDA365_DAEMON_SOCKET")
+    if override:
+        return Path(override)
+    return _user_cache_dir() / f"daemon-{_token_fingerprint()}.sock"
+
+
+def _daemon_call(message: dict, *, timeout: float = 35.0) -> dict | None:
+    """向守护进程发送一条请求并读取响应；守护进程不可达时返回 None。
+
+    只有在连接建立之前失败才返回 None（调用方据此回退直连）。连接建立后
+    出错直接报 NETWORK_ERROR——此时请求可能已发出，回退会导致非幂等操作重复提交。
+    """
+    import socket
+
+    if not hasattr(socket, "AF_UNIX") or os.environ.get("DIDA365_NO_DAEMON"):
+        return None
+    path = daemon_socket_path()
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    try:
+        with sock:
+            sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except OSError as e:
+        _fail("NETWORK_ERROR", f"与守护进程通信失败: {e}",
+              suggestion="执行 serve --status 检查守护进程；设置 DIDA365_NO_DAEMON=1 可临时改为直连")
+    if not line:
+        _fail("NETWORK_ERROR", "守护进程未返回响应即断开连接",
+              suggestion="执行 serve --status 检查守护进程；设置 DIDA365_NO_DAEMON=1 可临时改为直连")
+    return json.loads(line)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run_daemon(sock_path: Path, idle_timeout: int) -> None:
+    """在前台运行守护进程，直到收到 shutdown 或空闲超时。"""
+    import socketserver
+
+    http2 = _http2_available()
+    client = get_client(http2=http2)
+    state = {
+        "started": time.time(),
+        "last_active": time.monotonic(),
+        "requests": 0,
+        "stop": False,
+    }
+    lock = threading.Lock()
+
+    def dispatch(msg: dict) -> dict:
+        op = msg.get("op")
+        with lock:
+            state["last_active"] = time.monotonic()
+        if op == "ping":
+            return {
+                "pid": os.getpid(),
+                "socket": str(sock_path),
+                "http2": http2,
+                "uptime_s": int(time.time() - state["started"]),
+                "requests": state["requests"],
+                "idle_timeout": idle_timeout,
+            }
+        if op == "shutdown":
+            state["stop"] = True
+            return {"stopping": True}
+        if op != "request":
+            return {"error": f"unknown op: {op!r}"}
+        try:
+            resp = client.request(msg["method"], msg["path"], json=msg.get("body"))
+        except httpx.TransportError as e:
+            failure = _TransportFailure.from_httpx(e)
+            return {"error": str(failure), "connect_failed": failure.connect_failed}
+        with lock:
+            state["requests"] += 1
+            state["last_active"] = time.monotonic()
+        reply = {
+            "status": resp.status_code,
+            "text": resp.text,
+            "elapsed_ms": int(resp.elapsed.total_seconds() * 1000),
+        }
+        if "retry-after" in resp.headers:
+            reply["headers"] = {"retry-after": resp.headers["retry-after"]}
+        return reply
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            line = self.rfile.readline()
+            if not line:
+                return
+            try:
+                reply = dispatch(json.loads(line))
+            except (ValueError, KeyError) as e:
+                reply = {"error": f"bad request: {e}"}
+            self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    sock_path.parent.mkdir(parents=True, exist_ok=True)
+    if sock_path.exists():
+        sock_path.unlink()
+    old_umask = os.umask(0o177)  # socket 仅当前用户可连（守护进程持有 Token）
+    try:
+        server = Server(str(sock_path), Handler)
+    finally:
+        os.umask(old_umask)
+    server.timeout = 1.0
+    try:
+        with client, server:
+            while not state["stop"] and time.monotonic() - state["last_active"] < idle_timeout:
+                server.handle_request()
+    finally:
+        if sock_path.exists():
+            sock_path.unlink()
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    import socket
+    import subprocess
+
+    if not hasattr(socket, "AF_UNIX"):
+        _fail("UNSUPPORTED_PLATFORM", "当前平台不支持 Unix socket，无法启动守护进程",
+              suggestion="直接调用各子命令即可（自动直连）", exit_code=EXIT_USAGE)
+    sock_path = daemon_socket_path()
+
+    if args.status or args.stop:
+        reply = _daemon_call({"op": "shutdown" if args.stop else "ping"}, timeout=5.0)
+        if reply is None:
+            _fail("NOT_RUNNING", f"守护进程未运行: {sock_path}",
+                  suggestion="执行 serve --detach 启动", exit_code=EXIT_NOT_FOUND)
+        output(reply, command="serve", fields=args.fields)
+        return
+
+    if args.dry_run:
+        output({"would_start": str(sock_path), "idle_timeout": args.idle_timeout},
+               command="serve", extra_metadata={"dry_run": True})
+        sys.exit(EXIT_DRYRUN)
+    if not TOKEN:
+        get_client()  # 复用缺失 Token 的统一报错
+    running = _daemon_call({"op": "ping"}, timeout=5.0)
+    if running is not None:
+        output(running, command="serve", fields=args.fields,
+               extra_metadata={"already_running": True})
+        return
+
+    if args.detach:
+        proc = subprocess.Popen(
+            [sys.executable, str(CLI_SCRIPT), "serve",
+             "--idle-timeout", str(args.idle_timeout)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            reply = _daemon_call({"op": "ping"}, timeout=5.0)
+            if reply is not None:
+                output(reply, command="serve", fields=args.fields)
+                return
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        _fail("DAEMON_START_FAILED", "守护进程未能在 10 秒内就绪",
+              suggestion="去掉 --detach 在前台运行以查看错误输出")
+
+    output({"socket": str(sock_path), "pid": os.getpid(), "idle_timeout": args.idle_timeout},
+           command="serve", fields=args.fields)
+    sys.stdout.flush()
+    run_daemon(sock_path, args.idle_timeout)
+
+
+# ── 本地读缓存 ────────────────────────────────────────────────────────────────
+#
+# 可选的 read-through 缓存：仅缓存 list-projects（GET /project）与
+# get-project-data（GET /project/{id}/data）的原始响应，存于用户缓存目录下的
+# SQLite，按 (域名+Token 哈希, 路径) 区分。通过 --cache-ttl 或环境变量
+# DIDA365_CACHE_TTL 启用；写操作成功后无论是否启用缓存都会失效受影响的 key。
+
+_CACHEABLE_RE = re.compile(r"^/project(/[^/]+/data)?$")
+# 只读的 POST 端点（查询类），不触发缓存失效
+_READONLY_POSTS = {"/task/filter", "/task/completed"}
+
+
+def is_cacheable(path: str) -> bool:
+    return bool(_CACHEABLE_RE.match(path))
+
+
+def cache_policy(args: argparse.Namespace) -> tuple[int | None, bool]:
+    """返回 (TTL 秒数或 None=不读缓存, 是否强制刷新)。"""
+    if getattr(args, "no_cache", False):
+        return None, False
+    ttl = getattr(args, "cache_ttl", None)
+    if ttl is None and os.environ.get("DIDA365_CACHE_TTL", "").strip():
+        try:
+            ttl = int(os.environ["DIDA365_CACHE_TTL"])
+        except ValueError:
+            _fail("CONFIG_ERROR", "环境变量 DIDA365_CACHE_TTL 必须是整数秒数", exit_code=EXIT_USAGE)
+    return ttl, bool(getattr(args, "refresh", False))
+
+
+def _cache_db_path() -> Path:
+    return _user_cache_dir() / "cache.sqlite3"
+
+
+def _cache_connect(*, create: bool) -> sqlite3.Connection | None:
+    path = _cache_db_path()
+    if not create and not path.exists():
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS responses ("
+        " account TEXT NOT NULL, path TEXT NOT NULL, body TEXT NOT NULL,"
+        " stored_at REAL NOT NULL, PRIMARY KEY (account, path))"
+    )
+    return conn
+
+
+def cache_get(path: str, ttl: int | None) -> tuple[object, int] | None:
+    """命中且未过期时返回 (数据, 年龄秒数)。"""
+    conn = _cache_connect(create=False)
+    if conn is None or ttl is None:
+        return None
+    with conn:
+        row = conn.execute(
+            "SELECT body, stored_at FROM responses WHERE account = ? AND path = ?",
+            (_token_fingerprint(), path),
+        ).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    age = time.time() - row[1]
+    if age > ttl:
+        return None
+    return json.loads(row[0]), int(age)
+
+
+def cache_put(path: str, data: object) -> None:
+    conn = _cache_connect(create=True)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (account, path, body, stored_at) VALUES (?, ?, ?, ?)",
+            (_token_fingerprint(), path, json.dumps(data, ensure_ascii=False), time.time()),
+        )
+    conn.close()
+
+
+def _affected_paths(method: str, path: str, body: object | None) -> list[str]:
+    """写操作影响到的缓存路径。"""
+    if method == "GET" or path in _READONLY_POSTS:
+        return []
+    parts = path.strip("/").split("/")
+    project_ids: list[str] = []
+    if parts[0] == "project":
+        if len(parts) == 1 or len(parts) == 2:  # create / update / delete project
+            return ["/project"] + ([f"/project/{parts[1]}/data"] if len(parts) == 2 else [])
+        project_ids.append(parts[1])  # /project/{p}/task/{t}[/complete]
+    elif path == "/task/move" and isinstance(body, list):
+        for move in body:
+            project_ids += [move.get("fromProjectId", ""), move.get("toProjectId", "")]
+    elif parts[0] == "task" and isinstance(body, dict):  # create / update task
+        project_ids.append(body.get("projectId", ""))
+    return [f"/project/{pid}/data" for pid in dict.fromkeys(project_ids) if pid]
+
+
+def invalidate_after_write(method: str, path: str, body: object | None) -> None:
+    """写操作成功后失效受影响的缓存（收集箱的真实 ID 与 'inbox' 别名一并失效）。"""
+    paths = _affected_paths(method, path, body)
+    if not paths:
+        return
+    conn = _cache_connect(create=False)
+    if conn is None:
+        return
+    account = _token_fingerprint()
+    with conn:
+        for p in paths:
+            conn.execute("DELETE FROM responses WHERE account = ? AND path = ?", (account, p))
+            if p.startswith("/project/inbox"):
+                conn.execute(
+                    "DELETE FROM responses WHERE account = ? AND path LIKE '/project/inbox%/data'",
+                    (account,),
+                )
+    conn.close()
+
+
+# ── 并发读取（asyncio） ──────────────────────────────────────────────────────
+#
+# 与 execute() 并列的异步执行路径：一个 httpx.AsyncClient 连接池 + Semaphore
+# 限制并发，把 N 个独立请求的总耗时从“各请求耗时之和”降到“最慢几批之和”。
+# 结果逐项记录成功数据或错误，由调用方合并为单个信封。该路径直接连接 API，
+# 不经 serve 守护进程转发。
+
+DEFAULT_PARALLEL = 8
+
+
+async def _fetch_one(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, key: str, method: str, path: str,
+    json_body: object | None = None,
+) -> dict:
+    """执行单个请求，返回 {"key", "ok", "retry", "took_ms" + "data" | "error" + "exit_code"}。"""
+    stats = _new_retry_stats()
+    async with sem:
+        try:
+            resp, stats = await arequest_with_retry(client, method, path, json_body)
+            data = handle_response(resp)
+        except CliError as e:
+            return {"key": key, "ok": False, "error": e.envelope()["error"],
+                    "exit_code": e.exit_code, "retry": stats}
+    return {"key": key, "ok": True, "data": data, "retry": stats,
+            "took_ms": int(resp.elapsed.total_seconds() * 1000)}
+
+
+async def gather_requests(
+    client: httpx.AsyncClient, requests: list[tuple[str, str, str, object | None]], parallel: int,
+) -> list[dict]:
+    """并发执行 (key, method, path, body) 列表，结果按输入顺序返回。"""
+    sem = asyncio.Semaphore(parallel)
+    return await asyncio.gather(
+        *(_fetch_one(client, sem, key, method, path, body) for key, method, path, body in requests)
+    )
+
+
+def _check_parallel(parallel: int) -> None:
+    if parallel < 1:
+        _fail("INVALID_PARAMETER", "--parallel 必须 ≥ 1", exit_code=EXIT_USAGE)
+
+
+async def gather_cached(
+    client: httpx.AsyncClient, requests: list[tuple[str, str, str, object | None]],
+    parallel: int, ttl: int | None, refresh: bool,
+) -> list[dict]:
+    """gather_requests 的 read-through 版本：命中缓存的 GET 不发请求，结果附 cached 标记。"""
+    use_cache = ttl is not None or refresh
+    results: dict[str, dict] = {}
+    misses = []
+    for key, method, path, body in requests:
+        hit = cache_get(path, ttl) if use_cache and not refresh and is_cacheable(path) else None
+        if hit is not None:
+            results[key] = {"key": key, "ok": True, "data": hit[0], "took_ms": 0,
+                            "cached": True, "age_s": hit[1]}
+        else:
+            misses.append((key, method, path, body))
+    paths = {key: path for key, _, path, _ in misses}
+    for r in await gather_requests(client, misses, parallel):
+        if use_cache and is_cacheable(paths[r["key"]]):
+            r["cached"] = False
+            if r["ok"]:
+                cache_put(paths[r["key"]], r["data"])
+        results[r["key"]] = r
+    return [results[key] for key, *_ in requests]
+
+
+async def _list_project_ids(
+    client: httpx.AsyncClient, ttl: int | None, refresh: bool
+) -> list[str]:
+    """inbox + 全部项目 ID（list-projects 不返回收集箱）。"""
+    (listing,) = await gather_cached(
+        client, [("projects", "GET", "/project", None)], 1, ttl, refresh
+    )
+    if not listing["ok"]:
+        error = listing["error"]
+        _fail(error["code"], error["message"], suggestion=error.get("suggestion", ""),
+              exit_code=listing["exit_code"])
+    return ["inbox"] + [p["id"] for p in listing["data"]]
+
+
+async def _fetch_project_data(
+    project_ids: list[str] | None, parallel: int, ttl: int | None = None, refresh: bool = False,
+) -> list[dict]:
+    async with get_async_client(pool_size=parallel) as client:
+        if project_ids is None:
+            project_ids = await _list_project_ids(client, ttl, refresh)
+        requests = [(pid, "GET", f"/project/{pid}/data", None) for pid in project_ids]
+        return await gather_cached(client, requests, parallel, ttl, refresh)
+
+
+def merge_fanout(
+    results: list[dict], *, key_name: str
+) -> tuple[list[dict], dict]:
+    """合并并发结果：成功项进 data（附 key 字段），耗时与错误进 metadata。"""
+    data = []
+    timings: dict[str, int] = {}
+    errors = []
+    hit_ages = []
+    for r in results:
+        if r["ok"]:
+            item = r["data"] if isinstance(r["data"], dict) else {"data": r["data"]}
+            data.append({key_name: r["key"], **item})
+            timings[r["key"]] = r["took_ms"]
+            if r.get("cached"):
+                hit_ages.append(r["age_s"])
+        else:
+            errors.append({key_name: r["key"], **r["error"], "exit_code": r["exit_code"]})
+    metadata: dict = {"timings_ms": timings, **retry_metadata([r["retry"] for r in results if "retry" in r])}
+    if any("cached" in r for r in results):
+        metadata["cache"] = {"hits": len(hit_ages), "misses": len(results) - len(hit_ages)}
+        if hit_ages:
+            metadata["cache"]["max_age_s"] = max(hit_ages)
+    if errors:
+        metadata["errors"] = errors
+    return data, metadata
+
+
+# ── 名称解析（--project-name / --task-title） ─────────────────────────────────
+#
+# 把项目名 / 任务标题解析为 ID：索引缓存在本地读缓存库中（项目索引来自 list-projects，
+# 任务索引来自项目数据，只含未完成任务），按 精确 → 前缀 → 包含 → 模糊 逐级匹配。
+# 索引超过 DEFAULT_NAME_INDEX_TTL 秒或未命中时重建一次；缓存命中时不产生网络请求。
+
+DEFAULT_NAME_INDEX_TTL = 3600
+# 子命令 → (接收项目 ID 的参数, 接收任务 ID 的参数)
+_NAME_TARGETS: dict[str, tuple[str, str | None]] = {
+    "get-project": ("project_id", None),
+    "get-project-data": ("project_id", None),
+    "update-project": ("project_id", None),
+    "delete-project": ("project_id", None),
+    "get-task": ("project_id", "task_id"),
+    "complete-task": ("project_id", "task_id"),
+    "delete-task": ("project_id", "task_id"),
+    "create-task": ("project", None),
+    "update-task": ("project", "task_id"),
+    "filter-tasks": ("projects", None),
+    "query-completed": ("projects", None),
+}
+# 可以都不给的参数（其余参数须给出 ID 或对应的名称选项）
+_NAME_OPTIONAL = {("get-project-data", "project_id"), ("filter-tasks", "projects"),
+                  ("query-completed", "projects")}
+
+
+class NameIndex:
+    """一份名称索引。column 为名称所在列；casefold 后的名称与精确匹配表在首次匹配时建立，
+    之后（如 batch 逐行解析）精确匹配为一次字典查找。"""
+
+    def __init__(self, entries: list[list], column: int, age_s: int | None) -> None:
+        self.entries = entries
+        self.column = column
+        self.age_s = age_s
+        self._folded: list[str] | None = None
+        self._exact: dict[str, list[list]] = {}
+
+    def _prepare(self) -> list[str]:
+        if self._folded is None:
+            self._folded = [(entry[self.column] or "").casefold() for entry in self.entries]
+            for entry, name in zip(self.entries, self._folded):
+                self._exact.setdefault(name, []).append(entry)
+        return self._folded
+
+    def match(self, query: str) -> tuple[str, list[list]]:
+        """按 exact → prefix → contains → fuzzy 逐级匹配（不区分大小写），返回首个有结果的级别与候选。"""
+        folded = self._prepare()
+        needle = query.strip().casefold()
+        if needle in self._exact:
+            return "exact", self._exact[needle]
+        for tier, test in (("prefix", lambda n: n.startswith(needle)), ("contains", lambda n: needle in n)):
+            hits = [entry for entry, name in zip(self.entries, folded) if test(name)]
+            if hits:
+                return tier, hits
+        from difflib import SequenceMatcher
+
+        # 模糊级别只保留相似度最高（且 ≥ 0.6）的候选
+        matcher = SequenceMatcher(b=needle)
+        scored = []
+        for entry, name in zip(self.entries, folded):
+            matcher.set_seq1(name)
+            if matcher.real_quick_ratio() >= 0.6 and matcher.quick_ratio() >= 0.6:
+                scored.append((matcher.ratio(), entry))
+        best = max((score for score, _ in scored), default=0.0)
+        return "fuzzy", [entry for score, entry in scored if best >= 0.6 and score == best]
+
+
+# 本进程内已加载的索引：batch 逐行解析时不重复读缓存库
+_name_indexes: dict[str, NameIndex] = {}
+
+
+def _build_name_index(kind: str, scope: str | None) -> list[list]:
+    if kind == "projects":
+        resp, _, _ = send_request("GET", "/project")
+        projects = handle_response(resp)
+        return [["inbox", "收集箱"]] + [[p["id"], p.get("name") or ""] for p in projects or []]
+    results = asyncio.run(_fetch_project_data([scope] if scope else None, DEFAULT_PARALLEL))
+    entries = []
+    for r in results:
+        if not r["ok"]:
+            _fail(r["error"]["code"], f"构建任务索引失败（项目 {r['key']}）: {r['error']['message']}",
+                  exit_code=r["exit_code"])
+        entries += [[t["id"], t.get("projectId", r["key"]), t.get("title") or ""]
+                    for t in r["data"].get("tasks") or []]
+    return entries
+
+
+def name_index(kind: str, scope: str | None = None, *, use_cache: bool = True,
+               rebuild: bool = False) -> NameIndex:
+    """项目索引项为 [id, name]；任务索引项为 [id, projectId, title]，scope 为项目 ID 时只含该项目。
+
+    age_s 为索引年龄（秒），本次刚重建时为 None。
+    """
+    key = f"#names/{kind}/{scope or '*'}" if kind == "tasks" else "#names/projects"
+    column = 1 if kind == "projects" else 2
+    if not rebuild:
+        if key in _name_indexes:
+            return _name_indexes[key]
+        hit = cache_get(key, DEFAULT_NAME_INDEX_TTL) if use_cache else None
+        if hit is not None:
+            _name_indexes[key] = NameIndex(hit[0], column, hit[1])
+            return _name_indexes[key]
+    with trace_span("name_index", kind=kind):
+        entries = _build_name_index(kind, scope)
+    if use_cache:
+        cache_put(key, entries)
+    _name_indexes[key] = NameIndex(entries, column, None)
+    return _name_indexes[key]
+
+
+def resolve_name(kind: str, query: str, *, scope: str | None = None, use_cache: bool = True) -> dict:
+    """解析单个名称，返回 {"id", "name", "match", "index_age_s"（任务另有 projectId）}。
+
+    未命中时重建索引重试一次；仍未命中返回 NAME_NOT_FOUND，多个候选返回 AMBIGUOUS_NAME（附 candidates）。
+    """
+    index = name_index(kind, scope, use_cache=use_cache)
+    tier, hits = index.match(query)
+    if not hits and index.age_s is not None:
+        index = name_index(kind, scope, use_cache=use_cache, rebuild=True)
+        tier, hits = index.match(query)
+    label = "项目" if kind == "projects" else "任务"
+    if not hits:
+        _fail("NAME_NOT_FOUND", f"没有名称匹配 '{query}' 的{label}",
+              suggestion="检查名称，或改用 ID" + ("（任务索引只含未完成任务）" if kind == "tasks" else ""),
+              exit_code=EXIT_NOT_FOUND)
+    if len(hits) > 1:
+        candidates = [
+            {"id": h[0], "name": h[1]} if kind == "projects" else {"id": h[0], "projectId": h[1], "title": h[2]}
+            for h in hits[:10]
+        ]
+        _fail("AMBIGUOUS_NAME", f"'{query}' 匹配到 {len(hits)} 个{label}（{tier}）",
+              suggestion="从 candidates 中选定 ID 直接传入，或改用更完整的名称"
+                         + ("；加 --project-name 可缩小任务范围" if kind == "tasks" else ""),
+              exit_code=EXIT_USAGE, details={"match": tier, "candidates": candidates})
+    hit = hits[0]
+    resolved = {"id": hit[0], "name": hit[index.column], "match": tier, "index_age_s": index.age_s}
+    if kind == "tasks":
+        resolved["projectId"] = hit[1]
+    return resolved
+
+
+def resolve_names(command: str, args: argparse.Namespace, *, defer: bool = False) -> dict:
+    """把 --project-name / --task-title 填入子命令的 ID 参数，并检查必需的 ID 是否齐全。
+
+    返回解析结果（供 metadata.resolved）；未使用名称选项时返回空 dict。
+    defer=True 时不查索引（不联网），ID 参数填入 "<名称选项 值>" 占位，结果标记 deferred。
+    """
+    if command not in _NAME_TARGETS:
+        return {}
+    project_dest, task_dest = _NAME_TARGETS[command]
+    project_name = getattr(args, "project_name", None)
+    task_title = getattr(args, "task_title", None)
+    # 给了 --project-name 时唯一的位置参数实际是任务 ID（get-task --project-name 工作 <任务ID>）
+    if project_name and task_dest and project_dest == "project_id" \
+            and getattr(args, task_dest) is None and args.project_id is not None:
+        setattr(args, task_dest, args.project_id)
+        args.project_id = None
+    for flag, value, dest in (("--project-name", project_name, project_dest),
+                              ("--task-title", task_title, task_dest)):
+        if value and getattr(args, dest) is not None:
+            _fail("INVALID_PARAMETER", f"{flag} 不能与 {dest} 同时指定", exit_code=EXIT_USAGE)
+
+    use_cache = not getattr(args, "no_cache", False)
+    resolved: dict = {}
+    if defer:
+        for key, flag, value, dest in (("project", "--project-name", project_name, project_dest),
+                                       ("task", "--task-title", task_title, task_dest)):
+            if value:
+                resolved[key] = {"query": value, "deferred": True}
+                setattr(args, dest, f"<{flag} {value}>")
+        if task_title and getattr(args, project_dest) is None:
+            setattr(args, project_dest, f"<--task-title {task_title} 所在项目>")
+    if project_name and not defer:
+        resolved["project"] = resolve_name("projects", project_name, use_cache=use_cache)
+        setattr(args, project_dest, resolved["project"]["id"])
+    if task_title and not defer:
+        scope = getattr(args, project_dest)
+        resolved["task"] = resolve_name("tasks", task_title, scope=scope, use_cache=use_cache)
+        setattr(args, task_dest, resolved["task"]["id"])
+        if getattr(args, project_dest) is None:
+            setattr(args, project_dest, resolved["task"]["projectId"])
+    for dest, flag in ((project_dest, "--project-name"), (task_dest, "--task-title")):
+        if dest and (command, dest) not in _NAME_OPTIONAL and getattr(args, dest) is None:
+            _fail("INVALID_PARAMETER", f"缺少 {dest}",
+                  suggestion=f"直接传 ID，或用 {flag} 按名称指定", exit_code=EXIT_USAGE)
+    return resolved
+
+
+# ── 项目操作 ──────────────────────────────────────────────────────────────────
+
+
+def cmd_list_projects(args: argparse.Namespace) -> None:
+    execute("GET", "/project", args, "list-projects")
+
+
+def cmd_get_project(args: argparse.Namespace) -> None:
+    execute("GET", f"/project/{args.project_id}", args, "get-project")
+
+
+def cmd_get_project_data(args: argparse.Namespace) -> None:
+    targets = [bool(args.project_id), args.all, bool(args.projects)]
+    if sum(targets) != 1:
+        _fail("INVALID_PARAMETER", "project_id、--all、--projects 必须且只能指定一个",
+              suggestion="单个项目传 project_id；多个项目用 --projects id1,id2 或 --all",
+              exit_code=EXIT_USAGE)
+    if args.project_id:
+        execute("GET", f"/project/{args.project_id}/data", args, "get-project-data")
+        return
+
+    if _plan_sink.get() is not None:
+        _fail("INVALID_PARAMETER", "batch 中的 get-project-data 不支持 --all / --projects",
+              suggestion="改为直接调用 get-project-data --all，或在 batch 中逐项目列出",
+              exit_code=EXIT_USAGE)
+    _check_parallel(args.parallel)
+    project_ids = None if args.all else list(dict.fromkeys(_split_csv(args.projects)))
+    if args.dry_run:
+        calls = [f"GET {_API_PREFIX}/project"] if project_ids is None else []
+        calls.append(f"GET {_API_PREFIX}/project/{{projectId}}/data")
+        preview = {"would_call": calls, "projects": project_ids or ["inbox", "<list-projects 结果>"],
+                   "parallel": args.parallel}
+        output(preview, command="get-project-data", extra_metadata={"dry_run": True})
+        sys.exit(EXIT_DRYRUN)
+
+    started = time.monotonic()
+    ttl, refresh = cache_policy(args)
+    results = asyncio.run(_fetch_project_data(project_ids, args.parallel, ttl, refresh))
+    data, metadata = merge_fanout(results, key_name="projectId")
+    if not data and metadata.get("errors"):
+        first = metadata["errors"][0]
+        _fail(first["code"], f"全部 {len(results)} 个项目获取失败，首个错误: {first['message']}",
+              exit_code=first["exit_code"])
+    metadata.update(parallel=args.parallel, project_count=len(results))
+    output(
+        data,
+        command="get-project-data",
+        took_ms=int((time.monotonic() - started) * 1000),
+        fields=args.fields,
+        extra_metadata=metadata,
+    )
+
+
+def cmd_create_project(args: argparse.Namespace) -> None:
+    body: dict = {"name": args.name}
+    if args.color:
+        body["color"] = args.color
+    if args.view_mode:
+        body["viewMode"] = args.view_mode
+    if args.kind:
+        body["kind"] = args.kind
+    if args.sort_order is not None:
+        body["sortOrder"] = args.sort_order
+    execute("POST", "/project", args, "create-project", json_body=body)
+
+
+def cmd_update_project(args: argparse.Namespace) -> None:
+    body: dict = {}
+    if args.name:
+        body["name"] = args.name
+    if args.color:
+        body["color"] = args.color
+    if args.view_mode:
+        body["viewMode"] = args.view_mode
+    if args.kind:
+        body["kind"] = args.kind
+    if args.sort_order is not None:
+        body["sortOrder"] = args.sort_order
+    if not body:
+        _fail("INVALID_PARAMETER", "至少需要一个要更新的字段",
+              suggestion="使用 --name, --color, --view-mode, --kind 或 --sort-order 指定要更新的字段",
+              exit_code=EXIT_USAGE)
+    execute("POST", f"/project/{args.project_id}", args, "update-project", json_body=body)
+
+
+def cmd_delete_project(args: argparse.Namespace) -> None:
+    execute("DELETE", f"/project/{args.project_id}", args, "delete-project")
+
+
+# ── 任务操作 ──────────────────────────────────────────────────────────────────
+
+
+def cmd_get_task(args: argparse.Namespace) -> None:
+    execute("GET", f"/project/{args.project_id}/task/{args.task_id}", args, "get-task")
+
+
+def cmd_create_task(args: argparse.Namespace) -> None:
+    body: dict = {"title": args.title, "projectId": args.project}
+    if args.content:
+        body["content"] = args.content
+    if args.desc:
+        body["desc"] = args.desc
+    if args.priority is not None:
+        body["priority"] = args.priority
+    if args.due_date:
+        body["dueDate"] = normalize_date(args.due_date)
+    if args.start_date:
+        body["startDate"] = normalize_date(args.start_date)
+    if args.time_zone:
+        body["timeZone"] = args.time_zone
+    if args.all_day:
+        body["isAllDay"] = True
+    if args.tags:
+        body["tags"] = _split_csv(args.tags)
+    if args.repeat_flag:
+        body["repeatFlag"] = args.repeat_flag
+    execute("POST", "/task", args, "create-task", json_body=body)
+
+
+def _task_update_fields(args: argparse.Namespace) -> dict:
+    """update-task / bulk-update 共用：从参数构造要更新的任务字段（不含 id 与 projectId）。"""
+    body: dict = {}
+    if args.title:
+        body["title"] = args.title
+    if args.content:
+        body["content"] = args.content
+    if args.desc:
+        body["desc"] = args.desc
+    if args.priority is not None:
+        body["priority"] = args.priority
+    if args.due_date:
+        body["dueDate"] = normalize_date(args.due_date)
+    if args.start_date:
+        body["startDate"] = normalize_date(args.start_date)
+    if args.time_zone:
+        body["timeZone"] = args.time_zone
+    if args.all_day is not None:
+        body["isAllDay"] = args.all_day
+    if args.tags:
+        body["tags"] = _split_csv(args.tags)
+    if args.repeat_flag:
+        body["repeatFlag"] = args.repeat_flag
+    if args.status is not None:
+        body["status"] = args.status
+    return body
+
+
+def cmd_update_task(args: argparse.Namespace) -> None:
+    body: dict = {"id": args.task_id, "projectId": args.project, **_task_update_fields(args)}
+    execute("POST", f"/task/{args.task_id}", args, "update-task", json_body=body)
+
+
+def cmd_complete_task(args: argparse.Namespace) -> None:
+    execute(
+        "POST",
+        f"/project/{args.project_id}/task/{args.task_id}/complete",
+        args,
+        "complete-task",
+    )
+
+
+def cmd_delete_task(args: argparse.Namespace) -> None:
+    execute(
+        "DELETE",
+        f"/project/{args.project_id}/task/{args.task_id}",
+        args,
+        "delete-task",
+    )
+
+
+def cmd_move_tasks(args: argparse.Namespace) -> None:
+    task_ids = _split_csv(args.tasks)
+    payload = [
+        {"fromProjectId": args.from_project, "toProjectId": args.to_project, "taskId": tid}
+        for tid in task_ids
+    ]
+    execute("POST", "/task/move", args, "move-tasks", json_body=payload)
+
+
+# ── 批量变更 ──────────────────────────────────────────────────────────────────
+#
+# bulk-complete / bulk-delete / bulk-update 对一组 project_id:task_id 在同一个
+# 连接池上并发执行同一种变更，逐项报告成败并汇总为单个信封。
+
+
+def _aggregate_exit_code(codes: list[int]) -> int:
+    """多项操作的总退出码：部分失败为 EXIT_PARTIAL；全部失败且错误类型一致时沿用该码。"""
+    failed = [c for c in codes if c not in (EXIT_OK, EXIT_DRYRUN)]
+    if not failed:
+        return EXIT_OK
+    if len(failed) < len(codes):
+        return EXIT_PARTIAL
+    return failed[0] if len(set(failed)) == 1 else EXIT_ERROR
+
+
+def _read_task_refs(raw: str | None) -> list[tuple[str, str]]:
+    """解析 project_id:task_id 列表：--tasks 逗号分隔，缺省或 '-' 时从 stdin 读（逗号/空白分隔）。"""
+    text = sys.stdin.read() if raw in (None, "-") else raw
+    tokens = [t for t in re.split(r"[,\s]+", text) if t]
+    refs, invalid = [], []
+    for token in tokens:
+        project_id, sep, task_id = token.partition(":")
+        if sep and project_id and task_id:
+            refs.append((project_id, task_id))
+        else:
+            invalid.append(token)
+    if invalid:
+        _fail("INVALID_PARAMETER", f"无法解析为 project_id:task_id: {', '.join(invalid[:5])}",
+              suggestion="格式如 --tasks <项目ID>:<任务ID>,<项目ID>:<任务ID>", exit_code=EXIT_USAGE)
+    if not refs:
+        _fail("INVALID_PARAMETER", "未提供任何任务",
+              suggestion="通过 --tasks 或 stdin 传入 project_id:task_id 列表", exit_code=EXIT_USAGE)
+    return list(dict.fromkeys(refs))
+
+
+def _run_bulk(
+    args: argparse.Namespace, command: str,
+    requests: list[tuple[tuple[str, str], str, str, object | None]],
+) -> None:
+    """并发执行 ((project_id, task_id), method, path, body) 列表，输出逐项结果与汇总。"""
+    _check_parallel(args.parallel)
+    if args.dry_run:
+        preview = []
+        for (project_id, task_id), method, path, body in requests:
+            preview.append({"projectId": project_id, "taskId": task_id,
+                            **dry_run_preview(method, path, body)})
+        output(preview, command=command, fields=args.fields,
+               extra_metadata={"dry_run": True, "total": len(preview)})
+        sys.exit(EXIT_DRYRUN)
+
+    async def run() -> list[dict]:
+        async with get_async_client(pool_size=args.parallel) as client:
+            keyed = [(f"{p}:{t}", m, path, body) for (p, t), m, path, body in requests]
+            return await gather_requests(client, keyed, args.parallel)
+
+    started = time.monotonic()
+    results = asyncio.run(run())
+    items, codes = [], []
+    for ((project_id, task_id), method, path, body), r in zip(requests, results):
+        item: dict = {"projectId": project_id, "taskId": task_id, "ok": r["ok"]}
+        if r["ok"]:
+            after_write(method, path, body, r["data"])
+            item["took_ms"] = r["took_ms"]
+        else:
+            item.update(error=r["error"], exit_code=r["exit_code"])
+        if r["retry"]["retries"]:
+            item["retries"] = r["retry"]["retries"]
+        items.append(item)
+        codes.append(r.get("exit_code", EXIT_OK))
+
+    exit_code = _aggregate_exit_code(codes)
+    failed = sum(1 for item in items if not item["ok"])
+    envelope = build_envelope(
+        items,
+        command=command,
+        took_ms=int((time.monotonic() - started) * 1000),
+        fields=args.fields,
+        extra_metadata={"total": len(items), "succeeded": len(items) - failed,
+                        "failed": failed, "parallel": args.parallel,
+                        **retry_metadata([r["retry"] for r in results])},
+    )
+    if failed:
+        envelope["success"] = False
+        envelope["error"] = {
+            "code": "PARTIAL_FAILURE" if exit_code == EXIT_PARTIAL else "ALL_FAILED",
+            "message": f"{failed}/{len(items)} 项失败，详见 data 中 ok=false 的条目",
+        }
+    emit_envelope(envelope)
+    if exit_code != EXIT_OK:
+        sys.exit(exit_code)
+
+
+def cmd_bulk_complete(args: argparse.Namespace) -> None:
+    refs = _read_task_refs(args.tasks)
+    _run_bulk(args, "bulk-complete", [
+        ((p, t), "POST", f"/project/{p}/task/{t}/complete", None) for p, t in refs
+    ])
+
+
+def cmd_bulk_delete(args: argparse.Namespace) -> None:
+    refs = _read_task_refs(args.tasks)
+    _run_bulk(args, "bulk-delete", [
+        ((p, t), "DELETE", f"/project/{p}/task/{t}", None) for p, t in refs
+    ])
+
+
+def cmd_bulk_update(args: argparse.Namespace) -> None:
+    fields = _task_update_fields(args)
+    if not fields:
+        _fail("INVALID_PARAMETER", "至少需要一个要更新的字段",
+              suggestion="使用 --title, --priority, --due-date, --tags, --status 等指定要更新的字段",
+              exit_code=EXIT_USAGE)
+    refs = _read_task_refs(args.tasks)
+    _run_bulk(args, "bulk-update", [
+        ((p, t), "POST", f"/task/{t}", {"id": t, "projectId": p, **fields}) for p, t in refs
+    ])
+
+
+# ── 查询操作 ──────────────────────────────────────────────────────────────────
+
+
+# filter-tasks 的查询计划：API 支持的条件下推到 /task/filter 请求体，其余在本地对响应单次扫描。
+# 本地谓词按开销从低到高排列，短路求值。
+
+
+def _parse_date_arg(raw: str | None, flag: str) -> datetime | None:
+    if not raw:
+        return None
+    parsed = parse_datetime(raw)
+    if parsed is None:
+        _fail("INVALID_PARAMETER", f"{flag} 不是合法日期: {raw}",
+              suggestion="使用 YYYY-MM-DD 或完整 ISO 8601，如 2026-04-05T14:30:00+0800",
+              exit_code=EXIT_USAGE)
+    return parsed
+
+
+def plan_filter(args: argparse.Namespace) -> tuple[dict, list[tuple[str, object]], list[str]]:
+    """拆分筛选条件，返回 (下推的请求体, [(本地谓词名, 谓词)], 下推的条件名)。"""
+    if args.tags and args.no_tags:
+        _fail("INVALID_PARAMETER", "--tags 与 --no-tags 不能同时使用", exit_code=EXIT_USAGE)
+    body: dict = {}
+    pushed: list[str] = []
+    if args.projects:
+        body["projectIds"] = _split_csv(args.projects)
+        pushed.append("projects")
+    if args.start_date:
+        body["startDate"] = normalize_date(args.start_date)
+        pushed.append("start_date")
+    if args.end_date:
+        body["endDate"] = normalize_date(args.end_date)
+        pushed.append("end_date")
+    if args.priority:
+        body["priority"] = _split_csv(args.priority, cast=int)
+        pushed.append("priority")
+    if args.tags:
+        body["tag"] = _split_csv(args.tags)
+        pushed.append("tags")
+    if args.status:
+        body["status"] = _split_csv(args.status, cast=int)
+        pushed.append("status")
+
+    local: list[tuple[str, object]] = []
+    if args.no_tags:
+        local.append(("no_tags", lambda t: not t.get("tags")))
+    if args.has_checklist:
+        local.append(("has_checklist", lambda t: bool(t.get("items"))))
+    due_after = _parse_date_arg(args.due_after, "--due-after")
+    due_before = _parse_date_arg(args.due_before, "--due-before")
+    if due_after or due_before:
+        def due_in_window(task: dict) -> bool:
+            due = parse_datetime(task.get("dueDate"))
+            return due is not None and not (due_after and due < due_after) \
+                and not (due_before and due >= due_before)
+        local.append(("+".join(n for n, v in (("due_after", due_after), ("due_before", due_before)) if v),
+                      due_in_window))
+    if args.text:
+        needle = args.text.casefold()
+        local.append(("text", lambda t: any(
+            needle in (t.get(k) or "").casefold() for k in ("title", "content", "desc"))))
+    return body, local, pushed
+
+
+def cmd_filter_tasks(args: argparse.Namespace) -> None:
+    body, local, pushed = plan_filter(args)
+    plan = {"pushed_down": pushed, "local": [name for name, _ in local]}
+    if not local:
+        execute("POST", "/task/filter", args, "filter-tasks", json_body=body,
+                extra_metadata={"plan": plan})
+        return
+
+    if _plan_sink.get() is not None:
+        _fail("INVALID_PARAMETER", "batch 中的 filter-tasks 不支持本地条件（--due-*/--text/--no-tags/--has-checklist）",
+              suggestion="改为直接调用 filter-tasks", exit_code=EXIT_USAGE)
+    if args.dry_run:
+        preview = {**dry_run_preview("POST", "/task/filter", body), "local_filter": plan["local"]}
+        output(preview, command="filter-tasks", extra_metadata={"dry_run": True, "plan": plan})
+        sys.exit(EXIT_DRYRUN)
+
+    resp, via_daemon, stats = send_request("POST", "/task/filter", body)
+    with trace_span("decode"):
+        tasks = handle_response(resp)
+    if not isinstance(tasks, list):
+        tasks = []
+    predicates = [pred for _, pred in local]
+    with trace_span("local_filter"):
+        matched = [t for t in tasks if all(pred(t) for pred in predicates)]
+    extra = {"plan": plan, "scanned": len(tasks), **retry_metadata([stats])}
+    if via_daemon:
+        extra["transport"] = "daemon"
+    output(matched, command="filter-tasks", took_ms=int(resp.elapsed.total_seconds() * 1000),
+           fields=args.fields, extra_metadata=extra)
+
+
+# query-completed 的窗口切分：长区间按自然日/周/月切成连续窗口并发拉取（并发数受 --parallel 限制），
+# 按窗口先后合并输出；相邻窗口共享边界时刻，边界上的任务按 ID 去重。
+
+WINDOW_UNITS = ("day", "week", "month")
+DEFAULT_WINDOW_PARALLEL = 4
+# --window auto：区间超过该天数时按月切分
+AUTO_WINDOW_DAYS = 31
+
+
+def _next_boundary(dt: datetime, unit: str) -> datetime:
+    """dt 之后的下一个窗口边界（所在时区的零点；周从周一开始，月从 1 日开始）。"""
+    day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return day + timedelta(days=1)
+    if unit == "week":
+        return day + timedelta(days=7 - day.weekday())
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def split_windows(start: datetime, end: datetime, unit: str) -> list[tuple[datetime, datetime]]:
+    """把 [start, end] 切成按自然边界对齐的连续窗口，首尾窗口按实际起止截断。"""
+    if start >= end:
+        _fail("INVALID_PARAMETER", "--start-date 必须早于 --end-date",
+              suggestion="检查区间，或用 --window none 按原样单次请求", exit_code=EXIT_USAGE)
+    windows = []
+    cursor = start
+    while cursor < end:
+        boundary = min(_next_boundary(cursor, unit), end)
+        windows.append((cursor, boundary))
+        cursor = boundary
+    return windows
+
+
+def _format_api_datetime(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+
+def _completed_sort_key(task: dict) -> tuple[bool, datetime]:
+    completed = parse_datetime(task.get("completedTime"))
+    return completed is None, completed or datetime.max.replace(tzinfo=timezone.utc)
+
+
+async def _fetch_windows(
+    requests: list[tuple[str, dict]], parallel: int, on_window
+) -> None:
+    """并发拉取各窗口，按输入顺序逐个回调 on_window(result)；后面的窗口在前面处理时继续下载。"""
+    sem = asyncio.Semaphore(parallel)
+    async with get_async_client(pool_size=parallel) as client:
+        pending = [
+            asyncio.ensure_future(_fetch_one(client, sem, key, "POST", "/task/completed", body))
+            for key, body in requests
+        ]
+        try:
+            for fut in pending:
+                on_window(await fut)
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+
+def cmd_query_completed(args: argparse.Namespace) -> None:
+    body: dict = {}
+    if args.projects:
+        body["projectIds"] = _split_csv(args.projects)
+    start = _parse_date_arg(args.start_date, "--start-date")
+    end = _parse_date_arg(args.end_date, "--end-date") or datetime.now(_DEFAULT_TZ)
+    unit = None if args.window == "none" else args.window
+    if unit is not None and start is None:
+        if unit != "auto":
+            _fail("INVALID_PARAMETER", "--window 需要同时指定 --start-date",
+                  suggestion="如 --start-date 2026-01-01 --window month", exit_code=EXIT_USAGE)
+        unit = None
+    if unit == "auto":
+        unit = "month" if end - start > timedelta(days=AUTO_WINDOW_DAYS) else None
+    if unit is not None and _plan_sink.get() is not None:
+        if args.window != "auto":
+            _fail("INVALID_PARAMETER", "batch 中的 query-completed 不支持 --window",
+                  suggestion="改为直接调用 query-completed", exit_code=EXIT_USAGE)
+        unit = None
+    if unit is None:
+        if args.start_date:
+            body["startDate"] = normalize_date(args.start_date)
+        if args.end_date:
+            body["endDate"] = normalize_date(args.end_date)
+        execute("POST", "/task/completed", args, "query-completed", json_body=body)
+        return
+
+    _check_parallel(args.parallel)
+    requests = []
+    for lo, hi in split_windows(start, end, unit):
+        window_body = {**body, "startDate": _format_api_datetime(lo), "endDate": _format_api_datetime(hi)}
+        requests.append((f"{window_body['startDate']}/{window_body['endDate']}", window_body))
+    if args.dry_run:
+        preview = {"would_call": f"POST {_API_PREFIX}/task/completed",
+                   "windows": [b for _, b in requests], "parallel": args.parallel}
+        output(preview, command="query-completed",
+               extra_metadata={"dry_run": True, "windows": {"unit": unit, "total": len(requests)}})
+        sys.exit(EXIT_DRYRUN)
+
+    # ndjson 模式每个窗口就绪（且之前的窗口都已输出）即输出其任务；json 模式汇总后一次输出
+    streaming = _output_format.get() == "ndjson"
+    projection = compile_fields(args.fields) if streaming and args.fields else None
+    started = time.monotonic()
+    seen: set[str] = set()
+    merged: list[dict] = []
+    results: list[dict] = []
+    progress = {"unit": unit, "total": len(requests), "succeeded": 0, "failed": 0,
+                "parallel": args.parallel, "duplicates": 0, "slowest_ms": 0}
+    emitted = 0
+
+    def on_window(result: dict) -> None:
+        nonlocal emitted
+        results.append(result)
+        if not result["ok"]:
+            progress["failed"] += 1
+            return
+        progress["succeeded"] += 1
+        progress["slowest_ms"] = max(progress["slowest_ms"], result["took_ms"])
+        tasks = result["data"] if isinstance(result["data"], list) else []
+        tasks.sort(key=_completed_sort_key)
+        for task in tasks:
+            task_id = task.get("id")
+            if task_id in seen:
+                progress["duplicates"] += 1
+                continue
+            seen.add(task_id)
+            if streaming:
+                _emit_line(task if projection is None else projection(task))
+                emitted += 1
+            else:
+                merged.append(task)
+
+    asyncio.run(_fetch_windows(requests, args.parallel, on_window))
+    errors = [{"window": r["key"], **r["error"], "exit_code": r["exit_code"]}
+              for r in results if not r["ok"]]
+    if errors and not progress["succeeded"]:
+        first = errors[0]
+        _fail(first["code"], f"全部 {len(requests)} 个时间窗口查询失败，首个错误: {first['message']}",
+              exit_code=first["exit_code"])
+    extra: dict = {"windows": progress, **retry_metadata([r["retry"] for r in results])}
+    if errors:
+        extra["errors"] = errors
+    took_ms = int((time.monotonic() - started) * 1000)
+    if streaming:
+        envelope = build_envelope(None, command="query-completed", took_ms=took_ms, extra_metadata=extra)
+        envelope["metadata"]["result_count"] = emitted
+        emit_envelope(envelope)
+        return
+    output(merged, command="query-completed", took_ms=took_ms, fields=args.fields, extra_metadata=extra)
+
+
+# ── 截止日期查询 ──────────────────────────────────────────────────────────────
+#
+# Open API 的 /task/filter 只能按 startDate 过滤。overdue-tasks / due-tasks
+# 并发拉取全部（或指定）项目数据，在本地按 status == 0 与 dueDate 区间过滤，
+# 只返回命中的任务（附 projectName），按截止时间升序。
+
+
+def _due_query(args: argparse.Namespace, command: str, after: str | None, before: str | None) -> None:
+    after_dt, before_dt = parse_datetime(after), parse_datetime(before)
+    for raw, parsed, flag in ((after, after_dt, "--after"), (before, before_dt, "--before")):
+        if raw and parsed is None:
+            _fail("INVALID_PARAMETER", f"{flag} 不是合法日期: {raw}",
+                  suggestion="使用 YYYY-MM-DD 或完整 ISO 8601，如 2026-04-05T14:30:00+0800",
+                  exit_code=EXIT_USAGE)
+    _check_parallel(args.parallel)
+    window = {k: v.isoformat() for k, v in (("after", after_dt), ("before", before_dt)) if v}
+    project_ids = list(dict.fromkeys(_split_csv(args.projects))) if args.projects else None
+    if args.dry_run:
+        calls = [f"GET {_API_PREFIX}/project"] if project_ids is None else []
+        calls.append(f"GET {_API_PREFIX}/project/{{projectId}}/data")
+        preview = {"would_call": calls, "projects": project_ids or ["inbox", "<list-projects 结果>"],
+                   "local_filter": {"status": 0, "dueDate": window}}
+        output(preview, command=command, extra_metadata={"dry_run": True})
+        sys.exit(EXIT_DRYRUN)
+
+    started = time.monotonic()
+    ttl, refresh = cache_policy(args)
+    results = asyncio.run(_fetch_project_data(project_ids, args.parallel, ttl, refresh))
+    projects, metadata = merge_fanout(results, key_name="projectId")
+    if not projects and metadata.get("errors"):
+        first = metadata["errors"][0]
+        _fail(first["code"], f"全部 {len(results)} 个项目获取失败，首个错误: {first['message']}",
+              exit_code=first["exit_code"])
+
+    matched: list[tuple[datetime, dict]] = []
+    scanned = 0
+    for pdata in projects:
+        project_name = (pdata.get("project") or {}).get("name", "")
+        for task in pdata.get("tasks") or []:
+            scanned += 1
+            if task.get("status") != 0:
+                continue
+            due = parse_datetime(task.get("dueDate"))
+            if due is None or (after_dt and due < after_dt) or (before_dt and due >= before_dt):
+                continue
+            matched.append((due, {**task, "projectName": project_name}))
+    matched.sort(key=lambda pair: pair[0])
+
+    metadata.pop("timings_ms", None)
+    metadata.update(window=window, scanned=scanned, project_count=len(results))
+    output(
+        [task for _, task in matched],
+        command=command,
+        took_ms=int((time.monotonic() - started) * 1000),
+        fields=args.fields,
+        extra_metadata=metadata,
+    )
+
+
+def cmd_due_tasks(args: argparse.Namespace) -> None:
+    if not args.before and not args.after:
+        _fail("INVALID_PARAMETER", "至少需要 --before 或 --after 之一",
+              suggestion="如 due-tasks --after 2026-04-06 --before 2026-04-13", exit_code=EXIT_USAGE)
+    _due_query(args, "due-tasks", args.after, args.before)
+
+
+def cmd_overdue_tasks(args: argparse.Namespace) -> None:
+    """截止时间早于今天零点（+0800）的未完成任务。"""
+    if args.as_of and parse_datetime(args.as_of) is None:
+        _fail("INVALID_PARAMETER", f"--as-of 不是合法日期: {args.as_of}",
+              suggestion="使用 YYYY-MM-DD 或完整 ISO 8601", exit_code=EXIT_USAGE)
+    today = datetime.now(_DEFAULT_TZ).date().isoformat()
+    _due_query(args, "overdue-tasks", None, args.as_of or today)
+
+
+# ── 本地副本 ──────────────────────────────────────────────────────────────────
+#
+# sync 把项目与任务同步到用户缓存目录下的 SQLite 副本（按账号区分），
+# local-query 在副本的索引列上回答 filter-tasks 的全部条件外加 dueDate、
+# 文本与标签查询，无需网络往返。
+#
+# 增量同步：Open API 没有“自某时刻以来的变更”端点，因此 sync 仍并发拉取各项目
+# 数据，但只改写 modifiedTime 变化的任务；从所有项目中消失的任务若出现在上次同步
+# 以来的已完成列表里则标记为已完成，否则从副本删除（已完成列表获取失败时暂不删除，
+# 留待下次同步）。写操作仍走 API，成功后由 after_write() 就地更新副本。
+
+_REPLICA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    account TEXT NOT NULL, id TEXT NOT NULL, name TEXT, raw TEXT NOT NULL,
+    PRIMARY KEY (account, id)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    account TEXT NOT NULL, id TEXT NOT NULL, project_id TEXT NOT NULL,
+    title TEXT, content TEXT, status INTEGER, priority INTEGER,
+    start_date TEXT, due_date TEXT, completed_time TEXT, modified_time TEXT,
+    raw TEXT NOT NULL,
+    PRIMARY KEY (account, id)
+);
+CREATE INDEX IF NOT EXISTS tasks_project ON tasks (account, project_id);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks (account, status, due_date);
+CREATE INDEX IF NOT EXISTS tasks_start ON tasks (account, status, start_date);
+CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (account, priority);
+CREATE TABLE IF NOT EXISTS task_tags (
+    account TEXT NOT NULL, task_id TEXT NOT NULL, tag TEXT NOT NULL,
+    PRIMARY KEY (account, task_id, tag)
+);
+CREATE INDEX IF NOT EXISTS task_tags_tag ON task_tags (account, tag);
+CREATE TABLE IF NOT EXISTS sync_state (
+    account TEXT PRIMARY KEY, last_sync TEXT NOT NULL,
+    completed_since TEXT, completed_until TEXT
+);
+"""
+
+# 首次同步时回溯多少天的已完成任务
+DEFAULT_COMPLETED_DAYS = 30
+
+
+def _replica_path() -> Path:
+    return _user_cache_dir() / "replica.sqlite3"
+
+
+def _replica_connect(*, create: bool) -> sqlite3.Connection | None:
+    path = _replica_path()
+    if not create and not path.exists():
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0)
+    conn.executescript(_REPLICA_SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(sync_state)")}
+    if "completed_since" not in columns:  # 旧版副本：覆盖范围未知，留空
+        with conn:
+            conn.execute("ALTER TABLE sync_state ADD COLUMN completed_since TEXT")
+            conn.execute("ALTER TABLE sync_state ADD COLUMN completed_until TEXT")
+    return conn
+
+
+def _utc_key(s: str | None) -> str | None:
+    """时间 → 可按字典序比较的 UTC 字符串（副本中的时间列统一用此格式）。"""
+    if s and len(s) == 28 and s.endswith("+0000"):  # API 返回的常见格式，免解析
+        return s[:19] + "Z"
+    dt = parse_datetime(s)
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if dt else None
+
+
+def _last_sync(conn: sqlite3.Connection, account: str) -> str | None:
+    row = conn.execute("SELECT last_sync FROM sync_state WHERE account = ?", (account,)).fetchone()
+    return row[0] if row else None
+
+
+def _completed_coverage(conn: sqlite3.Connection, account: str) -> tuple[str | None, str | None]:
+    """副本中已完成任务的连续覆盖区间 [since, until]（UTC）；未知时为 None。
+
+    副本只含首次同步回溯 --completed-days 天以来的已完成任务，更早的完成记录不在其中；
+    某次同步的 /task/completed 获取失败时 until 停在上一次成功的时刻。
+    """
+    row = conn.execute(
+        "SELECT completed_since, completed_until FROM sync_state WHERE account = ?", (account,)
+    ).fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def _upsert_task(conn: sqlite3.Connection, account: str, task: dict) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO tasks (account, id, project_id, title, content, status, priority,"
+        " start_date, due_date, completed_time, modified_time, raw)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            account, task["id"], task.get("projectId", ""), task.get("title"), task.get("content"),
+            task.get("status", 0), task.get("priority", 0), _utc_key(task.get("startDate")),
+            _utc_key(task.get("dueDate")), _utc_key(task.get("completedTime")),
+            task.get("modifiedTime"), json.dumps(task, ensure_ascii=False),
+        ),
+    )
+    conn.execute("DELETE FROM task_tags WHERE account = ? AND task_id = ?", (account, task["id"]))
+    conn.executemany(
+        "INSERT OR IGNORE INTO task_tags (account, task_id, tag) VALUES (?, ?, ?)",
+        [(account, task["id"], tag) for tag in task.get("tags") or []],
+    )
+
+
+def _delete_task(conn: sqlite3.Connection, account: str, task_id: str) -> None:
+    conn.execute("DELETE FROM tasks WHERE account = ? AND id = ?", (account, task_id))
+    conn.execute("DELETE FROM task_tags WHERE account = ? AND task_id = ?", (account, task_id))
+
+
+def _project_clause(project_ids: list[str]) -> tuple[str, list]:
+    """项目 ID 条件；'inbox' 别名匹配收集箱的真实 ID（inbox<用户ID>）。"""
+    clauses, params = [], []
+    for pid in project_ids:
+        if pid == "inbox":
+            clauses.append("project_id LIKE 'inbox%'")
+        else:
+            clauses.append("project_id = ?")
+            params.append(pid)
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+async def _fetch_for_sync(since: str, parallel: int) -> tuple[list[dict], dict]:
+    async with get_async_client(pool_size=parallel) as client:
+        project_ids = await _list_project_ids(client, None, False)
+        requests = [(pid, "GET", f"/project/{pid}/data", None) for pid in project_ids]
+        requests.append(("__completed__", "POST", "/task/completed", {"startDate": since}))
+        results = await gather_requests(client, requests, parallel)
+    return results[:-1], results[-1]
+
+
+def cmd_sync(args: argparse.Namespace) -> None:
+    _check_parallel(args.parallel)
+    conn = _replica_connect(create=not args.dry_run)
+    account = _token_fingerprint()
+    last_sync = None if conn is None or args.full else _last_sync(conn, account)
+    coverage = _completed_coverage(conn, account) if last_sync else (None, None)
+    now = datetime.now(timezone.utc)
+    # 增量同步从上次成功获取已完成列表的时刻接着取，失败过的时段会被补上
+    resume_from = coverage[1] or last_sync
+    since_dt = (
+        parse_datetime(resume_from) - timedelta(minutes=5)  # 留出时钟偏差余量
+        if resume_from else now - timedelta(days=args.completed_days)
+    )
+    since = since_dt.strftime("%Y-%m-%dT%H:%M:%S+0000")
+    if args.dry_run:
+        preview = {
+            "would_call": [f"GET {_API_PREFIX}/project", f"GET {_API_PREFIX}/project/{{projectId}}/data",
+                           f"POST {_API_PREFIX}/task/completed"],
+            "mode": "full" if last_sync is None else "incremental",
+            "completed_since": since,
+            "replica": str(_replica_path()),
+        }
+        output(preview, command="sync", extra_metadata={"dry_run": True})
+        sys.exit(EXIT_DRYRUN)
+
+    started = time.monotonic()
+    results, completed = asyncio.run(_fetch_for_sync(since, args.parallel))
+    projects, metadata = merge_fanout(results, key_name="projectId")
+    if not projects and metadata.get("errors"):
+        first = metadata["errors"][0]
+        _fail(first["code"], f"全部 {len(results)} 个项目获取失败，首个错误: {first['message']}",
+              exit_code=first["exit_code"])
+    completed_ok = completed["ok"] and isinstance(completed["data"], list)
+    completed_by_id = {t["id"]: t for t in completed["data"]} if completed_ok else {}
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "completed": 0, "removed": 0}
+    kept_stale = 0
+    with conn:
+        if args.full:
+            for table in ("tasks", "task_tags", "projects"):
+                conn.execute(f"DELETE FROM {table} WHERE account = ?", (account,))
+        known = {
+            row[0]: (row[1], row[2], row[3]) for row in conn.execute(
+                "SELECT id, modified_time, status, project_id FROM tasks WHERE account = ?", (account,))
+        }
+        # 先写入全部项目的任务并汇总 ID：任务可能在项目间移动，只有看完所有项目
+        # 才能判断它是否真的从副本中消失
+        fetched = set()
+        for pdata in projects:
+            project = pdata.get("project")
+            if project and project.get("id"):
+                conn.execute(
+                    "INSERT OR REPLACE INTO projects (account, id, name, raw) VALUES (?, ?, ?, ?)",
+                    (account, project["id"], project.get("name"), json.dumps(project, ensure_ascii=False)),
+                )
+            for task in pdata.get("tasks") or []:
+                fetched.add(task["id"])
+                completed_by_id.pop(task["id"], None)  # 仍在项目中（如已重新打开）
+                prev = known.get(task["id"])
+                if prev == (task.get("modifiedTime"), task.get("status", 0), task.get("projectId", "")):
+                    counts["unchanged"] += 1
+                    continue
+                _upsert_task(conn, account, task)
+                counts["updated" if prev else "inserted"] += 1
+        # 副本中仍未完成、但本次未出现在任何项目里的任务：已完成或已删除。
+        # 已完成列表获取失败时无法区分两者，保留这些任务等下次同步再判断
+        for pdata in projects:
+            clause, params = _project_clause([pdata["projectId"]])
+            stale = conn.execute(
+                f"SELECT id FROM tasks WHERE account = ? AND status = 0 AND {clause}",
+                [account, *params],
+            ).fetchall()
+            for (task_id,) in stale:
+                if task_id in fetched:
+                    continue
+                if task_id in completed_by_id:
+                    _upsert_task(conn, account, completed_by_id.pop(task_id))
+                    counts["completed"] += 1
+                elif completed_ok:
+                    _delete_task(conn, account, task_id)
+                    counts["removed"] += 1
+                else:
+                    kept_stale += 1
+        for task in completed_by_id.values():
+            if known.get(task["id"]) != (task.get("modifiedTime"), task.get("status", 2),
+                                         task.get("projectId", "")):
+                _upsert_task(conn, account, task)
+                counts["completed"] += 1
+        # 未能获取的项目不动其任务；已不存在的项目从副本移除
+        live = {p["projectId"] for p in projects} | {e["projectId"] for e in metadata.get("errors", [])}
+        live_real = {(p.get("project") or {}).get("id") for p in projects}
+        for (pid,) in conn.execute("SELECT id FROM projects WHERE account = ?", (account,)).fetchall():
+            if pid not in live and pid not in live_real:
+                conn.execute("DELETE FROM projects WHERE account = ? AND id = ?", (account, pid))
+        now_key = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+        if completed_ok:
+            coverage = (coverage[0] or since_dt.strftime("%Y-%m-%dT%H:%M:%SZ"), now_key)
+        conn.execute(
+            "INSERT OR REPLACE INTO sync_state (account, last_sync, completed_since, completed_until)"
+            " VALUES (?, ?, ?, ?)",
+            (account, now_key, *coverage),
+        )
+        total = conn.execute("SELECT COUNT(*) FROM tasks WHERE account = ?", (account,)).fetchone()[0]
+    conn.close()
+
+    metadata.pop("timings_ms", None)
+    if not completed["ok"]:
+        metadata.setdefault("errors", []).append(
+            {"projectId": None, **completed["error"], "exit_code": completed["exit_code"]})
+    if kept_stale:
+        metadata["stale_kept"] = kept_stale
+    output(
+        {"mode": "full" if last_sync is None else "incremental", "tasks": counts,
+         "task_total": total, "project_count": len(projects), "last_sync": now.isoformat()},
+        command="sync",
+        took_ms=int((time.monotonic() - started) * 1000),
+        fields=args.fields,
+        extra_metadata=metadata,
+    )
+
+
+def cmd_local_query(args: argparse.Namespace) -> None:
+    conn = _replica_connect(create=False)
+    account = _token_fingerprint()
+    last_sync = _last_sync(conn, account) if conn is not None else None
+    if last_sync is None:
+        _fail("REPLICA_MISSING", "本地副本不存在或尚未同步",
+              suggestion="先执行 sync 建立本地副本", exit_code=EXIT_NOT_FOUND)
+    if args.dry_run:
+        output({"would_query": str(_replica_path())}, command="local-query",
+               extra_metadata={"dry_run": True})
+        sys.exit(EXIT_DRYRUN)
+
+    where, params = ["account = ?"], [account]
+    if args.projects:
+        clause, project_params = _project_clause(_split_csv(args.projects))
+        where.append(clause)
+        params += project_params
+    for column, op, raw in (
+        ("start_date", ">=", args.start_date), ("start_date", "<=", args.end_date),
+        ("due_date", ">=", args.due_after), ("due_date", "<", args.due_before),
+    ):
+        if raw:
+            key = _utc_key(raw)
+            if key is None:
+                _fail("INVALID_PARAMETER", f"不是合法日期: {raw}",
+                      suggestion="使用 YYYY-MM-DD 或完整 ISO 8601", exit_code=EXIT_USAGE)
+            where.append(f"{column} {op} ?")
+            params.append(key)
+    for column, raw in (("priority", args.priority), ("status", args.status)):
+        if raw:
+            values = _split_csv(raw, cast=int)
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params += values
+    for tag in _split_csv(args.tags) if args.tags else []:
+        where.append(
+            "EXISTS (SELECT 1 FROM task_tags g WHERE g.account = tasks.account"
+            " AND g.task_id = tasks.id AND g.tag = ?)"
+        )
+        params.append(tag)
+    if args.text:
+        pattern = "%" + re.sub(r"([%_\\])", r"\\\1", args.text) + "%"
+        where.append("(title LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\')")
+        params += [pattern, pattern]
+    sql = (
+        f"SELECT raw FROM tasks WHERE {' AND '.join(where)}"
+        " ORDER BY due_date IS NULL, due_date, id"
+    )
+    if args.limit:
+        sql += f" LIMIT {int(args.limit)}"
+
+    started = time.perf_counter()
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    age_s = int((datetime.now(timezone.utc) - parse_datetime(last_sync)).total_seconds())
+    output(
+        [json.loads(raw) for (raw,) in rows],
+        command="local-query",
+        took_ms=int((time.perf_counter() - started) * 1000),
+        fields=args.fields,
+        extra_metadata={"source": "replica", "replica_age_s": age_s},
+    )
+
+
+def replica_apply_write(method: str, path: str, body: object | None, data: object) -> None:
+    """写操作成功后就地更新本地副本（副本不存在或未同步时跳过）。"""
+    conn = _replica_connect(create=False)
+    if conn is None:
+        return
+    account = _token_fingerprint()
+    parts = path.strip("/").split("/")
+
+    def load(task_id: str) -> dict | None:
+        row = conn.execute(
+            "SELECT raw FROM tasks WHERE account = ? AND id = ?", (account, task_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    if _last_sync(conn, account) is None:
+        conn.close()
+        return
+    with conn:
+        if parts[0] == "task" and len(parts) <= 2 and isinstance(data, dict) and data.get("id"):
+            _upsert_task(conn, account, data)  # create-task / update-task 返回完整任务
+        elif path == "/task/move" and isinstance(body, list):
+            for move in body:
+                task = load(move["taskId"])
+                if task is not None:
+                    _upsert_task(conn, account, {**task, "projectId": move["toProjectId"]})
+        elif parts[0] == "project" and len(parts) >= 4 and parts[2] == "task":
+            if method == "DELETE":
+                _delete_task(conn, account, parts[3])
+            elif parts[-1] == "complete" and (task := load(parts[3])) is not None:
+                completed_time = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+                _upsert_task(conn, account, {**task, "status": 2, "completedTime": completed_time})
+        elif parts[0] == "project" and len(parts) <= 2:
+            if method == "DELETE" and len(parts) == 2:
+                conn.execute("DELETE FROM projects WHERE account = ? AND id = ?", (account, parts[1]))
+                for (task_id,) in conn.execute(
+                    "SELECT id FROM tasks WHERE account = ? AND project_id = ?", (account, parts[1])
+                ).fetchall():
+                    _delete_task(conn, account, task_id)
+            elif isinstance(data, dict) and data.get("id"):
+                conn.execute(
+                    "INSERT OR REPLACE INTO projects (account, id, name, raw) VALUES (?, ?, ?, ?)",
+                    (account, data["id"], data.get("name"), json.dumps(data, ensure_ascii=False)),
+                )
+    conn.close()
+
+
+def after_write(method: str, path: str, body: object | None, data: object) -> None:
+    """写操作成功后的本地状态维护：失效读缓存、就地更新副本。"""
+    if method == "GET" or path in _READONLY_POSTS:
+        return
+    invalidate_after_write(method, path, body)
+    replica_apply_write(method, path, body, data)
+
+
+# ── 统计聚合 ──────────────────────────────────────────────────────────────────
+#
+# stats 在 CLI 内计算复盘所需的汇总（完成数、完成率、逾期数、优先级分布、按项目/标签/日
+# 的分布），只输出几百字节的摘要而不是全部任务。聚合统一用 SQL 在列上完成：
+# 数据源为本地副本时直接查询副本；为 API 时把拉取（或读缓存）到的任务按列批量
+# 写入内存 SQLite，再执行同一组查询。
+
+STATS_SOURCES = ("auto", "replica", "api")
+# 未给 --start-date 时统计最近多少天（含今天）
+DEFAULT_STATS_DAYS = 7
+
+
+def _load_stats_tables(projects: list[dict], completed: list[dict]) -> sqlite3.Connection:
+    """把 API 数据按列批量写入内存副本（account 为空串），供 aggregate_stats 查询。"""
+    conn = sqlite3.connect(":memory:")
+    # 聚合查询本就全表扫描，内存库不建二级索引，省去写入时的索引维护
+    conn.executescript("\n".join(
+        line for line in _REPLICA_SCHEMA.splitlines() if not line.startswith("CREATE INDEX")))
+    tasks = {t["id"]: t for pdata in projects for t in pdata.get("tasks") or []}
+    tasks.update((t["id"], t) for t in completed)
+    conn.executemany(
+        "INSERT INTO projects (account, id, name, raw) VALUES ('', ?, ?, '')",
+        [(p["project"]["id"], p["project"].get("name")) for p in projects
+         if (p.get("project") or {}).get("id")],
+    )
+    conn.executemany(
+        "INSERT INTO tasks (account, id, project_id, status, priority, due_date, completed_time, raw)"
+        " VALUES ('', ?, ?, ?, ?, ?, ?, '')",
+        [(t["id"], t.get("projectId", ""), t.get("status", 0), t.get("priority", 0),
+          _utc_key(t.get("dueDate")), _utc_key(t.get("completedTime"))) for t in tasks.values()],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO task_tags (account, task_id, tag) VALUES ('', ?, ?)",
+        [(t["id"], tag) for t in tasks.values() for tag in t.get("tags") or []],
+    )
+    return conn
+
+
+def aggregate_stats(
+    conn: sqlite3.Connection, account: str, start: datetime, end: datetime, as_of: datetime,
+    project_ids: list[str] | None,
+) -> dict:
+    """在副本表上计算统计摘要：未完成任务取当前状态，完成数取 [start, end) 内完成的任务。"""
+    start_key, end_key = _utc_key(start.isoformat()), _utc_key(end.isoformat())
+    where = ["t.account = ?", "(t.status = 0 OR (t.status = 2 AND t.completed_time >= ?"
+             " AND t.completed_time < ?))"]
+    params: list = [account, start_key, end_key]
+    if project_ids:
+        clause, project_params = _project_clause(project_ids)
+        where.append(clause)
+        params += project_params
+    scope = " AND ".join(where)
+    counts = "SUM(t.status = 0), SUM(t.status = 2), SUM(t.status = 0 AND t.due_date < ?)"
+    as_of_key = _utc_key(as_of.isoformat())
+
+    open_, completed, overdue = conn.execute(
+        f"SELECT {counts} FROM tasks t WHERE {scope}", [as_of_key, *params]).fetchone()
+    open_, completed, overdue = open_ or 0, completed or 0, overdue or 0
+    priority = dict(conn.execute(
+        f"SELECT CAST(t.priority AS TEXT), COUNT(*) FROM tasks t WHERE {scope} AND t.status = 0"
+        " GROUP BY t.priority ORDER BY t.priority", params).fetchall())
+    projects = [
+        {"id": pid, "name": name or ("收集箱" if pid.startswith("inbox") else None),
+         "open": o, "completed": c, "overdue": d}
+        for pid, name, o, c, d in conn.execute(
+            f"SELECT t.project_id, p.name, {counts} FROM tasks t LEFT JOIN projects p"
+            " ON p.account = t.account AND p.id = t.project_id"
+            f" WHERE {scope} GROUP BY t.project_id ORDER BY 4 DESC, 3 DESC, t.project_id",
+            [as_of_key, *params])
+    ]
+    tags = {
+        tag: {"open": o, "completed": c}
+        for tag, o, c, _ in conn.execute(
+            f"SELECT g.tag, {counts} FROM task_tags g JOIN tasks t"
+            " ON t.account = g.account AND t.id = g.task_id"
+            f" WHERE {scope} GROUP BY g.tag ORDER BY 3 DESC, 2 DESC, g.tag",
+            [as_of_key, *params])
+    }
+    # 按本地时区的自然日计数，输出从起始日起的稠密数组
+    offset = f"{int(_DEFAULT_TZ.utcoffset(None).total_seconds())} seconds"
+    by_day = dict(conn.execute(
+        f"SELECT date(t.completed_time, ?), COUNT(*) FROM tasks t WHERE {scope} AND t.status = 2"
+        " GROUP BY 1", [offset, *params]).fetchall())
+    first_day = start.astimezone(_DEFAULT_TZ).date()
+    last_day = (end - timedelta(microseconds=1)).astimezone(_DEFAULT_TZ).date()
+    per_day = [by_day.get((first_day + timedelta(days=i)).isoformat(), 0)
+               for i in range((last_day - first_day).days + 1)]
+    return {
+        "range": {"start": start.isoformat(), "end": end.isoformat()},
+        "as_of": as_of.isoformat(),
+        "totals": {"open": open_, "completed": completed, "overdue": overdue,
+                   "completion_rate": round(completed / (open_ + completed), 3) if open_ + completed else None},
+        "priority": priority,
+        "projects": projects,
+        "tags": tags,
+        "per_day": {"start": first_day.isoformat(), "completed": per_day},
+    }
+
+
+async def _fetch_for_stats(
+    project_ids: list[str] | None, windows: list[tuple[str, dict]], parallel: int,
+    ttl: int | None, refresh: bool,
+) -> tuple[list[dict], list[dict]]:
+    """并发拉取项目数据（未完成任务，可读缓存）与各时间窗口的已完成任务。"""
+    completed: list[dict] = []
+    projects, _ = await asyncio.gather(
+        _fetch_project_data(project_ids, parallel, ttl, refresh),
+        _fetch_windows(windows, min(parallel, DEFAULT_WINDOW_PARALLEL), completed.append),
+    )
+    return projects, completed
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    now = datetime.now(_DEFAULT_TZ)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    start = _parse_date_arg(args.start_date, "--start-date") or today - timedelta(days=DEFAULT_STATS_DAYS - 1)
+    end = _parse_date_arg(args.end_date, "--end-date") or now
+    as_of = _parse_date_arg(args.as_of, "--as-of") or today
+    if start >= end:
+        _fail("INVALID_PARAMETER", "--start-date 必须早于 --end-date", exit_code=EXIT_USAGE)
+    _check_parallel(args.parallel)
+    project_ids = list(dict.fromkeys(_split_csv(args.projects))) if args.projects else None
+
+    source = args.source
+    conn = _replica_connect(create=False) if source != "api" else None
+    account = _token_fingerprint()
+    last_sync = _last_sync(conn, account) if conn is not None else None
+    if source == "replica" and last_sync is None:
+        _fail("REPLICA_MISSING", "本地副本不存在或尚未同步",
+              suggestion="先执行 sync 建立本地副本，或改用 --source api", exit_code=EXIT_NOT_FOUND)
+    covered = False
+    if last_sync is not None:
+        # 副本的已完成任务须覆盖整个统计区间（截至上次同步），否则完成数会偏少
+        since, until = _completed_coverage(conn, account)
+        covered = (
+            since is not None and until is not None and parse_datetime(since) <= start
+            and parse_datetime(until) >= min(end, parse_datetime(last_sync))
+        )
+        if source == "replica" and not covered:
+            _fail("INVALID_PARAMETER",
+                  f"本地副本的已完成任务只覆盖 {since or '未知'} 至 {until or '未知'}，不足以统计所给区间",
+                  suggestion="改用 --source api，或执行 sync --full --completed-days <N> 扩大覆盖范围",
+                  exit_code=EXIT_USAGE)
+    if source == "auto":
+        source = "replica" if covered else "api"
+    if source == "api" and conn is not None:
+        conn.close()
+
+    unit = "month" if end - start > timedelta(days=AUTO_WINDOW_DAYS) else None
+    spans = split_windows(start, end, unit) if unit else [(start, end)]
+    windows = []
+    for lo, hi in spans:
+        body = {"startDate": _format_api_datetime(lo), "endDate": _format_api_datetime(hi)}
+        if project_ids:
+            body["projectIds"] = project_ids
+        windows.append((f"{body['startDate']}/{body['endDate']}", body))
+    if args.dry_run:
+        preview: dict = {"source": source}
+        if source == "replica":
+            preview["would_query"] = str(_replica_path())
+        else:
+            preview["would_call"] = ([f"GET {_API_PREFIX}/project"] if project_ids is None else []) + [
+                f"GET {_API_PREFIX}/project/{{projectId}}/data", f"POST {_API_PREFIX}/task/completed"]
+            preview["completed_windows"] = len(windows)
+        output(preview, command="stats", extra_metadata={"dry_run": True})
+        sys.exit(EXIT_DRYRUN)
+
+    started = time.monotonic()
+    metadata: dict = {"source": source}
+    if source == "replica":
+        metadata["replica_age_s"] = int((datetime.now(timezone.utc) - parse_datetime(last_sync)).total_seconds())
+        account_key = account
+    else:
+        ttl, refresh = cache_policy(args)
+        results, completed = asyncio.run(_fetch_for_stats(project_ids, windows, args.parallel, ttl, refresh))
+        projects, metadata = merge_fanout(results, key_name="projectId")
+        if not projects and metadata.get("errors"):
+            first = metadata["errors"][0]
+            _fail(first["code"], f"全部 {len(results)} 个项目获取失败，首个错误: {first['message']}",
+                  exit_code=first["exit_code"])
+        metadata.pop("timings_ms", None)
+        metadata["source"] = "api"
+        for r in completed:
+            if not r["ok"]:
+                metadata.setdefault("errors", []).append(
+                    {"window": r["key"], **r["error"], "exit_code": r["exit_code"]})
+        with trace_span("load"):
+            conn = _load_stats_tables(
+                projects, [t for r in completed if r["ok"] and isinstance(r["data"], list) for t in r["data"]])
+        account_key = ""
+    aggregate_started = time.perf_counter()
+    with trace_span("aggregate"):
+        summary = aggregate_stats(conn, account_key, start, end, as_of, project_ids)
+    conn.close()
+    metadata["aggregate_ms"] = round((time.perf_counter() - aggregate_started) * 1000, 1)
+    output(summary, command="stats", took_ms=int((time.monotonic() - started) * 1000),
+           fields=args.fields, extra_metadata=metadata)
+
+
+# ── 变更流 ────────────────────────────────────────────────────────────────────
+#
+# changes-since 在用户缓存目录下维护一份按任务 ID 索引的快照（modifiedTime + status）
+# 与一条递增序号的变更日志。每次调用拉取当前状态与快照比对，把新增/修改/完成/删除
+# 追加到日志，再返回游标之后的变更（同一任务合并为一条）与新游标。
+# /task/completed 获取失败时无法区分完成与删除：本次不推断删除，也不前移已完成
+# 列表的获取进度，下次调用补上。
+#
+# 游标形如 <代号>-<序号>：代号在快照重建时变化，旧游标随之失效；日志只保留最近
+# DEFAULT_CHANGE_RETENTION_DAYS 天。特殊游标 0 返回快照中的全部任务，now 只刷新快照。
+# 快照独立于本地副本：副本会被本 CLI 的写操作就地更新，快照不会，因此本进程自己的
+# 写入同样出现在变更流里。
+
+_CHANGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot (
+    account TEXT NOT NULL, id TEXT NOT NULL, project_id TEXT NOT NULL,
+    modified_time TEXT, status INTEGER, raw TEXT NOT NULL,
+    PRIMARY KEY (account, id)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    account TEXT NOT NULL, seq INTEGER NOT NULL, task_id TEXT NOT NULL, kind TEXT NOT NULL,
+    raw TEXT, at TEXT NOT NULL,
+    PRIMARY KEY (account, seq)
+);
+CREATE TABLE IF NOT EXISTS change_state (
+    account TEXT PRIMARY KEY, generation TEXT NOT NULL, seq INTEGER NOT NULL, last_poll TEXT NOT NULL
+);
+"""
+
+DEFAULT_CHANGE_RETENTION_DAYS = 30
+CHANGE_KINDS = ("created", "updated", "completed", "deleted")
+
+
+def _changes_path() -> Path:
+    return _user_cache_dir() / "changes.sqlite3"
+
+
+def _parse_cursor(raw: str) -> tuple[str | None, int]:
+    """游标 → (代号, 序号)；0 → (None, 0)。"""
+    if raw == "0":
+        return None, 0
+    generation, sep, seq = raw.rpartition("-")
+    if not sep or not generation or not seq.isdigit():
+        _fail("INVALID_PARAMETER", f"无法识别的游标: {raw}",
+              suggestion="传入上次返回的 metadata.cursor；0 获取全部任务，now 只建立基线",
+              exit_code=EXIT_USAGE)
+    return generation, int(seq)
+
+
+def diff_snapshot(
+    conn: sqlite3.Connection, account: str, projects: list[dict], completed: dict[str, dict],
+    failed_projects: set[str], *, infer_deletions: bool = True,
+) -> list[tuple[str, str, dict | None]]:
+    """比对拉取结果与快照并更新快照，返回 [(任务 ID, 变更类型, 任务或 None)]。
+
+    infer_deletions 为 False 时（已完成列表获取失败，无法区分完成与删除）不推断删除，
+    消失的任务留在快照中等下次比对。
+    """
+    known = {
+        row[0]: (row[1], row[2], row[3]) for row in conn.execute(
+            "SELECT id, modified_time, status, project_id FROM snapshot WHERE account = ?", (account,))
+    }
+    seen: set[str] = set()
+    changes: list[tuple[str, str, dict | None]] = []
+
+    def record(task: dict) -> None:
+        prev = known.get(task["id"])
+        status = task.get("status", 0)
+        if prev is not None and prev[:2] == (task.get("modifiedTime"), status):
+            return
+        if prev is None:
+            kind = "created" if status == 0 else "completed"
+        else:
+            kind = "completed" if status == 2 and prev[1] != 2 else "updated"
+        changes.append((task["id"], kind, task))
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshot (account, id, project_id, modified_time, status, raw)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (account, task["id"], task.get("projectId", ""), task.get("modifiedTime"), status,
+             json.dumps(task, ensure_ascii=False)),
+        )
+
+    for pdata in projects:
+        for task in pdata.get("tasks") or []:
+            seen.add(task["id"])
+            completed.pop(task["id"], None)  # 仍在项目中（如已重新打开）
+            record(task)
+    for task in completed.values():
+        seen.add(task["id"])
+        record(task)
+    if not infer_deletions:
+        return changes
+    # 快照中未完成、本次未出现（且所在项目已成功拉取）的任务视为删除
+    for task_id, (_, status, project_id) in known.items():
+        if task_id in seen or status != 0 or project_id in failed_projects:
+            continue
+        if project_id.startswith("inbox") and "inbox" in failed_projects:
+            continue
+        changes.append((task_id, "deleted", None))
+        conn.execute("DELETE FROM snapshot WHERE account = ? AND id = ?", (account, task_id))
+    return changes
+
+
+def _collapse_changes(rows: list[tuple[str, str, str | None]]) -> list[dict]:
+    """按序号顺序的 (任务 ID, 类型, raw) 合并为每个任务一条：游标后新建的保持 created，
+    新建后又删除的不输出，其余取最后一次变更。"""
+    merged: dict[str, tuple[str, str | None]] = {}
+    for task_id, kind, raw in rows:
+        first = merged.pop(task_id, None)
+        if first is not None and first[0] == "created":
+            if kind == "deleted":
+                continue
+            kind = "created"
+        merged[task_id] = (kind, raw)
+    return [
+        {"change": kind, **json.loads(raw)} if raw else {"change": kind, "id": task_id}
+        for task_id, (kind, raw) in merged.items()
+    ]
+
+
+def cmd_changes_since(args: argparse.Namespace) -> None:
+    _check_parallel(args.parallel)
+    baseline_only = args.cursor == "now"
+    generation, since_seq = (None, 0) if baseline_only else _parse_cursor(args.cursor)
+    account = _token_fingerprint()
+    if args.dry_run:
+        preview = {
+            "would_call": [f"GET {_API_PREFIX}/project", f"GET {_API_PREFIX}/project/{{projectId}}/data",
+                           f"POST {_API_PREFIX}/task/completed"],
+            "snapshot": str(_changes_path()),
+        }
+        output(preview, command="changes-since", extra_metadata={"dry_run": True})
+        sys.exit(EXIT_DRYRUN)
+
+    path = _changes_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0)
+    conn.executescript(_CHANGES_SCHEMA)
+    state = conn.execute(
+        "SELECT generation, seq, last_poll FROM change_state WHERE account = ?", (account,)).fetchone()
+    if generation is not None and (state is None or state[0] != generation or since_seq > state[1]):
+        conn.close()
+        _fail("CURSOR_INVALID", "游标与本地快照不匹配（快照已重建或游标来自其他账号）",
+              suggestion="用 0 重新获取全部任务，或用 now 建立新基线", exit_code=EXIT_USAGE)
+    now = datetime.now(timezone.utc)
+    if generation is not None:
+        oldest = conn.execute("SELECT MIN(seq) FROM changes WHERE account = ?", (account,)).fetchone()[0]
+        if oldest is not None and since_seq < oldest - 1:
+            conn.close()
+            _fail("CURSOR_EXPIRED", f"游标早于保留的变更日志（{DEFAULT_CHANGE_RETENTION_DAYS} 天）",
+                  suggestion="用 0 重新获取全部任务，或用 now 建立新基线", exit_code=EXIT_USAGE)
+
+    started = time.monotonic()
+    since_dt = (parse_datetime(state[2]) - timedelta(minutes=5) if state
+                else now - timedelta(days=args.completed_days))
+    results, completed = asyncio.run(_fetch_for_sync(since_dt.strftime("%Y-%m-%dT%H:%M:%S+0000"),
+                                                     args.parallel))
+    projects, metadata = merge_fanout(results, key_name="projectId")
+    if not projects and metadata.get("errors"):
+        conn.close()
+        first = metadata["errors"][0]
+        _fail(first["code"], f"全部 {len(results)} 个项目获取失败，首个错误: {first['message']}",
+              exit_code=first["exit_code"])
+    completed_ok = completed["ok"] and isinstance(completed["data"], list)
+    completed_by_id = {t["id"]: t for t in completed["data"]} if completed_ok else {}
+    failed = {e["projectId"] for e in metadata.get("errors", [])}
+
+    at = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    # last_poll 是已完成列表的获取进度：获取失败时不前移，下次从原处补取这段时间的完成记录
+    last_poll = at if completed_ok else (state[2] if state else since_dt.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    with conn:
+        first_poll = state is None
+        current, seq = (os.urandom(4).hex(), 0) if first_poll else state[:2]
+        found = diff_snapshot(conn, account, projects, completed_by_id, failed,
+                              infer_deletions=completed_ok)
+        if not first_poll:  # 首次建立快照不记日志：游标 0 直接读快照
+            conn.executemany(
+                "INSERT INTO changes (account, seq, task_id, kind, raw, at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(account, seq + i, task_id, kind, json.dumps(task, ensure_ascii=False) if task else None, at)
+                 for i, (task_id, kind, task) in enumerate(found, 1)],
+            )
+            seq += len(found)
+        conn.execute(
+            "INSERT OR REPLACE INTO change_state (account, generation, seq, last_poll) VALUES (?, ?, ?, ?)",
+            (account, current, seq, last_poll),
+        )
+        cutoff = (now - timedelta(days=DEFAULT_CHANGE_RETENTION_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        conn.execute("DELETE FROM changes WHERE account = ? AND at < ?", (account, cutoff))
+
+        if baseline_only:
+            data: list[dict] = []
+        elif generation is None:
+            data = [{"change": "created" if status == 0 else "completed", **json.loads(raw)}
+                    for raw, status in conn.execute(
+                        "SELECT raw, status FROM snapshot WHERE account = ? ORDER BY project_id, id",
+                        (account,))]
+        else:
+            data = _collapse_changes(conn.execute(
+                "SELECT task_id, kind, raw FROM changes WHERE account = ? AND seq > ? ORDER BY seq",
+                (account, since_seq)).fetchall())
+    conn.close()
+
+    metadata.pop("timings_ms", None)
+    if not completed["ok"]:
+        metadata.setdefault("errors", []).append(
+            {"projectId": None, **completed["error"], "exit_code": completed["exit_code"]})
+    if not completed_ok:
+        metadata["deletions_skipped"] = True
+    counts = dict.fromkeys(CHANGE_KINDS, 0)
+    for item in data:
+        counts[item["change"]] += 1
+    metadata.update(cursor=f"{current}-{seq}", since=args.cursor, changes=counts)
+    output(data, command="changes-since", took_ms=int((time.monotonic() - started) * 1000),
+           fields=args.fields, extra_metadata=metadata)
+
+
+# ── 批量执行 ──────────────────────────────────────────────────────────────────
+#
+# batch 从 JSONL 读取 {"command": ..., "args": ...}，逐行复用对应子命令的
+# argparse 定义与 cmd_* 构造器规划出请求（不发请求），再在一个共享连接池上
+# 以有限并发执行，每完成一项即输出一行结果信封，最后输出一行汇总。
+
+DEFAULT_BATCH_CONCURRENCY = 8
+_BATCH_EXCLUDED = {
+    "batch", "serve", "schema", "due-tasks", "overdue-tasks", "sync", "local-query", "stats",
+    "changes-since", "bulk-complete", "bulk-delete", "bulk-update",
+}
+# 每行可用的字段：dry_run / fields 为该项的 --dry-run / --fields（与 args 中的写法等价）
+_BATCH_ITEM_KEYS = {"command", "args", "dry_run", "fields"}
+
+
+def _batch_argv(sp: argparse.ArgumentParser, item_args: object) -> list[str]:
+    """把 JSONL 中的 args 转为 argv。
+
+    支持两种写法：
+      - list：原样作为 argv，如 ["<项目ID>", "<任务ID>", "--dry-run"]
+      - dict：key 为参数 dest 或选项名（project_id / due_date / "due-date" 均可），
+        位置参数按定义顺序排列；true → 开关，false → --no-xxx（仅三态开关），null 忽略
+    """
+    if item_args is None:
+        return []
+    if isinstance(item_args, list):
+        return [str(a) for a in item_args]
+    if not isinstance(item_args, dict):
+        _fail("INVALID_PARAMETER", "args 必须是对象或数组", exit_code=EXIT_USAGE)
+    remaining = {str(k).lstrip("-").replace("-", "_"): v for k, v in item_args.items()}
+    positionals: list[str] = []
+    optionals: list[str] = []
+    for action in sp._actions:
+        if action.dest == "help" or action.dest not in remaining:
+            continue
+        value = remaining.pop(action.dest)
+        if value is None:
+            continue
+        if not action.option_strings:
+            positionals.append(str(value))
+        elif isinstance(action, argparse.BooleanOptionalAction):
+            optionals.append(action.option_strings[0 if value else 1])
+        elif isinstance(action, argparse._StoreTrueAction):
+            if value:
+                optionals.append(action.option_strings[0])
+        else:
+            if isinstance(value, list):
+                value = ",".join(str(v) for v in value)
+            optionals.extend([action.option_strings[0], str(value)])
+    if remaining:
+        _fail("INVALID_PARAMETER", f"未知参数: {', '.join(sorted(remaining))}",
+              suggestion="用 schema <子命令> 查看可用参数", exit_code=EXIT_USAGE)
+    return positionals + optionals
+
+
+def _plan_batch_item(
+    item: object, subparsers: dict[str, argparse.ArgumentParser], defaults: argparse.Namespace
+) -> dict:
+    """解析并校验一条 batch 输入，返回 execute() 记录下的请求描述。"""
+    if not isinstance(item, dict) or "command" not in item:
+        _fail("INVALID_PARAMETER", "每行必须是形如 {\"command\": ..., \"args\": ...} 的对象",
+              exit_code=EXIT_USAGE)
+    unknown = sorted(set(item) - _BATCH_ITEM_KEYS)
+    if unknown:
+        _fail("INVALID_PARAMETER", f"未知的字段: {', '.join(unknown)}",
+              suggestion=f"每行只接受 {', '.join(sorted(_BATCH_ITEM_KEYS))}", exit_code=EXIT_USAGE)
+    if not isinstance(item.get("dry_run", False), bool):
+        _fail("INVALID_PARAMETER", "dry_run 必须是布尔值", exit_code=EXIT_USAGE)
+    if not isinstance(item.get("fields") or "", str):
+        _fail("INVALID_PARAMETER", "fields 必须是逗号分隔的字符串", exit_code=EXIT_USAGE)
+    command = item["command"]
+    if command not in COMMAND_MAP or command in _BATCH_EXCLUDED:
+        available = sorted(set(COMMAND_MAP) - _BATCH_EXCLUDED)
+        _fail("UNKNOWN_COMMAND", f"batch 不支持子命令 '{command}'",
+              suggestion=f"可用命令: {', '.join(available)}", exit_code=EXIT_USAGE)
+    sp = subparsers[command]
+    argv = _batch_argv(sp, item.get("args"))
+    usage = io.StringIO()
+    try:
+        with redirect_stderr(usage):
+            ns = sp.parse_args(argv)
+    except SystemExit:
+        message = usage.getvalue().strip().splitlines()
+        _fail("INVALID_PARAMETER", message[-1] if message else "参数解析失败",
+              suggestion=f"用 schema {command} 查看参数定义", exit_code=EXIT_USAGE)
+    ns.fields = ns.fields or item.get("fields") or defaults.fields
+    ns.dry_run = ns.dry_run or bool(item.get("dry_run")) or defaults.dry_run
+
+    # dry-run 项不解析名称，保证整批预览不联网
+    resolved = resolve_names(command, ns, defer=ns.dry_run)
+    planned: list = []
+    token = _plan_sink.set(planned)
+    try:
+        COMMAND_MAP[command](ns)
+    finally:
+        _plan_sink.reset(token)
+    spec = planned[0]
+    # 名称解析结果随请求带到执行阶段，写入该条输出的 metadata.resolved
+    spec["resolved"] = resolved or None
+    return spec
+
+
+def _run_planned(client: httpx.Client, spec: dict) -> tuple[dict, int]:
+    """执行一条已规划的请求，返回 (信封, 退出码)。"""
+    resolved = {"resolved": spec["resolved"]} if spec.get("resolved") else {}
+    if spec["dry_run"]:
+        envelope = build_envelope(
+            dry_run_preview(spec["method"], spec["path"], spec["body"]),
+            command=spec["command"], extra_metadata={"dry_run": True, **resolved},
+        )
+        return envelope, EXIT_DRYRUN
+    def send_once() -> httpx.Response:
+        try:
+            return client.request(spec["method"], spec["path"], json=spec["body"])
+        except httpx.TransportError as e:
+            raise _TransportFailure.from_httpx(e) from e
+
+    try:
+        resp, stats = request_with_retry(send_once, spec["method"], spec["path"])
+        data = handle_response(resp)
+    except CliError as e:
+        return e.envelope(), e.exit_code
+    after_write(spec["method"], spec["path"], spec["body"], data)
+    took_ms = int(resp.elapsed.total_seconds() * 1000)
+    envelope = build_envelope(data, command=spec["command"], took_ms=took_ms, fields=spec["fields"],
+                              extra_metadata={**retry_metadata([stats]), **resolved} or None)
+    return envelope, EXIT_OK
+
+
+def cmd_batch(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    if args.concurrency < 1:
+        _fail("INVALID_PARAMETER", "--concurrency 必须 ≥ 1", exit_code=EXIT_USAGE)
+    if args.input and args.input != "-":
+        try:
+            stream = open(args.input, encoding="utf-8")
+        except OSError as e:
+            _fail("INVALID_PARAMETER", f"无法读取输入文件: {e}", exit_code=EXIT_USAGE)
+    else:
+        stream = sys.stdin
+    subparsers = next(
+        a for a in parser._actions if isinstance(a, argparse._SubParsersAction)
+    ).choices
+
+    started = time.monotonic()
+    exit_codes: dict[int, int] = {}
+    planned: list[tuple[int, dict]] = []
+    with stream:
+        for index, line in enumerate(stream):
+            if not line.strip():
+                continue
+            try:
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    _fail("INVALID_PARAMETER", f"第 {index + 1} 行不是合法 JSON: {e}",
+                          exit_code=EXIT_USAGE)
+                planned.append((index, _plan_batch_item(item, subparsers, args)))
+            except CliError as e:
+                exit_codes[index] = e.exit_code
+                _emit_line({"index": index, "exit_code": e.exit_code, **e.envelope()})
+
+    if any(not spec["dry_run"] for _, spec in planned):
+        client = get_client(pool_size=args.concurrency)
+    else:
+        client = None  # 全部 dry-run 时无需 Token 与网络
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = {
+                pool.submit(_run_planned, client, spec): index for index, spec in planned
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                envelope, code = future.result()
+                exit_codes[index] = code
+                _emit_line({"index": index, "exit_code": code, **envelope})
+    finally:
+        if client is not None:
+            client.close()
+
+    counts = list(exit_codes.values())
+    failed = sum(1 for c in counts if c not in (EXIT_OK, EXIT_DRYRUN))
+    summary = {
+        "total": len(counts),
+        "succeeded": counts.count(EXIT_OK),
+        "dry_run": counts.count(EXIT_DRYRUN),
+        "failed": failed,
+    }
+    _emit_line({
+        "success": failed == 0,
+        "summary": summary,
+        "metadata": {
+            "command": "dida365_cli batch",
+            "took_ms": int((time.monotonic() - started) * 1000),
+            "concurrency": args.concurrency,
+        },
+    })
+    if failed:
+        sys.exit(_aggregate_exit_code(counts))
+    if counts and summary["dry_run"] == len(counts):
+        sys.exit(EXIT_DRYRUN)
+
+
+# ── Schema 自省 ───────────────────────────────────────────────────────────────
+
+
+def _action_type_name(action: argparse.Action) -> str:
+    if isinstance(action, argparse.BooleanOptionalAction):
+        return "tristate-flag"
+    if isinstance(action, argparse._StoreTrueAction):
+        return "flag"
+    if action.type is not None:
+        return getattr(action.type, "__name__", str(action.type))
+    return "string"
+
+
+def _argparse_to_schema(name: str, sp: argparse.ArgumentParser, description: str) -> dict:
+    """从 argparse subparser 反射出参数 schema。
+
+    依赖 argparse 内部 API（_actions、_choices_actions、_SubParsersAction、
+    _StoreTrueAction、BooleanOptionalAction）——Python 版本升级时需复测。
+    """
+    params = []
+    for action in sp._actions:
+        if action.dest == "help":
+            continue
+        param: dict = {
+            "name": action.option_strings[0] if action.option_strings else action.dest,
+            "dest": action.dest,
+            "required": bool(action.required),
+            "type": _action_type_name(action),
+            "help": action.help or "",
+        }
+        if not action.option_strings:
+            param["positional"] = True
+        if action.choices:
+            param["choices"] = list(action.choices)
+        if action.default not in (None, argparse.SUPPRESS, False):
+            param["default"] = action.default
+        params.append(param)
+    return {"command": name, "description": description, "parameters": params}
+
+
+def reflect_schemas() -> dict[str, dict]:
+    """从完整 argparse 解析树反射出全部子命令的 schema（产物生成与校验用）。"""
+    parser = build_parser()
+    sub_action = next(
+        a for a in parser._actions if isinstance(a, argparse._SubParsersAction)
+    )
+    help_by_name = {a.dest: (a.help or "") for a in sub_action._choices_actions}
+    return {
+        name: _argparse_to_schema(name, sub_action.choices[name], help_by_name.get(name, ""))
+        for name in sorted(n for n in sub_action.choices if n != "schema")
+    }
+
+
+# schema 产物：随脚本分发的预生成 JSON，schema 子命令直接读取，不再每次反射 argparse。
+# parser_hash 是参数定义源码（_add_task_update_args 至 build_parser 结束）与相关默认值常量的
+# 哈希；与当前脚本不一致时视为过期，回退反射并在 metadata 中标注。
+SCHEMA_ARTIFACT = Path(__file__).with_name("dida365_cli.schema.json")
+SCHEMA_FORMAT = 1
+
+
+def parser_definition_hash() -> str:
+    src = Path(__file__).read_text(encoding="utf-8")
+    definition = src[src.index("\ndef _add_task_update_args("):src.index("\nCOMMAND_MAP = {")]
+    defaults = repr((DEFAULT_PARALLEL, DEFAULT_COMPLETED_DAYS, DEFAULT_IDLE_TIMEOUT,
+                     DEFAULT_BATCH_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_WINDOW_PARALLEL,
+                     AUTO_WINDOW_DAYS, WINDOW_UNITS, DEFAULT_STATS_DAYS, STATS_SOURCES))
+    return hashlib.sha256((definition + defaults).encode("utf-8")).hexdigest()[:16]
+
+
+def load_schema_artifact() -> dict | None:
+    """读取 schema 产物；不存在、格式不符或已过期时返回 None。"""
+    try:
+        artifact = json.loads(SCHEMA_ARTIFACT.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if artifact.get("format") != SCHEMA_FORMAT or artifact.get("parser_hash") != parser_definition_hash():
+        return None
+    return artifact["commands"]
+
+
+def _write_schema_artifact() -> dict:
+    artifact = {
+        "format": SCHEMA_FORMAT,
+        "parser_hash": parser_definition_hash(),
+        "commands": reflect_schemas(),
+    }
+    SCHEMA_ARTIFACT.write_text(
+        json.dumps(artifact, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    return {"path": str(SCHEMA_ARTIFACT), "parser_hash": artifact["parser_hash"],
+            "command_count": len(artifact["commands"])}
+
+
+def _verify_schema_artifact() -> None:
+    """对比产物与反射结果，不一致时报 SCHEMA_STALE。"""
+    try:
+        artifact = json.loads(SCHEMA_ARTIFACT.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        _fail("SCHEMA_STALE", f"无法读取 schema 产物 {SCHEMA_ARTIFACT.name}: {e}",
+              suggestion="执行 schema --regenerate 重新生成")
+    current_hash = parser_definition_hash()
+    reflected = reflect_schemas()
+    stale = sorted(
+        name for name in set(reflected) | set(artifact.get("commands", {}))
+        if reflected.get(name) != artifact.get("commands", {}).get(name)
+    )
+    if artifact.get("parser_hash") != current_hash or stale:
+        _fail("SCHEMA_STALE",
+              f"schema 产物已过期（hash {artifact.get('parser_hash')} → {current_hash}，"
+              f"不一致的命令: {', '.join(stale) or '无'}）",
+              suggestion="执行 schema --regenerate 重新生成并提交")
+    output({"path": str(SCHEMA_ARTIFACT), "parser_hash": current_hash, "up_to_date": True},
+           command="schema --verify")
+
+
+def cmd_schema(args: argparse.Namespace) -> None:
+    if args.regenerate:
+        output(_write_schema_artifact(), command="schema --regenerate")
+        return
+    if args.verify:
+        _verify_schema_artifact()
+        return
+
+    schemas = load_schema_artifact()
+    extra = {"schema_source": "artifact"}
+    if schemas is None:
+        schemas = reflect_schemas()
+        extra = {"schema_source": "reflection", "artifact_stale": True}
+
+    if args.command_name:
+        if args.command_name not in schemas:
+            _fail(
+                "UNKNOWN_COMMAND",
+                f"未知子命令 '{args.command_name}'",
+                suggestion=f"可用命令: {', '.join(schemas)}",
+                exit_code=EXIT_USAGE,
+            )
+        output(schemas[args.command_name], command=f"schema {args.command_name}",
+               extra_metadata=extra)
+        return
+    output({"commands": schemas}, command="schema", extra_metadata=extra)
+
+
+# ── CLI 入口 ──────────────────────────────────────────────────────────────────
+
+
+EPILOG = """\
+示例:
+  dida365_cli list-projects --fields id,name
+  dida365_cli create-task --project <项目ID> --title "买菜" --due-date 2026-05-20
+  dida365_cli update-task <任务ID> --project <项目ID> --status 1            # 放弃任务
+  dida365_cli complete-task --project-name 工作 --task-title 周报             # 按名称指定项目与任务
+  dida365_cli delete-task <项目ID> <任务ID> --dry-run                        # 预演删除（退出码 10）
+  dida365_cli get-project-data --all --parallel 8 --fields projectId,tasks.id,tasks.title  # 并发获取全部项目
+  dida365_cli bulk-complete --tasks <项目ID>:<任务ID>,<项目ID>:<任务ID>         # 并发完成多个任务
+  dida365_cli filter-tasks --priority 3,5 --status 0 --fields id,title,dueDate
+  dida365_cli overdue-tasks --fields id,title,projectName,dueDate            # 逾期未完成任务
+  dida365_cli due-tasks --after 2026-04-06 --before 2026-04-13               # 按截止日期区间查询
+  dida365_cli query-completed --start-date 2026-01-01 --window week --format ndjson  # 分窗口并发查询已完成任务
+  dida365_cli sync && dida365_cli local-query --text 周报 --status 0         # 本地副本同步与查询
+  dida365_cli stats --start-date 2026-01-01                                  # 完成数/完成率/逾期等统计摘要
+  dida365_cli changes-since <cursor> --fields change,id,title                # 自上次游标以来的任务变更
+  dida365_cli schema                                                         # 列出所有子命令的参数 schema
+  dida365_cli schema create-task                                             # 查看单个命令的 schema
+  dida365_cli serve --detach                                                 # 后台启动常驻连接守护进程
+  dida365_cli batch --input plan.jsonl --concurrency 8                       # JSONL 批量执行（共享连接池）
+
+全局选项（所有子命令均可用）:
+  --fields PATH[,PATH...]  字段投影，支持 tasks.id 嵌套路径与 * 通配，列表自动逐项裁剪
+  --dry-run                只输出 would_call 而不真正调用 API，退出码 10
+  --cache-ttl SEC          启用本地读缓存（list-projects / get-project-data），有效期 SEC 秒
+  --no-cache / --refresh   本次不用缓存 / 强制刷新缓存
+  --format ndjson          逐项一行输出（末行为信封），边下载边解析，适合大结果集
+  --compact                列表按 {"columns","rows"} 编码并压缩为一行（即 --format table-json）
+  --trace                  在 metadata.trace 中给出各阶段耗时（启动/解析/建连/服务端/解码/投影…）
+  --trace-file PATH        把阶段 span 追加到 JSONL 文件（OTel span 结构；也可设 DIDA365_TRACE_FILE）
+  --rate-limit RPS         客户端限流（请求/秒），遇 429 自动减速并遵守 Retry-After
+  --max-retries N          429/5xx/网络错误重试次数（默认 3，仅幂等请求）
+  --retry-writes           允许重试非幂等写请求
+
+守护进程:
+  serve --detach 启动后，其余子命令自动经本地 Unix socket 复用其 keep-alive 连接；
+  守护进程未运行时自动直连。serve --status 查看状态，serve --stop 停止。
+
+退出码:
+  0=成功  1=一般错误  2=参数/用法错误  3=资源不存在  4=权限不足  5=部分失败  10=dry-run 预览
+"""
+
+
+def _add_task_update_args(p: argparse.ArgumentParser) -> None:
+    """update-task / bulk-update 共用的可更新字段参数。"""
+    p.add_argument("--title", help="任务标题")
+    p.add_argument("--content", help="任务内容")
+    p.add_argument("--desc", help="清单描述")
+    p.add_argument("--priority", type=int, choices=[0, 1, 3, 5], help="优先级")
+    p.add_argument("--due-date", help="截止时间 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--start-date", help="开始时间 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--time-zone", help="时区")
+    p.add_argument("--all-day", action=argparse.BooleanOptionalAction, default=None,
+                   help="全天任务 (--all-day / --no-all-day)")
+    p.add_argument("--tags", help="标签，逗号分隔")
+    p.add_argument("--repeat-flag", help="循环规则 (RRULE 格式)")
+    p.add_argument("--status", type=int, choices=[0, 1, 2], help="状态: 0=未完成 1=放弃 2=已完成")
+
+
+def _add_name_args(p: argparse.ArgumentParser, *, task: bool = False) -> None:
+    """按名称指定项目 / 任务（经本地索引解析为 ID，见 resolve_names）。"""
+    p.add_argument("--project-name", help="按项目名称指定项目（精确/前缀/包含/模糊匹配，'收集箱' 即 inbox）")
+    if task:
+        p.add_argument("--task-title", help="按标题指定未完成任务（精确/前缀/包含/模糊匹配）")
+
+
+class _UnusedParser:
+    """build_parser(only=...) 中未被调用的子命令：吞掉参数定义，不做任何事。"""
+
+    def add_argument(self, *args: object, **kwargs: object) -> None:
+        pass
+
+    def add_mutually_exclusive_group(self, **kwargs: object) -> _UnusedParser:
+        return self
+
+
+def build_parser(only: str | None = None) -> argparse.ArgumentParser:
+    """构建参数解析树。
+
+    only 为子命令名时只给该子命令挂载参数，其余子命令仅注册名称与帮助（顶层 --help 仍完整），
+    以缩短启动时间；None 表示构建完整解析树（schema 自省与 batch 逐行解析需要）。
+    """
+    global_parser = argparse.ArgumentParser(add_help=False)
+    global_parser.add_argument("--fields",
+                               help="字段投影（逗号分隔，支持 tasks.id 嵌套路径与 * 通配），保护上下文窗口")
+    global_parser.add_argument("--dry-run", action="store_true",
+                               help="只输出将要发起的 API 调用（不执行），退出码 10")
+    global_parser.add_argument("--cache-ttl", type=int,
+                               help="启用本地读缓存并设定有效期（秒），仅作用于 list-projects / get-project-data")
+    global_parser.add_argument("--no-cache", action="store_true", help="本次调用不读写本地缓存")
+    global_parser.add_argument("--refresh", action="store_true",
+                               help="跳过缓存读取，强制请求 API 并写回缓存")
+    global_parser.add_argument("--format", choices=["json", "ndjson", "table-json"], default="json",
+                               help="输出格式：json（默认）、ndjson（每项一行，末行为信封，边下载边输出）"
+                                    "或 table-json（列表按 columns/rows 编码的单行信封）")
+    global_parser.add_argument("--compact", dest="format", action="store_const", const="table-json",
+                               help="等同 --format table-json")
+    global_parser.add_argument("--trace", action="store_true",
+                               help="记录各阶段耗时并写入 metadata.trace")
+    global_parser.add_argument("--trace-file",
+                               help="把阶段 span 追加到该 JSONL 文件（OpenTelemetry span 结构，隐含 --trace）")
+    global_parser.add_argument("--rate-limit", type=float,
+                               help="客户端限流：每秒最多请求数（默认不限，遇 429 自动退让）")
+    global_parser.add_argument("--max-retries", type=int,
+                               help=f"429/5xx/网络错误的最大重试次数（默认 {DEFAULT_MAX_RETRIES}）")
+    global_parser.add_argument("--retry-writes", action="store_true",
+                               help="允许重试非幂等写请求（可能重复创建，谨慎使用）")
+
+    parser = argparse.ArgumentParser(
+        prog="dida365_cli",
+        description="滴答清单 Open API CLI 工具",
+        parents=[global_parser],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG,
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name: str, help: str) -> argparse.ArgumentParser | _UnusedParser:
+        if only is None or name == only:
+            return sub.add_parser(name, help=help, parents=[global_parser])
+        sub.add_parser(name, help=help)
+        return _UnusedParser()
+
+    # ── 项目 ──
+    add("list-projects", "获取所有项目")
+
+    p = add("get-project", "获取单个项目")
+    p.add_argument("project_id", nargs="?", help="项目 ID（或用 --project-name）")
+    _add_name_args(p)
+
+    p = add("get-project-data", "获取项目及其任务和列（支持多项目并发）")
+    p.add_argument("project_id", nargs="?", help="项目 ID（可用 'inbox' 获取收集箱，或用 --project-name）")
+    _add_name_args(p)
+    p.add_argument("--all", action="store_true", help="并发获取收集箱与全部项目")
+    p.add_argument("--projects", help="并发获取多个项目，ID 逗号分隔")
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"多项目模式的最大并发数（默认 {DEFAULT_PARALLEL}）")
+
+    p = add("create-project", "创建项目")
+    p.add_argument("--name", required=True, help="项目名称")
+    p.add_argument("--color", help="项目颜色，如 #F18181")
+    p.add_argument("--view-mode", choices=["list", "kanban", "timeline"], help="视图模式")
+    p.add_argument("--kind", choices=["TASK", "NOTE"], help="项目类型")
+    p.add_argument("--sort-order", type=int, help="排序值")
+
+    p = add("update-project", "更新项目")
+    p.add_argument("project_id", nargs="?", help="项目 ID（或用 --project-name）")
+    _add_name_args(p)
+    p.add_argument("--name", help="项目名称")
+    p.add_argument("--color", help="项目颜色")
+    p.add_argument("--view-mode", choices=["list", "kanban", "timeline"], help="视图模式")
+    p.add_argument("--kind", choices=["TASK", "NOTE"], help="项目类型")
+    p.add_argument("--sort-order", type=int, help="排序值")
+
+    p = add("delete-project", "删除项目")
+    p.add_argument("project_id", nargs="?", help="项目 ID（或用 --project-name）")
+    _add_name_args(p)
+
+    # ── 任务 ──
+    p = add("get-task", "获取单个任务")
+    p.add_argument("project_id", nargs="?", help="项目 ID（或用 --project-name）")
+    p.add_argument("task_id", nargs="?", help="任务 ID（或用 --task-title）")
+    _add_name_args(p, task=True)
+
+    p = add("create-task", "创建任务")
+    p.add_argument("--project", help="项目 ID（或用 --project-name）")
+    _add_name_args(p)
+    p.add_argument("--title", required=True, help="任务标题")
+    p.add_argument("--content", help="任务内容")
+    p.add_argument("--desc", help="清单描述")
+    p.add_argument("--priority", type=int, choices=[0, 1, 3, 5], help="优先级: 0=无 1=低 3=中 5=高")
+    p.add_argument("--due-date", help="截止时间 (支持 YYYY-MM-DD 或完整 ISO 8601, 如 2026-04-05T00:00:00+0800)")
+    p.add_argument("--start-date", help="开始时间 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--time-zone", help="时区，如 Asia/Shanghai")
+    p.add_argument("--all-day", action="store_true", help="全天任务")
+    p.add_argument("--tags", help="标签，逗号分隔")
+    p.add_argument("--repeat-flag", help="循环规则 (RRULE 格式)")
+
+    p = add("update-task", "更新任务")
+    p.add_argument("task_id", nargs="?", help="任务 ID（或用 --task-title）")
+    p.add_argument("--project", help="项目 ID（或用 --project-name；用 --task-title 时可省略）")
+    _add_name_args(p, task=True)
+    _add_task_update_args(p)
+
+    p = add("complete-task", "完成任务")
+    p.add_argument("project_id", nargs="?", help="项目 ID（或用 --project-name）")
+    p.add_argument("task_id", nargs="?", help="任务 ID（或用 --task-title）")
+    _add_name_args(p, task=True)
+
+    p = add("delete-task", "删除任务")
+    p.add_argument("project_id", nargs="?", help="项目 ID（或用 --project-name）")
+    p.add_argument("task_id", nargs="?", help="任务 ID（或用 --task-title）")
+    _add_name_args(p, task=True)
+
+    # ── 批量变更 ──
+    bulk_help = "project_id:task_id 列表，逗号分隔；省略或 '-' 时从 stdin 读取（逗号/空白分隔）"
+    p = add("bulk-complete", "并发完成多个任务")
+    p.add_argument("--tasks", help=bulk_help)
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"最大并发数（默认 {DEFAULT_PARALLEL}）")
+
+    p = add("bulk-delete", "并发删除多个任务")
+    p.add_argument("--tasks", help=bulk_help)
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"最大并发数（默认 {DEFAULT_PARALLEL}）")
+
+    p = add("bulk-update", "并发以相同字段更新多个任务")
+    p.add_argument("--tasks", help=bulk_help)
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"最大并发数（默认 {DEFAULT_PARALLEL}）")
+    _add_task_update_args(p)
+
+    p = add("move-tasks", "移动任务到其他项目")
+    p.add_argument("--from", dest="from_project", required=True, help="源项目 ID")
+    p.add_argument("--to", dest="to_project", required=True, help="目标项目 ID")
+    p.add_argument("--tasks", required=True, help="任务 ID，逗号分隔")
+
+    # ── 查询 ──
+    p = add("filter-tasks", "按条件筛选任务")
+    p.add_argument("--projects", help="项目 ID，逗号分隔")
+    _add_name_args(p)
+    p.add_argument("--start-date", help="起始时间 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--end-date", help="结束时间 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--priority", help="优先级，逗号分隔 (0,1,3,5)")
+    p.add_argument("--tags", help="标签，逗号分隔")
+    p.add_argument("--status", help="状态，逗号分隔 (0=未完成,2=已完成)")
+    p.add_argument("--due-after", help="本地过滤：dueDate >= 此值 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--due-before", help="本地过滤：dueDate < 此值 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--text", help="本地过滤：标题/内容/描述包含该文本（不区分大小写）")
+    p.add_argument("--no-tags", action="store_true", help="本地过滤：只保留没有标签的任务")
+    p.add_argument("--has-checklist", action="store_true", help="本地过滤：只保留含检查项（子任务）的任务")
+
+    p = add("query-completed", "查询已完成任务")
+    p.add_argument("--projects", help="项目 ID，逗号分隔")
+    _add_name_args(p)
+    p.add_argument("--start-date", help="起始时间 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--end-date", help="结束时间 (支持 YYYY-MM-DD 或完整 ISO 8601)；分窗口时默认当前时间")
+    p.add_argument("--window", choices=("auto", "none", *WINDOW_UNITS), default="auto",
+                   help=f"按日/周/月切分区间并发查询；auto（默认）在区间超过 {AUTO_WINDOW_DAYS} 天时按月切分，"
+                        "none 不切分")
+    p.add_argument("--parallel", type=int, default=DEFAULT_WINDOW_PARALLEL,
+                   help=f"同时查询的窗口数上限（默认 {DEFAULT_WINDOW_PARALLEL}）")
+
+    # ── 本地副本 ──
+    p = add("sync", "增量同步项目与任务到本地 SQLite 副本（供 local-query 使用）")
+    p.add_argument("--full", action="store_true", help="清空副本后全量重建")
+    p.add_argument("--completed-days", type=int, default=DEFAULT_COMPLETED_DAYS,
+                   help=f"首次/全量同步时回溯的已完成任务天数（默认 {DEFAULT_COMPLETED_DAYS}）")
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"最大并发数（默认 {DEFAULT_PARALLEL}）")
+
+    p = add("local-query", "在本地副本上筛选任务（无网络往返，需先 sync）")
+    p.add_argument("--projects", help="项目 ID，逗号分隔（'inbox' 匹配收集箱）")
+    p.add_argument("--start-date", help="startDate >= 此值 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--end-date", help="startDate <= 此值 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--due-after", help="dueDate >= 此值 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--due-before", help="dueDate < 此值 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--priority", help="优先级，逗号分隔 (0,1,3,5)")
+    p.add_argument("--tags", help="标签，逗号分隔（需全部匹配）")
+    p.add_argument("--status", help="状态，逗号分隔 (0=未完成,2=已完成)")
+    p.add_argument("--text", help="标题或内容包含该文本")
+    p.add_argument("--limit", type=int, help="最多返回条数")
+
+    p = add("overdue-tasks", "查询逾期未完成任务（按 dueDate，并发扫描全部项目）")
+    p.add_argument("--as-of", help="以该日期零点为逾期界限（默认今天，+0800）")
+    p.add_argument("--projects", help="只扫描这些项目，ID 逗号分隔（默认收集箱 + 全部项目）")
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"最大并发数（默认 {DEFAULT_PARALLEL}）")
+
+    p = add("due-tasks", "按 dueDate 区间查询未完成任务（并发扫描全部项目）")
+    p.add_argument("--after", help="dueDate >= 此值 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--before", help="dueDate < 此值 (支持 YYYY-MM-DD 或完整 ISO 8601)")
+    p.add_argument("--projects", help="只扫描这些项目，ID 逗号分隔（默认收集箱 + 全部项目）")
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"最大并发数（默认 {DEFAULT_PARALLEL}）")
+
+    # ── 统计 ──
+    p = add("stats", "统计完成数、完成率、逾期数、优先级分布与按项目/标签/日的分布（只输出摘要）")
+    p.add_argument("--start-date", help=f"统计完成数的起始时间（默认最近 {DEFAULT_STATS_DAYS} 天，含今天）")
+    p.add_argument("--end-date", help="统计完成数的结束时间（不含，默认当前时间）")
+    p.add_argument("--as-of", help="以该时间为逾期界限（默认今天零点，+0800）")
+    p.add_argument("--projects", help="只统计这些项目，ID 逗号分隔（默认收集箱 + 全部项目）")
+    p.add_argument("--source", choices=STATS_SOURCES, default="auto",
+                   help="数据来源：replica 本地副本、api 实时拉取；auto（默认）在副本的已完成任务覆盖统计区间时用副本")
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"source=api 时的最大并发数（默认 {DEFAULT_PARALLEL}）")
+
+    p = add("changes-since", "返回游标之后新增/修改/完成/删除的任务与新游标（本地快照比对）")
+    p.add_argument("cursor", help="上次返回的 metadata.cursor；0 返回全部任务，now 只建立基线")
+    p.add_argument("--completed-days", type=int, default=DEFAULT_COMPLETED_DAYS,
+                   help=f"首次建立快照时回溯的已完成任务天数（默认 {DEFAULT_COMPLETED_DAYS}）")
+    p.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                   help=f"最大并发数（默认 {DEFAULT_PARALLEL}）")
+
+    # ── 守护进程 ──
+    p = add("serve", "启动常驻连接守护进程（其余子命令自动经 Unix socket 复用连接）")
+    p.add_argument("--idle-timeout", type=int, default=DEFAULT_IDLE_TIMEOUT,
+                   help=f"空闲多少秒后自动退出（默认 {DEFAULT_IDLE_TIMEOUT}）")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--detach", action="store_true", help="后台启动，就绪后立即返回")
+    g.add_argument("--status", action="store_true", help="查看守护进程状态")
+    g.add_argument("--stop", action="store_true", help="停止守护进程")
+
+    # ── 批量 ──
+    p = add("batch", "从 JSONL 批量执行子命令（共享连接池，逐行输出结果）")
+    p.add_argument("--input", help="JSONL 输入文件（默认读 stdin，'-' 亦表示 stdin）")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY,
+                   help=f"最大并发请求数（默认 {DEFAULT_BATCH_CONCURRENCY}）")
+
+    # ── Schema 自省 ──
+    p = add("schema", "输出子命令的参数 JSON Schema（用于 Agent 自省）")
+    p.add_argument("command_name", nargs="?",
+                   help="子命令名（留空则输出全部）")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--regenerate", action="store_true",
+                   help="反射 argparse 重新生成随脚本分发的 schema 产物（修改参数定义后执行）")
+    g.add_argument("--verify", action="store_true",
+                   help="校验 schema 产物与当前参数定义一致，不一致时退出码 1")
+
+    return parser
+
+
+COMMAND_MAP = {
+    "list-projects": cmd_list_projects,
+    "get-project": cmd_get_project,
+    "get-project-data": cmd_get_project_data,
+    "create-project": cmd_create_project,
+    "update-project": cmd_update_project,
+    "delete-project": cmd_delete_project,
+    "get-task": cmd_get_task,
+    "create-task": cmd_create_task,
+    "update-task": cmd_update_task,
+    "complete-task": cmd_complete_task,
+    "delete-task": cmd_delete_task,
+    "move-tasks": cmd_move_tasks,
+    "bulk-complete": cmd_bulk_complete,
+    "bulk-delete": cmd_bulk_delete,
+    "bulk-update": cmd_bulk_update,
+    "filter-tasks": cmd_filter_tasks,
+    "query-completed": cmd_query_completed,
+    "overdue-tasks": cmd_overdue_tasks,
+    "due-tasks": cmd_due_tasks,
+    "sync": cmd_sync,
+    "local-query": cmd_local_query,
+    "stats": cmd_stats,
+    "changes-since": cmd_changes_since,
+    "serve": cmd_serve,
+}
+
+
+def _invoked_command(argv: list[str]) -> str | None:
+    """从 argv 中找出子命令名（第一个与子命令同名的参数）；未找到时返回 None。"""
+    names = set(COMMAND_MAP) | {"schema", "batch"}
+    return next((a for a in argv if a in names), None)
+
+
+def _start_tracing(args: argparse.Namespace, main_entered_ns: int, parsed_ns: int) -> None:
+    """--trace / --trace-file / DIDA365_TRACE_FILE 任一存在时启用阶段计时。"""
+    global _tracer
+    trace_file = getattr(args, "trace_file", None) or os.environ.get("DIDA365_TRACE_FILE") or None
+    if not (getattr(args, "trace", False) or trace_file):
+        return
+    _tracer = Tracer(args.command, trace_file)
+    if _tracer.process_start_ns is not None:
+        _tracer.add("startup", _tracer.process_start_ns, main_entered_ns)
+    _tracer.add("argparse", main_entered_ns, parsed_ns)
+
+
+def main() -> None:
+    main_entered_ns = time.time_ns()
+    command = _invoked_command(sys.argv[1:])
+    parser = build_parser(None if command == "batch" else command or "")
+    args = parser.parse_args()
+    _start_tracing(args, main_entered_ns, time.time_ns())
+    _output_format.set(getattr(args, "format", "json"))
+    exit_code = EXIT_OK
+    try:
+        configure_resilience(args)
+        if args.command == "schema":
+            cmd_schema(args)
+        elif args.command == "batch":
+            cmd_batch(args, parser)
+        else:
+            _resolved_names.set(resolve_names(args.command, args) or None)
+            COMMAND_MAP[args.command](args)
+    except CliError as e:
+        exit_code = e.exit_code
+        emit_envelope(e.envelope())
+        sys.exit(e.exit_code)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else EXIT_ERROR
+        raise
+    finally:
+        if _tracer is not None:
+            _tracer.export(exit_code)
+
@@ -0,0 +1,249 @@
+# /// script
+# requires-python = ">=3.10"
+# ///
+"""任务状态解析 / 索引 / 依赖调度基准（合成计划，默认 5000 个任务、50 个阶段）。
+
+生成一份合成 TASK_STATUS.md（含子任务、依赖列、已完成任务对应的交接记录），测量:
+    - parse:  旧版整文件正则解析 vs 流式解析（停在交接记录）vs 缓存命中
+    - query:  旧版 find_current_phase / count_remaining_tasks（O(阶段×任务)、O(任务×编号)）
+              vs TaskIndex 单次建索引后的 current_phase / remaining / ids_in_range
+    - graph:  依赖图构建、循环检测、波次、关键路径、worker 拆分
+
+每项取 --runs 次的中位数，结果以 JSON 输出（可 --output 另存）。
+
+用法:
+    uv run benchmarks/bench_task_index.py
+    uv run benchmarks/bench_task_index.py --tasks 5000 --phases 50 --runs 7 --output index.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from task_graph import build_graph  # noqa: E402
+from task_status import STATUS_EMOJIS, TaskIndex, load_task_status, parse_file  # noqa: E402
+
+_STATUS_CELLS = {"completed": "✅ 已完成", "in_progress": "🔄 进行中", "pending": "⬜ 待开始",
+                 "blocked": "⏸️ 暂停", "split": "🔀 已拆分"}
+
+
+def synthesize(tasks: int, phases: int, seed: int, handoff_bytes: int) -> str:
+    """生成合成 TASK_STATUS.md：前 40% 阶段已完成，当前阶段部分进行中，每 10 个任务拆分一个"""
+    rng = random.Random(seed)
+    per_phase = max(1, tasks // phases)
+    done_phases = int(phases * 0.4)
+    rows, handoffs = [], []
+    number = 0
+    for i in range(tasks):
+        number += 1
+        phase = min(i // per_phase, phases - 1)
+        if phase < done_phases:
+            status = "completed"
+        elif phase == done_phases:
+            status = rng.choice(("completed", "in_progress", "pending", "pending"))
+        else:
+            status = "blocked" if rng.random() < 0.01 else "pending"
+        deps = sorted({f"{rng.randint(max(1, number - per_phase), number - 1):04d}"
+                       for _ in range(rng.randint(0, 2))} if number > 1 else set())
+        dep_cell = ", ".join(deps) or "无"
+        task_id = f"BM-{number:04d}"
+        if number % 10 == 0 and status != "completed":
+            rows.append(f"| {task_id} | 任务 {number} | Phase {phase} "
+                        f"| {_STATUS_CELLS['split']} | {dep_cell} |")
+            for sub in "ab":
+                rows.append(f"| {task_id}-{sub} | 任务 {number}{sub} | Phase {phase} "
+                            f"| {_STATUS_CELLS[status]} | {dep_cell} |")
+        else:
+            rows.append(f"| {task_id} | 任务 {number} | Phase {phase} "
+                        f"| {_STATUS_CELLS[status]} | {dep_cell} |")
+        if status == "completed":
+            handoffs.append(f"---\n\n#### [{task_id}] 任务 {number} — 交接记录\n\n**完成内容**:\n"
+                            + "- " + "交接内容。" * max(1, handoff_bytes // 15) + "\n")
+
+    overview = "\n".join(f"| Phase {p} | {per_phase} | 0 | 0 | {per_phase} |" for p in range(phases))
+    return (
+        "# 任务状态跟踪\n\n## 进度总览\n\n| 阶段 | 总数 | 完成 | 进行中 | 待开始 |\n"
+        f"|------|------|------|--------|--------|\n{overview}\n\n"
+        "## 任务状态\n\n| 编号 | 标题 | 阶段 | 状态 | 依赖 |\n|------|------|------|------|------|\n"
+        + "\n".join(rows)
+        + "\n\n状态图例: ⬜ 待开始 | 🔄 进行中 | ✅ 已完成\n\n## 已知问题\n\n## 决策日志\n\n## 交接记录\n\n"
+        + "\n".join(handoffs)
+    )
+
+
+# ── 旧实现（索引引入前的 setup_autoexec.py，仅作对照） ──
+
+
+def legacy_parse(content: str) -> list[dict]:
+    tasks = []
+    table_pattern = re.compile(r"^\|\s*(\S+)\s*\|[^|]*\|([^|]*)\|([^|]*)\|[^|]*\|", re.MULTILINE)
+    for match in table_pattern.finditer(content):
+        task_id = match.group(1).strip()
+        if task_id in ("编号", "---", "----", "-----") or task_id.startswith("-"):
+            continue
+        status = "unknown"
+        for emoji, semantic in STATUS_EMOJIS.items():
+            if emoji in match.group(3):
+                status = semantic
+                break
+        phase_match = re.search(r"Phase\s*(\d+)", match.group(2))
+        tasks.append({"id": task_id, "phase": int(phase_match.group(1)) if phase_match else -1,
+                      "status": status})
+    return tasks
+
+
+def legacy_current_phase(tasks: list[dict], phase_count: int) -> int:
+    for i in range(phase_count):
+        phase_tasks = [t for t in tasks if t["phase"] == i]
+        if any(t["status"] in ("pending", "in_progress") for t in phase_tasks):
+            return i
+    return phase_count - 1 if phase_count else 0
+
+
+def legacy_count_remaining(tasks: list[dict], phase_list, task_nums) -> int:
+    remaining = [t for t in tasks if t["status"] in ("pending", "in_progress")]
+    if task_nums is not None:
+        target_nums = {f"{n:02d}" for n in task_nums}
+        remaining = [t for t in remaining
+                     if any(t["id"].endswith(f"-{num}") or t["id"] == num for num in target_nums)]
+    elif phase_list is not None:
+        remaining = [t for t in remaining if t["phase"] in phase_list]
+    return len(remaining)
+
+
+# ── 测量 ──
+
+
+def _time(fn, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "min_ms": round(min(samples), 3)}
+
+
+def _ratio(old, new) -> float:
+    old = old["median_ms"] if isinstance(old, dict) else old
+    new = new["median_ms"] if isinstance(new, dict) else new
+    return round(old / max(new, 1e-3), 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="任务状态解析 / 索引 / 依赖调度基准")
+    parser.add_argument("--tasks", type=int, default=5000, help="合成计划的任务数（默认 5000）")
+    parser.add_argument("--phases", type=int, default=50, help="合成计划的阶段数（默认 50）")
+    parser.add_argument("--handoff-bytes", type=int, default=1500, help="每条交接记录的大致字节数")
+    parser.add_argument("--targets", type=int, default=500, help="--task 范围内的编号个数（默认 500）")
+    parser.add_argument("--runs", type=int, default=5, help="每项运行次数（默认 5）")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="把结果 JSON 另存到该文件")
+    args = parser.parse_args()
+
+    content = synthesize(args.tasks, args.phases, args.seed, args.handoff_bytes)
+    workdir = Path(tempfile.mkdtemp(prefix="sw-bench-"))
+    status_path = workdir / "TASK_STATUS.md"
+    status_path.write_text(content, encoding="utf-8")
+    cache_path = workdir / "cache.json"
+    load_task_status(status_path, cache_path)  # 预热缓存
+
+    tasks = parse_file(status_path).tasks
+    legacy_tasks = legacy_parse(content)
+    index = TaskIndex(tasks)
+    current = index.current_phase(args.phases)
+    # --task 范围从第一个待执行编号开始，避免落在全部已完成的区间
+    first_open = min(index.open_by_number, default=1)
+    target_nums = list(range(first_open, first_open + args.targets))
+    assert legacy_current_phase(legacy_tasks, args.phases) == current
+
+    results = {
+        "parse": {
+            "legacy_regex_full_file": _time(
+                lambda: legacy_parse(status_path.read_text(encoding="utf-8")), args.runs),
+            "streaming": _time(lambda: parse_file(status_path), args.runs),
+            "cached": _time(lambda: load_task_status(status_path, cache_path), args.runs),
+        },
+        "query": {
+            "legacy_current_phase": _time(
+                lambda: legacy_current_phase(legacy_tasks, args.phases), args.runs),
+            "legacy_remaining_phase": _time(
+                lambda: legacy_count_remaining(legacy_tasks, [current], None), args.runs),
+            "legacy_remaining_task_range": _time(
+                lambda: legacy_count_remaining(legacy_tasks, None, target_nums), args.runs),
+            "index_build": _time(lambda: TaskIndex(tasks), args.runs),
+            "index_current_phase": _time(lambda: index.current_phase(args.phases), args.runs),
+            "index_remaining_phase": _time(lambda: index.remaining(phases=[current]), args.runs),
+            "index_remaining_task_range": _time(
+                lambda: index.remaining(numbers=target_nums), args.runs),
+            "index_ids_in_range": _time(
+                lambda: index.ids_in_range(target_nums[0], target_nums[-1]), args.runs),
+        },
+    }
+
+    graph = build_graph(tasks)
+    waves, unschedulable = graph.waves()
+    results["graph"] = {
+        "build": _time(lambda: build_graph(tasks), args.runs),
+        "cycles": _time(graph.cycles, args.runs),
+        "waves": _time(graph.waves, args.runs),
+        "critical_path": _time(lambda: graph.critical_path(waves), args.runs),
+        "partition_4": _time(lambda: graph.partition(waves, 4), args.runs),
+    }
+
+    query = results["query"]
+    report = {
+        "python": sys.version.split()[0],
+        "config": {
+            "tasks": len(tasks),
+            "phases": args.phases,
+            "file_bytes": status_path.stat().st_size,
+            "targets": args.targets,
+            "runs": args.runs,
+        },
+        "shape": {
+            "current_phase": current,
+            "remaining_in_phase": len(index.remaining(phases=[current])),
+            "remaining_in_task_range": len(index.remaining(numbers=target_nums)),
+            # 旧实现按两位补零后缀匹配，四位编号与子任务都匹配不到
+            "legacy_remaining_in_task_range": legacy_count_remaining(legacy_tasks, None, target_nums),
+            "waves": len(waves),
+            "critical_path": len(graph.critical_path(waves)),
+            "unschedulable": len(unschedulable),
+        },
+        "results": results,
+        # 比值 > 1 表示新实现更快；setup_* 为 setup_autoexec 一次运行的查询量（含建索引）
+        "speedup": {
+            "current_phase": _ratio(query["legacy_current_phase"], query["index_current_phase"]),
+            "remaining_task_range": _ratio(query["legacy_remaining_task_range"],
+                                           query["index_remaining_task_range"]),
+            "setup_phase_scope": _ratio(
+                query["legacy_current_phase"]["median_ms"] + query["legacy_remaining_phase"]["median_ms"],
+                query["index_build"]["median_ms"] + query["index_current_phase"]["median_ms"]
+                + query["index_remaining_phase"]["median_ms"],
+            ),
+            "setup_task_scope": _ratio(
+                query["legacy_remaining_task_range"],
+                query["index_build"]["median_ms"] + query["index_remaining_task_range"]["median_ms"],
+            ),
+            "parse_streaming": _ratio(results["parse"]["legacy_regex_full_file"], results["parse"]["streaming"]),
+            "parse_cached": _ratio(results["parse"]["legacy_regex_full_file"], results["parse"]["cached"]),
+        },
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,14 @@
 仅处理状态文件，不执行任何 git 操作。
 
 用法:
-    uv run abort_workflow.py --path <project-root> --mode <archive|delete> [--label <标签>]
+    uv run abort_workflow.py --path <project-root> --mode <archive|delete> [--label <标签>] [--store]
 
 选项:
     --mode archive    归档状态文件到 docs/workflow/archive/（目录名含 aborted 标记）
     --mode delete     直接删除所有状态文件和 workflow.json
     --label <标签>    自定义归档标签（默认使用 workflow.json 中的 taskName）
+    --store           archive 模式下写入内容寻址归档存储（去重 + gzip 压缩，见 archive_store.py），
+                      不再生成归档目录
 """
 
 import argparse
@@ -21,6 +23,8 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+from archive_store import archive_sources, print_store_summary
+
 
 def slugify(text: str) -> str:
     """将文本转为目录名安全的 slug（小写字母、数字、短横线）"""
@@ -48,6 +52,9 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--label", default=None, help="自定义归档标签"
     )
+    parser.add_argument(
+        "--store", action="store_true", help="archive 模式下写入内容寻址归档存储（去重 + 压缩）"
+    )
     return parser.parse_args()
 
 
@@ -59,6 +66,7 @@ def get_state_files(project_root: Path, config: dict) -> dict[str, Path]:
         "plan": "docs/workflow/TASK_PLAN.md",
         "status": "docs/workflow/TASK_STATUS.md",
         "dependencyMap": "docs/workflow/DEPENDENCY_MAP.md",
+        "state": "docs/workflow/state.json",
     }
     return {
         key: project_root / state_files.get(key, default_path)
@@ -66,8 +74,8 @@ def get_state_files(project_root: Path, config: dict) -> dict[str, Path]:
     }
 
 
-def archive_mode(project_root: Path, config: dict, label: str) -> None:
-    """归档模式：移动状态文件到归档目录"""
+def archive_mode(project_root: Path, config: dict, label: str, store: bool = False) -> None:
+    """归档模式：移动状态文件到归档目录（store 为 True 时写入内容寻址归档存储）"""
     task_name = config.get("taskName", "")
     if label and label != task_name:
         name_part = slugify(label)
@@ -78,6 +86,10 @@ def archive_mode(project_root: Path, config: dict, label: str) -> None:
     date_str = datetime.now().strftime("%Y%m%d")
     archive_name = f"{date_str}-{name_part}-aborted"
 
+    if store:
+        store_mode(project_root, config, archive_name)
+        return
+
     archive_dir = project_root / "docs" / "workflow" / "archive" / archive_name
     if archive_dir.exists():
         counter = 2
@@ -132,6 +144,31 @@ def archive_mode(project_root: Path, config: dict, label: str) -> None:
     print("  workflow.json: 已归档并移除")
 
 
+def store_mode(project_root: Path, config: dict, archive_name: str) -> None:
+    """存储模式：状态文件、ABORT_REPORT.md 与 workflow.json 写入内容寻址存储后删除原件"""
+    sources = list(get_state_files(project_root, config).values())
+    # ABORT_REPORT.md（新路径优先，旧路径回退）
+    abort_report = project_root / "docs" / "workflow" / "ABORT_REPORT.md"
+    if not abort_report.exists() and (project_root / "docs" / "ABORT_REPORT.md").exists():
+        abort_report = project_root / "docs" / "ABORT_REPORT.md"
+    # workflow.json（新路径优先，旧路径回退）
+    workflow_path = project_root / "docs" / "workflow" / "workflow.json"
+    if not workflow_path.exists():
+        workflow_path = project_root / ".claude" / "workflow.json"
+
+    result = archive_sources(
+        project_root,
+        archive_name,
+        [*sources, abort_report, workflow_path],
+        {"taskName": config.get("taskName", ""), "aborted": True},
+    )
+    print()
+    print("归档完成！")
+    print(f"  归档名: {result.name}")
+    print_store_summary(result)
+    print("  workflow.json: 已归档并移除")
+
+
 def delete_mode(project_root: Path, config: dict) -> None:
     """删除模式：直接删除所有状态文件"""
     state_files = get_state_files(project_root, config)
@@ -194,7 +231,7 @@ def main() -> None:
     label = args.label or config.get("taskName", "")
 
     if args.mode == "archive":
-        archive_mode(project_root, config, label)
+        archive_mode(project_root, config, label, args.store)
     else:
         delete_mode(project_root, config)
 
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""结构化工作流 - 内容寻址归档存储
+
+把归档的状态文件按内容（sha256）去重、gzip 压缩后存入 docs/workflow/archive/objects/，
+每次归档只写一份清单（manifests/<归档名>.json）记录文件路径与对应的内容哈希。
+多次归档中相同的 TASK_PLAN.md / brainstorm 文档只存一份，归档目录下不再堆积大量小文件。
+
+目录结构:
+    docs/workflow/archive/
+    ├── objects/ab/cdef….gz      # 内容哈希前两位分目录，gzip 压缩
+    └── manifests/20260101-demo.json
+
+archive_workflow.py / abort_workflow.py 加 --store 时写入这里；旧的目录式归档可用 pack 转换。
+
+用法:
+    uv run archive_store.py <command> --path <project-root> [options]
+
+命令:
+    list                          列出所有归档（含目录式归档）
+    show <归档名>                 列出归档中的文件
+    extract <归档名> [--dest <目录>] [--file <路径>]
+                                  解压归档（未给 --dest 时解压到新建的临时目录）
+    pack [<归档名> ...] [--all]   把目录式归档转入存储并删除原目录
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+OBJECTS_DIR = "objects"
+MANIFESTS_DIR = "manifests"
+_RESERVED = {OBJECTS_DIR, MANIFESTS_DIR}
+
+
+def archive_root_for(project_root: Path) -> Path:
+    return project_root / "docs" / "workflow" / "archive"
+
+
+def unique_archive_name(archive_root: Path, name: str) -> str:
+    """同名归档（目录式或清单）已存在时追加序号"""
+    candidate, counter = name, 2
+    while (archive_root / candidate).exists() or (
+        archive_root / MANIFESTS_DIR / f"{candidate}.json"
+    ).exists():
+        candidate = f"{name}-{counter}"
+        counter += 1
+    return candidate
+
+
+def collect_files(src: Path, arcname: str) -> list[tuple[str, Path]]:
+    """把文件或目录展开为 (归档内路径, 源文件) 列表，目录按路径排序递归展开（arcname 为空时放在根）"""
+    if src.is_dir():
+        prefix = f"{arcname}/" if arcname else ""
+        return [
+            (f"{prefix}{path.relative_to(src).as_posix()}", path)
+            for path in sorted(src.rglob("*"))
+            if path.is_file()
+        ]
+    return [(arcname, src)]
+
+
+@dataclass
+class StoreResult:
+    name: str
+    files: int = 0
+    new_objects: int = 0  # 新写入的对象数（其余为已有内容，去重复用）
+    bytes_in: int = 0  # 原始大小合计
+    bytes_written: int = 0  # 新写入的压缩后大小合计
+
+
+def _object_path(archive_root: Path, digest: str) -> Path:
+    return archive_root / OBJECTS_DIR / digest[:2] / f"{digest[2:]}.gz"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def store_files(
+    archive_root: Path, name: str, files: list[tuple[str, Path]], meta: dict
+) -> StoreResult:
+    """把文件写入对象存储并生成清单；已存在的内容只记录引用不重复写入"""
+    result = StoreResult(name=name)
+    entries = []
+    for arcname, src in files:
+        data = src.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        obj = _object_path(archive_root, digest)
+        if not obj.exists():
+            # mtime=0 使相同内容的压缩结果一致
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            _write_atomic(obj, compressed)
+            result.new_objects += 1
+            result.bytes_written += len(compressed)
+        result.files += 1
+        result.bytes_in += len(data)
+        entries.append({
+            "path": arcname,
+            "sha256": digest,
+            "size": len(data),
+            "mtime": int(src.stat().st_mtime),
+        })
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "name": name,
+        "createdAt": datetime.now().isoformat(timespec="seconds"),
+        **meta,
+        "files": entries,
+    }
+    _write_atomic(
+        archive_root / MANIFESTS_DIR / f"{name}.json",
+        (json.dumps(manifest, ensure_ascii=False, indent=2) + "\n").encode("utf-8"),
+    )
+    return result
+
+
+def load_manifest(archive_root: Path, name: str) -> dict | None:
+    path = archive_root / MANIFESTS_DIR / f"{name}.json"
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_archives(archive_root: Path) -> list[dict]:
+    """所有归档（清单 + 目录式），按名称排序；与清单同名的目录不算作目录式归档"""
+    archives = []
+    manifests_dir = archive_root / MANIFESTS_DIR
+    stored = set()
+    if manifests_dir.is_dir():
+        for path in manifests_dir.glob("*.json"):
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            stored.add(manifest["name"])
+            archives.append({
+                "name": manifest["name"],
+                "kind": "store",
+                "files": len(manifest["files"]),
+                "bytes": sum(entry["size"] for entry in manifest["files"]),
+                "taskName": manifest.get("taskName", ""),
+            })
+    if archive_root.is_dir():
+        for path in archive_root.iterdir():
+            if path.is_dir() and path.name not in _RESERVED and path.name not in stored:
+                files = [p for p in path.rglob("*") if p.is_file()]
+                archives.append({
+                    "name": path.name,
+                    "kind": "dir",
+                    "files": len(files),
+                    "bytes": sum(p.stat().st_size for p in files),
+                    "taskName": "",
+                })
+    return sorted(archives, key=lambda a: a["name"])
+
+
+def extract(archive_root: Path, manifest: dict, dest: Path, only: str | None = None) -> int:
+    """按清单把文件解压到 dest（校验内容哈希），返回解压的文件数"""
+    count = 0
+    for entry in manifest["files"]:
+        if only is not None and entry["path"] != only and not entry["path"].startswith(f"{only}/"):
+            continue
+        target = dest / entry["path"]
+        if not target.resolve().is_relative_to(dest.resolve()):
+            print(f"错误: 清单中的路径越界: {entry['path']}", file=sys.stderr)
+            sys.exit(1)
+        obj = _object_path(archive_root, entry["sha256"])
+        if not obj.exists():
+            print(f"错误: 缺少对象 {entry['sha256'][:12]}（{entry['path']}）", file=sys.stderr)
+            sys.exit(1)
+        data = gzip.decompress(obj.read_bytes())
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            print(f"错误: 对象内容校验失败: {entry['path']}", file=sys.stderr)
+            sys.exit(1)
+        _write_atomic(target, data)
+        os.utime(target, (entry["mtime"], entry["mtime"]))
+        count += 1
+    return count
+
+
+def remove_sources(sources: list[Path]) -> None:
+    """写入存储成功后删除源文件 / 目录（等价于原来的 shutil.move）"""
+    for src in sources:
+        if src.is_dir():
+            shutil.rmtree(src)
+        elif src.exists():
+            src.unlink()
+
+
+def archive_sources(
+    project_root: Path, archive_name: str, sources: list[Path], meta: dict
+) -> StoreResult:
+    """archive_workflow / abort_workflow 的存储模式：把存在的源文件（目录按文件展开）写入存储，
+    生成清单后删除原件。归档内路径取源文件名（brainstorm/ 目录保留子路径）"""
+    archive_root = archive_root_for(project_root)
+    name = unique_archive_name(archive_root, archive_name)
+    manifest_path = archive_root / MANIFESTS_DIR / f"{name}.json"
+    print(f"归档清单: {manifest_path.relative_to(project_root)}")
+
+    existing = []
+    for src in sources:
+        if src.exists():
+            existing.append(src)
+        else:
+            print(f"  - 跳过（不存在）: {src.relative_to(project_root)}")
+    files = [item for src in existing for item in collect_files(src, src.name)]
+    result = store_files(archive_root, name, files, meta)
+    for src in existing:
+        suffix = "/" if src.is_dir() else ""
+        print(f"  ✓ 存储并移除: {src.relative_to(project_root)}{suffix}")
+    remove_sources(existing)
+    return result
+
+
+def format_size(n: int) -> str:
+    if n < 1024:
+        return f"{n} B"
+    if n < 1024 * 1024:
+        return f"{n / 1024:.1f} KB"
+    return f"{n / 1024 / 1024:.1f} MB"
+
+
+def print_store_summary(result: StoreResult) -> None:
+    reused = result.files - result.new_objects
+    print(f"  存储文件: {result.files} 个（新对象 {result.new_objects}，复用 {reused}）")
+    print(
+        f"  原始大小: {format_size(result.bytes_in)} → 新写入 {format_size(result.bytes_written)}"
+    )
+
+
+# ── 命令行 ──
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="结构化工作流 - 内容寻址归档存储",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name: str, help_text: str) -> argparse.ArgumentParser:
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--path", required=True, help="目标项目根目录路径")
+        return p
+
+    add("list", "列出所有归档")
+    add("show", "列出归档中的文件").add_argument("name", help="归档名")
+    p = add("extract", "解压归档")
+    p.add_argument("name", help="归档名")
+    p.add_argument("--dest", default=None, help="解压目录（默认新建临时目录）")
+    p.add_argument("--file", default=None, help="只解压该路径（文件或目录，如 brainstorm）")
+    p = add("pack", "把目录式归档转入存储并删除原目录")
+    p.add_argument("names", nargs="*", help="归档名（目录名）")
+    p.add_argument("--all", action="store_true", help="转换全部目录式归档")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    project_root = Path(args.path).resolve()
+    if not project_root.is_dir():
+        print(f"错误: 项目目录不存在: {project_root}", file=sys.stderr)
+        sys.exit(1)
+    archive_root = archive_root_for(project_root)
+
+    if args.command == "list":
+        archives = list_archives(archive_root)
+        if not archives:
+            print("（无归档）")
+        for archive in archives:
+            kind = "存储" if archive["kind"] == "store" else "目录"
+            print(
+                f"  {archive['name']:<40} [{kind}] {archive['files']} 个文件, "
+                f"{format_size(archive['bytes'])}"
+            )
+        return
+
+    if args.command == "pack":
+        names = args.names
+        if args.all:
+            names = [a["name"] for a in list_archives(archive_root) if a["kind"] == "dir"]
+        if not names:
+            print("错误: 请指定归档名或 --all", file=sys.stderr)
+            sys.exit(1)
+        for name in names:
+            src = archive_root / name
+            if name in _RESERVED or not src.is_dir():
+                print(f"错误: 目录式归档不存在: {name}", file=sys.stderr)
+                sys.exit(1)
+            if (archive_root / MANIFESTS_DIR / f"{name}.json").exists():
+                print(f"错误: 存储中已有同名归档: {name}", file=sys.stderr)
+                sys.exit(1)
+            files = collect_files(src, "")
+            meta = {"aborted": name.endswith("-aborted") or "-aborted-" in name, "packedFrom": name}
+            result = store_files(archive_root, name, files, meta)
+            remove_sources([src])
+            print(f"✓ 已转换: {name}")
+            print_store_summary(result)
+        return
+
+    manifest = load_manifest(archive_root, args.name)
+    if manifest is None:
+        print(f"错误: 存储中没有归档: {args.name}", file=sys.stderr)
+        print("提示: 运行 list 查看可用归档", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "show":
+        print(f"归档: {manifest['name']}（{manifest['createdAt']}）")
+        for entry in manifest["files"]:
+            print(f"  {entry['sha256'][:12]}  {format_size(entry['size']):>9}  {entry['path']}")
+    else:
+        # 默认不解压到 archive/ 下：同名目录会被当作目录式归档，与清单重复
+        if args.dest:
+            dest = Path(args.dest).resolve()
+        else:
+            dest = Path(tempfile.mkdtemp(prefix=f"{args.name}-"))
+        count = extract(archive_root, manifest, dest, args.file)
+        if count == 0 and not args.dest:
+            dest.rmdir()
+        if count == 0 and args.file is not None:
+            print(f"错误: 归档中没有该路径: {args.file}", file=sys.stderr)
+            sys.exit(1)
+        if count == 0:
+            print(f"⚠ 归档为空: {args.name}")
+            return
+        print(f"✓ 已解压 {count} 个文件到 {dest}")
+
+
+if __name__ == "__main__":
+    main()
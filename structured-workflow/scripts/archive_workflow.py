@@ -4,10 +4,12 @@
 将工作流状态文件移入归档目录，清理 workflow.json，使项目恢复"干净"状态。
 
 用法:
-    uv run archive_workflow.py --path <project-root> [--label <标签>]
+    uv run archive_workflow.py --path <project-root> [--label <标签>] [--store]
 
 选项:
     --label <标签>    自定义归档标签（默认使用 workflow.json 中的 taskName）
+    --store           写入内容寻址归档存储（去重 + gzip 压缩，见 archive_store.py），
+                      不再生成归档目录
 """
 
 import argparse
@@ -18,6 +20,8 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+from archive_store import archive_sources, print_store_summary
+
 
 def slugify(text: str) -> str:
     """将文本转为目录名安全的 slug（小写字母、数字、短横线）"""
@@ -39,6 +43,9 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--label", default=None, help="自定义归档标签"
     )
+    parser.add_argument(
+        "--store", action="store_true", help="写入内容寻址归档存储（去重 + 压缩）"
+    )
     return parser.parse_args()
 
 
@@ -73,6 +80,37 @@ def main() -> None:
     date_str = datetime.now().strftime("%Y%m%d")
     archive_name = f"{date_str}-{name_part}"
 
+    # 要归档的状态文件
+    state_files = config.get("stateFiles", {})
+    default_files = {
+        "analysis": "docs/workflow/TASK_ANALYSIS.md",
+        "plan": "docs/workflow/TASK_PLAN.md",
+        "status": "docs/workflow/TASK_STATUS.md",
+        "dependencyMap": "docs/workflow/DEPENDENCY_MAP.md",
+        "state": "docs/workflow/state.json",
+    }
+    summary_path = project_root / "docs" / "workflow" / "SUMMARY.md"
+    brainstorm_dir = project_root / "docs" / "workflow" / "brainstorm"
+
+    if args.store:
+        sources = [
+            project_root / state_files.get(key, default_path)
+            for key, default_path in default_files.items()
+        ]
+        result = archive_sources(
+            project_root,
+            archive_name,
+            [*sources, summary_path, brainstorm_dir, workflow_path],
+            {"taskName": task_name, "aborted": False},
+        )
+        print()
+        print("归档完成！")
+        print(f"  归档名: {result.name}")
+        print_store_summary(result)
+        print()
+        print("项目已恢复干净状态，可以开展下一轮大型任务。")
+        return
+
     archive_dir = project_root / "docs" / "workflow" / "archive" / archive_name
     if archive_dir.exists():
         # 如果同一天已有归档，追加序号
@@ -84,15 +122,6 @@ def main() -> None:
     archive_dir.mkdir(parents=True, exist_ok=True)
     print(f"归档目录: {archive_dir}")
 
-    # 要归档的状态文件
-    state_files = config.get("stateFiles", {})
-    default_files = {
-        "analysis": "docs/workflow/TASK_ANALYSIS.md",
-        "plan": "docs/workflow/TASK_PLAN.md",
-        "status": "docs/workflow/TASK_STATUS.md",
-        "dependencyMap": "docs/workflow/DEPENDENCY_MAP.md",
-    }
-
     moved_count = 0
     skipped_count = 0
 
@@ -109,7 +138,6 @@ def main() -> None:
             skipped_count += 1
 
     # 移动 SUMMARY.md（如果存在）
-    summary_path = project_root / "docs" / "workflow" / "SUMMARY.md"
     if summary_path.exists():
         dst = archive_dir / "SUMMARY.md"
         shutil.move(str(summary_path), str(dst))
@@ -117,7 +145,6 @@ def main() -> None:
         moved_count += 1
 
     # 移动 brainstorm/ 目录（如果存在）
-    brainstorm_dir = project_root / "docs" / "workflow" / "brainstorm"
     if brainstorm_dir.is_dir():
         dst = archive_dir / "brainstorm"
         shutil.move(str(brainstorm_dir), str(dst))
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """结构化工作流 - 项目初始化脚本
 
-在目标项目中创建 docs/workflow/ 目录结构、workflow.json 配置文件和 TASK_STATUS.md 模板。
+在目标项目中创建 docs/workflow/ 目录结构、workflow.json 配置文件、TASK_STATUS.md 模板和 state.json 状态存储。
 
 用法:
     uv run init_project.py --path <project-root> [options]
@@ -24,6 +24,8 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+from workflow_state import create_state
+
 
 def get_current_commit(project_root: Path) -> str:
     """获取当前 HEAD 的 commit hash，失败时返回空字符串"""
@@ -105,6 +107,7 @@ def create_workflow_json(args: argparse.Namespace) -> dict:
             "plan": "docs/workflow/TASK_PLAN.md",
             "status": "docs/workflow/TASK_STATUS.md",
             "dependencyMap": "docs/workflow/DEPENDENCY_MAP.md",
+            "state": "docs/workflow/state.json",
         },
         "phases": phases,
         "projectContext": {
@@ -204,6 +207,14 @@ def main() -> None:
     else:
         print(f"⚠ 已跳过（已存在）: {status_path}")
 
+    # 创建结构化状态存储（已有 TASK_STATUS.md 时导入其中的任务表）
+    state_path = project_root / config["stateFiles"]["state"]
+    if not state_path.exists():
+        state = create_state(state_path, status_path, config.get("phases", []))
+        print(f"✓ 已创建: {state_path}（{len(state.tasks)} 个任务）")
+    else:
+        print(f"⚠ 已跳过（已存在）: {state_path}")
+
     # 输出摘要
     print()
     print("初始化完成！")
@@ -11,26 +11,26 @@
     --all             统计所有阶段的剩余任务（默认仅当前阶段）
     --phase <RANGE>   阶段范围（如 1, 1-3, 0,2）
     --task <RANGE>    任务编号范围（如 1-5, 1,3,7），指定时忽略 --phase
+    --task-ids <IDS>  精确的任务编号列表（如 AU-01,AU-03-a），指定时忽略 --task / --phase
+    --parallel <N>    按依赖拆分为 N 个互不依赖的 worker 范围（本会话执行 worker 1）
 """
 
 import argparse
 import json
 import os
-import re
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
 
-# 任务状态 emoji 到语义的映射
-STATUS_EMOJIS = {
-    "⬜": "pending",
-    "🔄": "in_progress",
-    "✅": "completed",
-    "⏸️": "blocked",
-    "⏸": "blocked",  # 无变体选择符的版本
-    "❌": "cancelled",
-    "🔀": "split",
-}
+import workflow_state
+from task_graph import TaskGraph, build_graph
+from task_status import (
+    Task,
+    TaskIndex,
+    cache_path_for,
+    find_status_path,
+    load_task_status,
+)
 
 
 def parse_range(value: str) -> list[int]:
@@ -85,105 +85,79 @@ def load_workflow(project_root: Path) -> dict:
     sys.exit(1)
 
 
-def load_status_file(project_root: Path, workflow: dict) -> str:
-    """加载 TASK_STATUS.md 内容"""
-    status_rel = workflow.get("stateFiles", {}).get(
-        "status", "docs/workflow/TASK_STATUS.md"
-    )
-    status_path = project_root / status_rel
-    # 旧路径回退
-    if not status_path.exists():
-        old_path = project_root / "docs" / "TASK_STATUS.md"
-        if old_path.exists():
-            status_path = old_path
-
+def load_tasks(project_root: Path, workflow: dict) -> list[Task]:
+    """读取任务状态：优先读结构化状态存储（state.json），
+    没有时解析 TASK_STATUS.md 的任务状态表（结果缓存在 .claude/ 下，文件未变时不重复解析）"""
+    tasks = workflow_state.load_tasks(project_root, workflow)
+    if tasks is not None:
+        return tasks
+    status_path = find_status_path(project_root, workflow)
     if not status_path.exists():
         print(f"错误: 未找到状态文件: {status_path}", file=sys.stderr)
         sys.exit(1)
-
-    with open(status_path, encoding="utf-8") as f:
-        return f.read()
-
-
-def parse_task_statuses(status_content: str) -> list[dict]:
-    """从 TASK_STATUS.md 的任务状态表中解析任务列表
-
-    解析格式：| 编号 | 标题 | 阶段 | 状态 | 依赖 |
-    """
-    tasks = []
-    # 匹配任务状态表的行：| XX-NN | ... | Phase N... | ⬜/✅/... | ... |
-    table_pattern = re.compile(
-        r"^\|\s*(\S+)\s*\|[^|]*\|([^|]*)\|([^|]*)\|[^|]*\|",
-        re.MULTILINE,
-    )
-    for match in table_pattern.finditer(status_content):
-        task_id = match.group(1).strip()
-        phase_text = match.group(2).strip()
-        status_cell = match.group(3).strip()
-
-        # 跳过表头和分隔行
-        if task_id in ("编号", "---", "----", "-----"):
-            continue
-        if task_id.startswith("-"):
-            continue
-
-        # 识别状态 emoji
-        status = "unknown"
-        for emoji, semantic in STATUS_EMOJIS.items():
-            if emoji in status_cell:
-                status = semantic
-                break
-
-        # 提取阶段编号
-        phase_num = -1
-        phase_match = re.search(r"Phase\s*(\d+)", phase_text)
-        if phase_match:
-            phase_num = int(phase_match.group(1))
-
-        tasks.append(
-            {
-                "id": task_id,
-                "phase": phase_num,
-                "status": status,
-            }
-        )
-
-    return tasks
+    return load_task_status(status_path, cache_path_for(project_root)).tasks
 
 
-def find_current_phase(tasks: list[dict], phases: list[dict]) -> int:
-    """找到第一个仍有待执行任务的阶段编号"""
-    for i in range(len(phases)):
-        phase_tasks = [t for t in tasks if t["phase"] == i]
-        has_pending = any(
-            t["status"] in ("pending", "in_progress") for t in phase_tasks
-        )
-        if has_pending:
-            return i
-    # 所有阶段都已完成，返回最后一个阶段
-    return len(phases) - 1 if phases else 0
-
-
-def count_remaining_tasks(
-    tasks: list[dict],
-    phase_list: list[int] | None,
-    task_nums: list[int] | None,
-    count_all: bool,
-) -> int:
-    """计算剩余可执行任务数"""
-    remaining = [t for t in tasks if t["status"] in ("pending", "in_progress")]
+def parse_task_ids(value: str, index: TaskIndex) -> list[str]:
+    """解析 --task-ids：逗号分隔的完整任务编号，不存在的编号直接报错"""
+    ids = list(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+    unknown = [tid for tid in ids if tid not in index.by_id]
+    if not ids or unknown:
+        print(f"错误: 任务编号不存在: {', '.join(unknown) or value}", file=sys.stderr)
+        print("提示: --task-ids 需要完整编号（如 AU-03-a），按数字范围选择请用 --task", file=sys.stderr)
+        sys.exit(1)
+    return ids
+
+
+def report_dependency_issues(graph: TaskGraph, scope: list[str], strict: bool) -> None:
+    """输出依赖列的问题；strict 时（--parallel）循环依赖直接报错退出"""
+    in_scope = set(scope)
+    for tid, dep in graph.dangling:
+        if tid in in_scope:
+            print(f"⚠ 依赖引用不存在: {tid} 依赖 {dep}")
+    for tid, dep, candidates in graph.ambiguous:
+        if tid in in_scope:
+            print(f"⚠ 依赖引用有歧义: {tid} 依赖 {dep}（匹配 {', '.join(candidates)}）")
+    cycles = [c for c in graph.cycles() if in_scope.intersection(c)]
+    for cycle in cycles:
+        chain = " → ".join([*cycle, cycle[0]])
+        if strict:
+            print(f"错误: 循环依赖: {chain}", file=sys.stderr)
+        else:
+            print(f"⚠ 循环依赖: {chain}（相关任务无法被选中执行）")
+    if strict and cycles:
+        print("请先用 /plan-adjust 修正依赖关系后再并行执行", file=sys.stderr)
+        sys.exit(1)
 
-    if task_nums is not None:
-        # 按编号中的数字部分匹配（忽略前缀）
-        target_nums = {f"{n:02d}" for n in task_nums}
-        remaining = [
-            t for t in remaining
-            if any(t["id"].endswith(f"-{num}") or t["id"] == num for num in target_nums)
-        ]
-    elif not count_all and phase_list is not None:
-        remaining = [t for t in remaining if t["phase"] in phase_list]
 
-    return len(remaining)
+def write_schedule(
+    project_root: Path,
+    graph: TaskGraph,
+    waves: list[list[str]],
+    workers: list[list[str]],
+    unschedulable: list[str],
+) -> Path:
+    """写入 .claude/autoexec-schedule.local.json，记录本次并行拆分结果"""
+    schedule_path = project_root / ".claude" / "autoexec-schedule.local.json"
+    schedule_path.parent.mkdir(parents=True, exist_ok=True)
+    schedule = {
+        "generatedAt": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "workers": [
+            {"worker": i, "tasks": scope, "taskAutoArgs": worker_task_arg(scope)}
+            for i, scope in enumerate(workers, start=1)
+        ],
+        "waves": waves,
+        "criticalPath": graph.critical_path(waves),
+        "unschedulable": unschedulable,
+    }
+    with open(schedule_path, "w", encoding="utf-8") as f:
+        json.dump(schedule, f, ensure_ascii=False, indent=2)
+    return schedule_path
+
+
+def worker_task_arg(scope: list[str]) -> str:
+    """启动该 worker 的 /task-auto 参数：按完整编号限定，不会带上同编号下分给别处的子任务"""
+    return f"--task-ids {','.join(scope)}"
 
 
 def build_phase_info(phases: list[dict]) -> str:
@@ -200,8 +174,15 @@ def build_scope_constraint(
     task_nums: list[int] | None,
     phase_list: list[int] | None,
     count_all: bool,
+    task_ids: list[str] | None = None,
 ) -> str:
-    """根据参数构建执行范围约束文本"""
+    """根据参数构建执行范围约束文本（task_ids 为精确的任务编号，如并行拆分后的 worker 范围）"""
+    if task_ids is not None:
+        ids = ", ".join(task_ids)
+        return (
+            f"\n\n**执行范围限制**：仅执行以下任务：{ids}。"
+            "编号需完全一致，同一主编号下未列出的子任务也不在范围内。\n"
+        )
     if task_nums is not None:
         ids = ", ".join(f"{n:02d}" for n in task_nums)
         return f"\n\n**执行范围限制**：仅执行以下编号的任务：{ids}。跳过不在此列表中的任务。\n"
@@ -211,12 +192,30 @@ def build_scope_constraint(
     return ""
 
 
-def build_prompt(workflow: dict, scope_constraint: str = "") -> str:
+def build_wave_order(waves: list[list[str]]) -> str:
+    """构建调度顺序文本：按依赖波次列出范围内的任务"""
+    lines = [f"- 波次 {i}: {', '.join(wave)}" for i, wave in enumerate(waves, start=1)]
+    return (
+        "\n**调度顺序**（按依赖计算的波次；先完成前面的波次，同一波次内按所列顺序）：\n"
+        + "\n".join(lines)
+        + "\n"
+    )
+
+
+def build_prompt(
+    workflow: dict, scope_constraint: str = "", waves: list[list[str]] | None = None
+) -> str:
     """构建自动执行协议 prompt（v2）"""
     ctx = workflow.get("projectContext", {})
     build_cmd = ctx.get("buildCommand", "") or "无"
     test_cmd = ctx.get("testCommand", "") or "无"
     phase_info = build_phase_info(workflow.get("phases", []))
+    if waves:
+        order = "按下方「调度顺序」的波次先后"
+        wave_order = build_wave_order(waves)
+    else:
+        order = "按编号顺序"
+        wave_order = ""
 
     return f"""# 自动执行协议
 
@@ -238,8 +237,8 @@ def build_prompt(workflow: dict, scope_constraint: str = "") -> str:
 ### 2. 选择下一任务
 优先级：
 1. 🔄 进行中的任务（续接）
-2. ⬜ 待开始且所有依赖已完成（✅）的任务（按编号顺序）
-
+2. ⬜ 待开始且所有依赖已完成（✅）的任务（{order}）
+{wave_order}
 如果没有可执行任务 → 跳到「完成检查」。
 {scope_constraint}
 ### 3. 执行任务（自动模式）
@@ -404,6 +403,14 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--task", type=str, default=None, help="任务编号范围（如 1-5, 1,3,7）"
     )
+    parser.add_argument(
+        "--task-ids", type=str, default=None,
+        help="精确的任务编号列表（如 AU-01,AU-03-a），指定时忽略 --task / --phase",
+    )
+    parser.add_argument(
+        "--parallel", type=int, default=1, metavar="N",
+        help="按依赖拆分为 N 个互不依赖的 worker 范围，本会话执行 worker 1",
+    )
     parser.add_argument(
         "--yes", action="store_true", help="（由命令层处理，脚本中忽略）"
     )
@@ -423,8 +430,8 @@ def main() -> None:
     phases = workflow.get("phases", [])
 
     # 2. 加载并解析任务状态
-    status_content = load_status_file(project_root, workflow)
-    tasks = parse_task_statuses(status_content)
+    tasks = load_tasks(project_root, workflow)
+    index = TaskIndex(tasks)
 
     if not tasks:
         print("错误: TASK_STATUS.md 中未找到任务", file=sys.stderr)
@@ -433,22 +440,24 @@ def main() -> None:
 
     # 3. 解析范围参数
     phase_list = parse_range(args.phase) if args.phase else None
-    task_nums = parse_range(args.task) if args.task else None
+    task_ids = parse_task_ids(args.task_ids, index) if args.task_ids else None
+    task_nums = parse_range(args.task) if args.task and task_ids is None else None
 
-    # 确定阶段列表（仅在无 --task 时使用）
-    if task_nums is not None:
+    # 确定阶段列表（仅在无 --task / --task-ids 时使用）
+    if task_ids is not None or task_nums is not None:
         current_phases = None
     elif phase_list is not None:
         current_phases = phase_list
     else:
-        current_phases = [find_current_phase(tasks, phases)]
+        current_phases = [index.current_phase(len(phases))]
 
     # 4. 计算任务统计
-    remaining = count_remaining_tasks(
-        tasks, current_phases, task_nums, args.count_all
+    remaining_tasks = index.remaining(
+        phases=None if args.count_all else current_phases, numbers=task_nums, ids=task_ids
     )
-    completed = sum(1 for t in tasks if t["status"] == "completed")
-    blocked = sum(1 for t in tasks if t["status"] == "blocked")
+    remaining = len(remaining_tasks)
+    completed = index.count("completed")
+    blocked = index.count("blocked")
     total = len(tasks)
 
     if remaining == 0:
@@ -456,29 +465,55 @@ def main() -> None:
         print(f"  总计: {total} | 完成: {completed} | 阻塞: {blocked}")
         sys.exit(0)
 
-    # 5. 计算 max-iterations
+    # 5. 依赖校验与调度（--parallel 时拆分 worker 范围，本会话执行 worker 1）
+    graph = build_graph(tasks)
+    scope_ids = [t.id for t in remaining_tasks]
+    report_dependency_issues(graph, scope_ids, strict=args.parallel > 1)
+    waves, unschedulable = graph.waves(scope_ids)
+    workers: list[list[str]] = []
+    session_waves = waves
+    schedule_path = None
+    if args.parallel > 1:
+        workers = graph.partition(waves, args.parallel)
+        if not workers:
+            print("错误: 范围内没有依赖已满足的可调度任务", file=sys.stderr)
+            print(f"  无法调度: {', '.join(unschedulable)}", file=sys.stderr)
+            sys.exit(1)
+        schedule_path = write_schedule(project_root, graph, waves, workers, unschedulable)
+        # 每个 worker 都按精确编号限定：换算成数字编号会带上同编号下未分给它的子任务
+        task_ids = workers[0]
+        session = set(task_ids)
+        session_waves = [kept for wave in waves if (kept := [t for t in wave if t in session])]
+        current_phases = None
+
+    # 6. 计算 max-iterations（并行时按 worker 1 的任务数）
+    session_tasks = len(workers[0]) if workers else remaining
     if args.max_iterations > 0:
         max_iter = max(args.max_iterations, 3)
     else:
-        max_iter = max(remaining * 3, 10)
+        max_iter = max(session_tasks * 3, 10)
 
-    # 6. 检测 Ralph Loop
+    # 7. 检测 Ralph Loop
     ralph_detected = detect_ralph_loop()
 
-    # 7. 检查是否已有活跃的 ralph-loop
+    # 8. 检查是否已有活跃的 ralph-loop
     existing_state = project_root / ".claude" / "ralph-loop.local.md"
     if existing_state.exists():
         print("⚠ 检测到已有活跃的 ralph-loop 状态文件，将覆盖")
 
-    # 8. 生成 prompt 并创建状态文件
+    # 9. 生成 prompt 并创建状态文件
     scope_constraint = build_scope_constraint(
-        task_nums, current_phases, args.count_all
+        task_nums, current_phases, args.count_all, task_ids=task_ids
     )
-    prompt = build_prompt(workflow, scope_constraint)
+    prompt = build_prompt(workflow, scope_constraint, session_waves)
     state_path = create_state_file(project_root, max_iter, prompt)
 
-    # 9. 输出摘要
-    if task_nums:
+    # 10. 输出摘要
+    if workers:
+        scope_label = f"worker 1 / {len(workers)}（任务 {', '.join(workers[0])}）"
+    elif task_ids:
+        scope_label = f"任务 {', '.join(task_ids)}"
+    elif task_nums:
         scope_label = f"任务 {args.task}"
     elif args.count_all:
         scope_label = "所有阶段"
@@ -490,7 +525,7 @@ def main() -> None:
     print("✓ 自动执行设置完成")
     print()
     print(f"  范围: {scope_label}")
-    if not args.count_all and not task_nums and current_phases and len(current_phases) == 1:
+    if not args.count_all and not task_nums and not task_ids and current_phases and len(current_phases) == 1:
         phase_idx = current_phases[0]
         phase_name = (
             phases[phase_idx]["name"]
@@ -499,8 +534,25 @@ def main() -> None:
         )
         print(f"  当前阶段: {phase_name}")
     print(f"  任务统计: 总计 {total} | 完成 {completed} | 待执行 {remaining} | 阻塞 {blocked}")
+    critical = graph.critical_path(waves)
+    print(
+        f"  依赖调度: 就绪 {len(waves[0]) if waves else 0} | 波次 {len(waves)}"
+        f" | 关键路径 {len(critical)} 个任务"
+    )
+    if unschedulable:
+        print(f"  无法调度: {', '.join(unschedulable)}（依赖未满足、阻塞或循环）")
     print(f"  最大迭代: {max_iter}")
     print(f"  状态文件: {state_path}")
+    if workers:
+        print()
+        print(f"  并行拆分: {len(workers)} 个 worker（请求 {args.parallel}），worker 之间无依赖")
+        print(f"  关键路径: {' → '.join(critical)}")
+        for i, scope in enumerate(workers, start=1):
+            where = "本会话" if i == 1 else f"/task-auto {worker_task_arg(scope)}"
+            print(f"    worker {i}（{len(scope)} 个）: {', '.join(scope)}")
+            print(f"      → {where}")
+        print("    其余 worker 请在各自的工作副本中启动（共用同一目录会互相覆盖状态文件）")
+        print(f"  调度文件: {schedule_path}")
     print()
 
     if ralph_detected:
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""结构化工作流 - 任务依赖图
+
+把 TASK_STATUS.md 任务状态表的「依赖」列解析为 DAG，提供：
+- 校验：循环依赖、悬空引用（依赖了不存在的编号）、有歧义的引用
+- 调度：就绪集合、可并行执行的波次（wave）、关键路径
+- 分区：把待执行任务拆成互不依赖的 worker 范围，供多个会话并行执行
+
+依赖编号按以下顺序解析：完整编号（如 AU-03）→ 数字编号（03 / 3 匹配 AU-03）。
+依赖已拆分（🔀）的任务等价于依赖它的全部子任务（03 → 03-a、03-b …）。
+✅ 已完成与 ❌ 已取消的任务视为已满足；⏸️ 阻塞的任务及其下游不可调度。
+
+用法（调试 / 查看调度结果）:
+    uv run task_graph.py --path <project-root> [--parallel N]
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from task_status import (
+    OPEN_STATUSES,
+    Task,
+    cache_path_for,
+    find_status_path,
+    load_task_status,
+    task_number,
+)
+
+DONE_STATUSES = frozenset({"completed", "cancelled"})
+
+
+@dataclass
+class TaskGraph:
+    """依赖图：deps 中只含已解析的任务编号，无法解析的记录在 dangling / ambiguous"""
+
+    tasks: dict[str, Task]  # 按文件顺序
+    deps: dict[str, tuple[str, ...]]
+    dangling: list[tuple[str, str]] = field(default_factory=list)  # (任务, 依赖原文)
+    ambiguous: list[tuple[str, str, tuple[str, ...]]] = field(default_factory=list)
+    subtasks: dict[str, list[str]] = field(default_factory=dict)  # 拆分任务 → 子任务
+    _order: dict[str, int] = field(default_factory=dict, repr=False)
+    _done: dict[str, bool] = field(default_factory=dict, repr=False)
+
+    def is_done(self, task_id: str) -> bool:
+        """任务是否已满足（拆分任务在全部子任务满足后才算满足）"""
+        if task_id not in self._done:
+            task = self.tasks[task_id]
+            if task.status == "split":
+                subs = self.subtasks.get(task_id, [])
+                self._done[task_id] = bool(subs) and all(self.is_done(s) for s in subs)
+            else:
+                self._done[task_id] = task.status in DONE_STATUSES
+        return self._done[task_id]
+
+    def open_tasks(self) -> list[str]:
+        return [tid for tid, task in self.tasks.items() if task.status in OPEN_STATUSES]
+
+    def cycles(self) -> list[list[str]]:
+        """返回所有循环依赖（Tarjan 强连通分量中大小 > 1 或自环的部分），迭代实现避免递归过深"""
+        index: dict[str, int] = {}
+        low: dict[str, int] = {}
+        on_stack: set[str] = set()
+        stack: list[str] = []
+        result: list[list[str]] = []
+        counter = 0
+
+        for root in self.tasks:
+            if root in index:
+                continue
+            work = [(root, iter(self.deps[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.deps[child])))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.deps[node]:
+                        result.append(sorted(component, key=self._order.__getitem__))
+        return result
+
+    def waves(self, scope: list[str] | None = None) -> tuple[list[list[str]], list[str]]:
+        """把 scope 内的待执行任务分层：同一波次内任务互不依赖，可并行执行
+
+        依赖于 scope 外未完成任务、阻塞任务、悬空引用或处于循环中的任务无法调度，
+        连同其下游一起放入第二个返回值。
+        """
+        scope = self.open_tasks() if scope is None else scope
+        in_scope = set(scope)
+        unresolved = {tid for tid, _ in self.dangling} | {tid for tid, _, _ in self.ambiguous}
+        pending_deps: dict[str, int] = {}
+        dependents: dict[str, list[str]] = {tid: [] for tid in scope}
+        blocked: set[str] = set()
+
+        for tid in scope:
+            count = 0
+            for dep in self.deps[tid]:
+                if self.is_done(dep):
+                    continue
+                if dep in in_scope:
+                    count += 1
+                    dependents[dep].append(tid)
+                else:
+                    blocked.add(tid)
+            if tid in unresolved:
+                blocked.add(tid)
+            pending_deps[tid] = count
+
+        waves: list[list[str]] = []
+        current = [tid for tid in scope if pending_deps[tid] == 0 and tid not in blocked]
+        while current:
+            current.sort(key=self._order.__getitem__)
+            waves.append(current)
+            following = []
+            for tid in current:
+                for child in dependents[tid]:
+                    pending_deps[child] -= 1
+                    if pending_deps[child] == 0 and child not in blocked:
+                        following.append(child)
+            current = following
+
+        placed = {tid for wave in waves for tid in wave}
+        unschedulable = [tid for tid in scope if tid not in placed]
+        return waves, unschedulable
+
+    def ready(self, scope: list[str] | None = None) -> list[str]:
+        """依赖均已满足、可立即执行的任务（进行中的排在前面）"""
+        waves, _ = self.waves(scope)
+        if not waves:
+            return []
+        return sorted(
+            waves[0], key=lambda tid: (self.tasks[tid].status != "in_progress", self._order[tid])
+        )
+
+    def critical_path(self, waves: list[list[str]]) -> list[str]:
+        """可调度任务中最长的依赖链（按任务数计）"""
+        length: dict[str, int] = {}
+        prev: dict[str, str | None] = {}
+        for wave in waves:
+            for tid in wave:
+                best, best_dep = 0, None
+                for dep in self.deps[tid]:
+                    if length.get(dep, 0) > best:
+                        best, best_dep = length[dep], dep
+                length[tid], prev[tid] = best + 1, best_dep
+        if not length:
+            return []
+        node: str | None = max(length, key=lambda tid: (length[tid], -self._order[tid]))
+        path = []
+        while node is not None:
+            path.append(node)
+            node = prev[node]
+        return path[::-1]
+
+    def partition(self, waves: list[list[str]], workers: int) -> list[list[str]]:
+        """把可调度任务拆成最多 workers 个互不依赖的范围
+
+        以依赖边（及同一数字编号的子任务）连通的任务为一组，组间没有依赖，
+        按任务数从大到小分配给当前负载最小的 worker。worker 内按波次 + 编号排序。
+        """
+        wave_of = {tid: i for i, wave in enumerate(waves) for tid in wave}
+        parent = {tid: tid for tid in wave_of}
+
+        def find(tid: str) -> str:
+            while parent[tid] != tid:
+                parent[tid] = parent[parent[tid]]
+                tid = parent[tid]
+            return tid
+
+        def union(a: str, b: str) -> None:
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[rb] = ra
+
+        # --task 按数字编号选择任务，同一数字编号（含子任务）必须落在同一 worker
+        by_number: dict[int, str] = {}
+        for tid in wave_of:
+            for dep in self.deps[tid]:
+                if dep in wave_of:
+                    union(tid, dep)
+            number = task_number(tid)
+            if number is not None:
+                if number[0] in by_number:
+                    union(tid, by_number[number[0]])
+                else:
+                    by_number[number[0]] = tid
+
+        groups: dict[str, list[str]] = {}
+        for tid in wave_of:
+            groups.setdefault(find(tid), []).append(tid)
+        ordered = sorted(groups.values(), key=lambda g: (-len(g), min(self._order[t] for t in g)))
+
+        scopes: list[list[str]] = [[] for _ in range(max(1, workers))]
+        for group in ordered:
+            min(scopes, key=len).extend(group)
+        return [
+            sorted(scope, key=lambda tid: (wave_of[tid], self._order[tid]))
+            for scope in scopes
+            if scope
+        ]
+
+
+def build_graph(tasks: list[Task]) -> TaskGraph:
+    """由任务列表构建依赖图"""
+    by_id: dict[str, Task] = {}
+    by_key: dict[str, list[str]] = {}
+    for task in tasks:
+        by_id.setdefault(task.id, task)
+    order = {tid: i for i, tid in enumerate(by_id)}
+    sub_ids: dict[str, list[str]] = {}  # 主任务编号 → 子任务编号（AU-03 → AU-03-a, AU-03-b）
+    for tid in by_id:
+        by_key.setdefault(tid.casefold(), []).append(tid)
+        number = task_number(tid)
+        if number is not None:
+            by_key.setdefault(f"{number[0]}{number[1]}", []).append(tid)
+            if number[1]:
+                sub_ids.setdefault(tid[: -len(number[1])].rstrip("-"), []).append(tid)
+
+    # 拆分任务 → 子任务
+    subtasks = {
+        tid: sub_ids.get(tid, []) for tid, task in by_id.items() if task.status == "split"
+    }
+
+    graph = TaskGraph(tasks=by_id, deps={}, subtasks=subtasks, _order=order)
+    for tid, task in by_id.items():
+        resolved: list[str] = []
+        for dep in task.deps:
+            candidates = by_key.get(dep.casefold())
+            if not candidates:
+                number = task_number(dep)
+                candidates = by_key.get(f"{number[0]}{number[1]}") if number else None
+            if not candidates:
+                graph.dangling.append((tid, dep))
+                continue
+            if len(set(candidates)) > 1:
+                graph.ambiguous.append((tid, dep, tuple(candidates)))
+                continue
+            target = candidates[0]
+            resolved.extend(s for s in subtasks.get(target) or [target] if s != tid)
+        graph.deps[tid] = tuple(dict.fromkeys(resolved))
+    return graph
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="结构化工作流 - 任务依赖图校验与调度（输出 JSON）",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--path", required=True, help="目标项目根目录路径")
+    parser.add_argument("--parallel", type=int, default=1, help="拆分的 worker 数（默认 1）")
+    args = parser.parse_args()
+
+    project_root = Path(args.path).resolve()
+    workflow_path = project_root / "docs" / "workflow" / "workflow.json"
+    workflow = {}
+    if workflow_path.exists():
+        with open(workflow_path, encoding="utf-8") as f:
+            workflow = json.load(f)
+    status_path = find_status_path(project_root, workflow)
+    if not status_path.exists():
+        print(f"错误: 未找到状态文件: {status_path}", file=sys.stderr)
+        sys.exit(1)
+
+    graph = build_graph(load_task_status(status_path, cache_path_for(project_root)).tasks)
+    waves, unschedulable = graph.waves()
+    output = {
+        "cycles": graph.cycles(),
+        "dangling": [{"task": tid, "dep": dep} for tid, dep in graph.dangling],
+        "ambiguous": [
+            {"task": tid, "dep": dep, "candidates": list(c)} for tid, dep, c in graph.ambiguous
+        ],
+        "ready": graph.ready(),
+        "waves": waves,
+        "critical_path": graph.critical_path(waves),
+        "unschedulable": unschedulable,
+        "workers": graph.partition(waves, args.parallel),
+    }
+    json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    sys.exit(1 if output["cycles"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""结构化工作流 - TASK_STATUS.md 解析模块
+
+以流式方式逐行解析 TASK_STATUS.md，产出类型化的状态模型（任务、依赖、进度总览、章节偏移），
+供 setup_autoexec.py 等脚本共用。
+
+TASK_STATUS.md 会随着每次 /task-exec 追加交接记录而持续增长，但脚本需要的信息都在文件前部：
+- 「任务状态」表解析完成后，只再识别 `## ` 章节标题（记录决策日志等章节的字节偏移）
+- 遇到「交接记录」章节标题立即停止扫描，交接记录正文不读入
+
+解析结果缓存在项目的 `.claude/task_status.cache.local.json`，以文件大小 + mtime + 已扫描前缀的
+哈希为键：大小与 mtime 未变时直接返回缓存；仅在交接记录末尾追加内容时，前缀哈希不变，也无需重新解析。
+
+用法（调试 / 查看解析结果）:
+    uv run task_status.py --path <project-root> [--no-cache]
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+# 任务状态 emoji 到语义的映射（⏸️ 须排在 ⏸ 之前，优先匹配带变体选择符的版本）
+STATUS_EMOJIS = {
+    "⬜": "pending",
+    "🔄": "in_progress",
+    "✅": "completed",
+    "⏸️": "blocked",
+    "⏸": "blocked",  # 无变体选择符的版本
+    "❌": "cancelled",
+    "🔀": "split",
+}
+
+# 仍需执行的状态（⬜ / 🔄）
+OPEN_STATUSES = frozenset({"pending", "in_progress"})
+
+# 任务状态表的列名 → 字段名；表头缺列时按默认顺序 | 编号 | 标题 | 阶段 | 状态 | 依赖 | 取值
+TASK_COLUMNS = {"编号": "id", "标题": "title", "阶段": "phase", "状态": "status", "依赖": "deps"}
+DEFAULT_COLUMN_ORDER = ("id", "title", "phase", "status", "deps")
+
+# 依赖单元格中表示"无依赖"的写法
+NO_DEPS = {"", "无", "-", "—", "–", "n/a", "N/A", "none"}
+
+HANDOFF_SECTION = "交接记录"
+DECISION_SECTION = "决策日志"
+OVERVIEW_SECTION = "进度总览"
+
+CACHE_FILE = "task_status.cache.local.json"
+# 解析逻辑或模型字段变化时递增，使旧缓存失效
+CACHE_VERSION = 2
+
+_PHASE_RE = re.compile(r"Phase\s*(\d+)", re.IGNORECASE)
+_DEPS_SPLIT_RE = re.compile(r"[,，、;；\s]+")
+# 任务编号：可选前缀（AU-、01- 等）+ 数字编号 + 可选子任务后缀（-a / a）
+_TASK_NUMBER_RE = re.compile(r"^(?:(?P<prefix>.+?)-)?(?P<num>\d+)(?:-?(?P<sub>[a-zA-Z]))?$")
+
+
+@dataclass(slots=True)
+class Task:
+    """任务状态表中的一行（视为只读；未用 frozen 以降低大表的构造开销）"""
+
+    id: str
+    title: str
+    phase: int  # 从"阶段"列提取的 Phase 编号，无法识别时为 -1
+    phase_label: str
+    status: str  # STATUS_EMOJIS 中的语义值，无法识别时为 "unknown"
+    deps: tuple[str, ...]  # 依赖列中的原始编号（未做前缀归一化）
+    line: int  # 在文件中的行号（从 1 开始）
+
+
+@dataclass(frozen=True)
+class OverviewRow:
+    """进度总览表中的一行（含"合计"行）"""
+
+    label: str
+    total: int
+    completed: int
+    in_progress: int
+    pending: int
+
+
+@dataclass(frozen=True)
+class Section:
+    """`## ` 级章节的位置（字节偏移，可直接 seek）
+
+    end 为下一个章节标题的偏移；扫描在该章节内停止时为 None。
+    """
+
+    title: str
+    offset: int
+    line: int
+    end: int | None = None
+
+
+@dataclass
+class TaskStatus:
+    """TASK_STATUS.md 的解析结果"""
+
+    tasks: list[Task] = field(default_factory=list)
+    overview: list[OverviewRow] = field(default_factory=list)
+    sections: list[Section] = field(default_factory=list)
+    scanned_bytes: int = 0  # 已扫描的前缀长度；停在交接记录标题时即该标题的偏移
+    stopped_at: str = ""  # 提前停止时所在行的原文（用于校验缓存），扫描到文件末尾时为空
+
+    def section(self, title: str) -> Section | None:
+        """按标题查找章节（标题包含 title 即视为匹配）"""
+        for sec in self.sections:
+            if title in sec.title:
+                return sec
+        return None
+
+    @property
+    def decision_log(self) -> Section | None:
+        return self.section(DECISION_SECTION)
+
+    @property
+    def handoff(self) -> Section | None:
+        return self.section(HANDOFF_SECTION)
+
+    def counts(self) -> dict[str, int]:
+        """按状态统计任务数"""
+        result: dict[str, int] = {}
+        for task in self.tasks:
+            result[task.status] = result.get(task.status, 0) + 1
+        return result
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class TaskIndex:
+    """任务索引：一次遍历建立按阶段、状态、数字编号的查找表
+
+    数字编号取自 task_number()，子任务（XX-a）与主任务共享同一数字编号。
+    """
+
+    def __init__(self, tasks: list[Task]):
+        self.tasks = tasks
+        self.by_id: dict[str, Task] = {}
+        self.by_status: dict[str, list[Task]] = {}
+        self.by_number: dict[int, list[Task]] = {}
+        self.open_by_phase: dict[int, list[Task]] = {}
+        self.open_by_number: dict[int, list[Task]] = {}
+        self.first_open_phase: int | None = None
+
+        for task in tasks:
+            self.by_id.setdefault(task.id, task)
+            self.by_status.setdefault(task.status, []).append(task)
+            number = task_number(task.id)
+            if number is not None:
+                self.by_number.setdefault(number[0], []).append(task)
+            if task.status in OPEN_STATUSES:
+                self.open_by_phase.setdefault(task.phase, []).append(task)
+                if number is not None:
+                    self.open_by_number.setdefault(number[0], []).append(task)
+                if task.phase >= 0 and (
+                    self.first_open_phase is None or task.phase < self.first_open_phase
+                ):
+                    self.first_open_phase = task.phase
+        self.numbers = sorted(self.by_number)
+
+    def count(self, status: str) -> int:
+        return len(self.by_status.get(status, ()))
+
+    def current_phase(self, phase_count: int) -> int:
+        """第一个仍有待执行任务的阶段编号；都已完成时返回最后一个阶段"""
+        first = self.first_open_phase
+        if first is not None and first < phase_count:
+            return first
+        return phase_count - 1 if phase_count else 0
+
+    def numbers_in_range(self, start: int, end: int) -> list[int]:
+        """[start, end] 内实际存在的数字编号（二分查找）"""
+        lo = bisect.bisect_left(self.numbers, start)
+        hi = bisect.bisect_right(self.numbers, end)
+        return self.numbers[lo:hi]
+
+    def ids_in_range(self, start: int, end: int) -> list[str]:
+        """数字编号在 [start, end] 内的任务编号（含子任务）"""
+        return [t.id for n in self.numbers_in_range(start, end) for t in self.by_number[n]]
+
+    def remaining(
+        self,
+        phases: list[int] | None = None,
+        numbers: list[int] | None = None,
+        ids: list[str] | None = None,
+    ) -> list[Task]:
+        """范围内 ⬜/🔄 的任务（按文件顺序）
+
+        ids 不为 None 时按完整编号精确选择（不含同编号的其他子任务），忽略 numbers 与 phases；
+        numbers 不为 None 时按数字编号选择（含子任务），忽略 phases；
+        都为 None 时返回所有阶段的任务。
+        """
+        if ids is not None:
+            selected = [
+                t for tid in dict.fromkeys(ids)
+                if (t := self.by_id.get(tid)) is not None and t.status in OPEN_STATUSES
+            ]
+        elif numbers is not None:
+            selected = [t for n in numbers for t in self.open_by_number.get(n, ())]
+        elif phases is not None:
+            selected = [t for p in phases for t in self.open_by_phase.get(p, ())]
+        else:
+            selected = [t for tasks in self.open_by_phase.values() for t in tasks]
+        selected.sort(key=lambda t: t.line)
+        return selected
+
+
+# ── 解析 ──
+
+
+def parse_status(text: str) -> str:
+    """将状态单元格中的 emoji 映射为语义值"""
+    for emoji, semantic in STATUS_EMOJIS.items():
+        if emoji in text:
+            return semantic
+    return "unknown"
+
+
+def parse_deps(text: str) -> tuple[str, ...]:
+    """解析依赖单元格：'01, 02' → ('01', '02')，'无' → ()"""
+    if text in NO_DEPS:
+        return ()
+    return tuple(
+        dep for dep in _DEPS_SPLIT_RE.split(text.strip()) if dep and dep not in NO_DEPS
+    )
+
+
+@lru_cache(maxsize=None)
+def task_number(task_id: str) -> tuple[int, str] | None:
+    """提取编号中的数字部分与子任务后缀：'AU-03-a' → (3, 'a')，'07' → (7, '')，无法识别时为 None"""
+    match = _TASK_NUMBER_RE.match(task_id.strip())
+    if not match:
+        return None
+    return int(match.group("num")), (match.group("sub") or "").lower()
+
+
+def _split_row(line: str) -> list[str]:
+    """将 `| a | b |` 拆为单元格列表（去掉首尾竖线）"""
+    body = line.strip()
+    if body.startswith("|"):
+        body = body[1:]
+    if body.endswith("|"):
+        body = body[:-1]
+    return [cell.strip() for cell in body.split("|")]
+
+
+def _is_separator(cells: list[str]) -> bool:
+    if not cells[0].startswith(("-", ":")):
+        return False
+    return all(cell and set(cell) <= set("-: ") for cell in cells)
+
+
+def _to_int(cell: str) -> int:
+    digits = cell.strip("* ")
+    return int(digits) if digits.isdigit() else 0
+
+
+def parse_lines(lines: Iterable[bytes]) -> TaskStatus:
+    """从按行迭代的字节流解析 TASK_STATUS.md
+
+    遇到「交接记录」章节标题即停止，不再消费后续行。
+    """
+    result = TaskStatus()
+    offset = 0
+    current: str = ""  # 当前所在 `## ` 章节标题
+    # 任务表列索引（按 DEFAULT_COLUMN_ORDER）；非 None 表示正处于任务表内
+    columns: tuple[int, ...] | None = None
+    width = 0
+    task_table_done = False
+    # 阶段 / 状态单元格的取值种类很少，按原文缓存映射结果
+    phase_of: dict[str, int] = {}
+    status_of: dict[str, str] = {}
+
+    for lineno, raw in enumerate(lines, start=1):
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+        if line.startswith("## "):
+            title = line[3:].strip()
+            if result.sections:
+                result.sections[-1] = replace(result.sections[-1], end=offset)
+            result.sections.append(Section(title=title, offset=offset, line=lineno))
+            current = title
+            if columns is not None:
+                columns, task_table_done = None, True
+            if HANDOFF_SECTION in title:
+                result.stopped_at = line
+                result.scanned_bytes = offset
+                return result
+            offset += len(raw)
+            continue
+
+        offset += len(raw)
+        if task_table_done or not line.startswith("|"):
+            if columns is not None and line.strip():
+                # 任务表之后的第一个非表格行：表格结束
+                columns, task_table_done = None, True
+            continue
+
+        if columns is None:
+            cells = _split_row(line)
+            if "编号" in cells and "状态" in cells:
+                found = {TASK_COLUMNS[c]: i for i, c in enumerate(cells) if c in TASK_COLUMNS}
+                # 行以竖线开头，split("|") 后第 i 列位于下标 i + 1
+                columns = tuple(
+                    found.get(name, i) + 1 for i, name in enumerate(DEFAULT_COLUMN_ORDER)
+                )
+                width = max(columns) + 1
+            elif OVERVIEW_SECTION in current and len(cells) >= 5:
+                if cells[0] != "阶段" and not _is_separator(cells):
+                    result.overview.append(
+                        OverviewRow(
+                            label=cells[0].strip("* "),
+                            total=_to_int(cells[1]),
+                            completed=_to_int(cells[2]),
+                            in_progress=_to_int(cells[3]),
+                            pending=_to_int(cells[4]),
+                        )
+                    )
+            continue
+
+        # 任务行：表格可能很长，只 strip 用到的列
+        cells = line.split("|")
+        if len(cells) < width:
+            cells.extend([""] * (width - len(cells)))
+        id_col, title_col, phase_col, status_col, deps_col = columns
+
+        task_id = cells[id_col].strip()
+        if not task_id or task_id.startswith(("-", ":")):  # 分隔行或空行
+            continue
+        phase_label = cells[phase_col].strip()
+        phase = phase_of.get(phase_label)
+        if phase is None:
+            phase_match = _PHASE_RE.search(phase_label)
+            phase = phase_of[phase_label] = int(phase_match.group(1)) if phase_match else -1
+        status_cell = cells[status_col].strip()
+        status = status_of.get(status_cell)
+        if status is None:
+            status = status_of[status_cell] = parse_status(status_cell)
+        result.tasks.append(
+            Task(
+                id=task_id,
+                title=cells[title_col].strip(),
+                phase=phase,
+                phase_label=phase_label,
+                status=status,
+                deps=parse_deps(cells[deps_col].strip()),
+                line=lineno,
+            )
+        )
+
+    result.scanned_bytes = offset
+    return result
+
+
+def parse_text(content: str) -> TaskStatus:
+    """解析内存中的 TASK_STATUS.md 文本"""
+    return parse_lines(content.encode("utf-8").splitlines(keepends=True))
+
+
+def parse_file(path: Path) -> TaskStatus:
+    """流式解析文件，交接记录部分不会被读入"""
+    with open(path, "rb") as f:
+        return parse_lines(f)
+
+
+# ── 缓存 ──
+
+
+def _prefix_digest(path: Path, length: int) -> str:
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(remaining, 1 << 16))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _status_to_cache(status: TaskStatus) -> dict:
+    """缓存中任务按行数组存储（比逐字段的对象小且反序列化快）"""
+    return {
+        "tasks": [
+            [t.id, t.title, t.phase, t.phase_label, t.status, t.deps, t.line] for t in status.tasks
+        ],
+        "overview": [asdict(r) for r in status.overview],
+        "sections": [asdict(s) for s in status.sections],
+        "scanned_bytes": status.scanned_bytes,
+        "stopped_at": status.stopped_at,
+    }
+
+
+def _status_from_cache(data: dict) -> TaskStatus:
+    return TaskStatus(
+        tasks=[Task(i, title, ph, label, st, tuple(deps), ln)
+               for i, title, ph, label, st, deps, ln in data["tasks"]],
+        overview=[OverviewRow(**r) for r in data["overview"]],
+        sections=[Section(**s) for s in data["sections"]],
+        scanned_bytes=data["scanned_bytes"],
+        stopped_at=data["stopped_at"],
+    )
+
+
+def _prefix_still_valid(path: Path, entry: dict, size: int) -> bool:
+    """文件 stat 变化后，判断已扫描前缀是否仍与缓存一致（只读前缀 + 停止行）"""
+    scanned = entry["status"]["scanned_bytes"]
+    stopped_at = entry["status"]["stopped_at"]
+    if not stopped_at:
+        # 上次扫描到了文件末尾：大小变化意味着有未解析的新内容
+        return size == scanned and _prefix_digest(path, scanned) == entry["digest"]
+    if size < scanned or _prefix_digest(path, scanned) != entry["digest"]:
+        return False
+    with open(path, "rb") as f:
+        f.seek(scanned)
+        return f.readline().decode("utf-8", errors="replace").rstrip("\r\n") == stopped_at
+
+
+def _read_cache(cache_path: Path) -> dict:
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("entries", {})
+
+
+def _write_cache(cache_path: Path, entries: dict) -> None:
+    """原子写入缓存；写入失败（只读目录等）时静默跳过，不影响解析结果"""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+
+def load_task_status(path: Path, cache_path: Path | None = None) -> TaskStatus:
+    """加载并解析 TASK_STATUS.md，cache_path 为 None 时不使用缓存
+
+    - 大小与 mtime 均未变化：直接返回缓存结果，不读取文件
+    - 已变化但已扫描前缀的哈希未变（如只追加了交接记录）：刷新 stat 后返回缓存结果
+    - 否则重新流式解析并写回缓存
+    """
+    path = Path(path)
+    if cache_path is None:
+        return parse_file(path)
+
+    stat = path.stat()
+    key = str(path.resolve())
+    entries = _read_cache(cache_path)
+    entry = entries.get(key)
+
+    if entry is not None:
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return _status_from_cache(entry["status"])
+        if _prefix_still_valid(path, entry, stat.st_size):
+            entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            _write_cache(cache_path, entries)
+            return _status_from_cache(entry["status"])
+
+    status = parse_file(path)
+    entries[key] = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "digest": _prefix_digest(path, status.scanned_bytes),
+        "status": _status_to_cache(status),
+    }
+    _write_cache(cache_path, entries)
+    return status
+
+
+def cache_path_for(project_root: Path) -> Path:
+    """项目内的解析缓存路径（与 ralph-loop 状态文件同在 .claude/ 下）"""
+    return project_root / ".claude" / CACHE_FILE
+
+
+def read_section(path: Path, section: Section) -> str:
+    """按偏移读取某个章节的原文（不含后续章节）"""
+    with open(path, "rb") as f:
+        f.seek(section.offset)
+        data = f.read() if section.end is None else f.read(section.end - section.offset)
+    return data.decode("utf-8", errors="replace")
+
+
+def find_status_path(project_root: Path, workflow: dict) -> Path:
+    """定位 TASK_STATUS.md（workflow.json 中的 stateFiles.status，旧路径回退）"""
+    status_rel = workflow.get("stateFiles", {}).get("status", "docs/workflow/TASK_STATUS.md")
+    status_path = project_root / status_rel
+    if not status_path.exists():
+        old_path = project_root / "docs" / "TASK_STATUS.md"
+        if old_path.exists():
+            status_path = old_path
+    return status_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="结构化工作流 - 解析 TASK_STATUS.md 并输出 JSON",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--path", required=True, help="目标项目根目录路径")
+    parser.add_argument("--no-cache", action="store_true", help="忽略并且不写入解析缓存")
+    args = parser.parse_args()
+
+    project_root = Path(args.path).resolve()
+    workflow_path = project_root / "docs" / "workflow" / "workflow.json"
+    workflow = {}
+    if workflow_path.exists():
+        with open(workflow_path, encoding="utf-8") as f:
+            workflow = json.load(f)
+    status_path = find_status_path(project_root, workflow)
+    if not status_path.exists():
+        print(f"错误: 未找到状态文件: {status_path}", file=sys.stderr)
+        sys.exit(1)
+
+    cache = None if args.no_cache else cache_path_for(project_root)
+    status = load_task_status(status_path, cache)
+    output = status.to_dict()
+    output["counts"] = status.counts()
+    json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
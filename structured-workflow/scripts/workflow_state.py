@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""结构化工作流 - 结构化状态存储
+
+在 docs/workflow/state.json 中以 JSON 保存任务状态（按编号索引），脚本直接读取，无需解析 Markdown。
+TASK_STATUS.md 仍是给人看的文档，两者通过两个步骤保持一致：
+
+- render：由状态存储重新生成 TASK_STATUS.md 的「进度总览」与「任务状态」两张表（惰性：
+  生成结果与文件一致时不写文件）；其余章节（已知问题、决策日志、交接记录）原样保留
+- reconcile：把对 TASK_STATUS.md 两张表的手动修改导入状态存储；进度总览因此过期时存储保持
+  待渲染，下次 render / sync 重新生成
+
+每次同步都会记录 TASK_STATUS.md 的大小、mtime、任务表摘要以及当时的任务表（base），
+据此判断哪一侧有未同步的修改。两侧同时有修改时，render / reconcile 默认拒绝执行，需加 --force
+选择以哪一侧为准；sync 以 base 为基准逐任务合并两侧修改，同一任务两侧改得不同时拒绝执行。
+
+用法:
+    uv run workflow_state.py <command> --path <project-root> [options]
+
+命令:
+    show                             输出状态存储（JSON）
+    get <task>                       查询单个任务（编号或数字编号，如 AU-03 / 3）
+    set <task> --status <status>     修改任务状态（pending/in_progress/completed/blocked/cancelled/split
+                                     或对应 emoji），加 --render 立即重新生成表格
+    render [--force]                 由状态存储重新生成 TASK_STATUS.md 的两张表
+    reconcile [--force]              把 TASK_STATUS.md 的手动修改导入状态存储
+    sync                             按需执行 reconcile 或 render，两侧都有修改时逐任务合并
+                                     （脚本读取前调用）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from task_status import (
+    OVERVIEW_SECTION,
+    STATUS_EMOJIS,
+    Task,
+    cache_path_for,
+    find_status_path,
+    load_task_status,
+    parse_status,
+    task_number,
+)
+
+STATE_VERSION = 1
+DEFAULT_STATE_FILE = "docs/workflow/state.json"
+TASK_SECTION = "任务状态"
+
+# 渲染任务状态表时使用的状态单元格文本（与 TASK_STATUS.md 模板的状态图例一致）
+STATUS_CELLS = {
+    "pending": "⬜ 待开始",
+    "in_progress": "🔄 进行中",
+    "completed": "✅ 已完成",
+    "blocked": "⏸️ 暂停",
+    "cancelled": "❌ 已取消",
+    "split": "🔀 已拆分",
+}
+
+OVERVIEW_HEADER = ["| 阶段 | 总数 | 完成 | 进行中 | 待开始 |", "|------|------|------|--------|--------|"]
+TASK_HEADER = ["| 编号 | 标题 | 阶段 | 状态 | 依赖 |", "|------|------|------|------|------|"]
+
+
+@dataclass
+class WorkflowState:
+    """state.json 的内存表示；tasks 以编号为键，保持任务表中的顺序"""
+
+    path: Path
+    tasks: dict[str, dict] = field(default_factory=dict)
+    revision: int = 0  # 每次修改存储时递增
+    sync: dict = field(default_factory=dict)  # 上次 render / reconcile 时的同步记录
+    base: dict[str, dict] = field(default_factory=dict)  # 上次同步时的任务表（合并基准）
+
+    def task_list(self) -> list[Task]:
+        """以 task_status.Task 形式返回（line 为任务在表中的序号）"""
+        return [
+            Task(
+                id=tid,
+                title=t["title"],
+                phase=t["phase"],
+                phase_label=t["phaseLabel"],
+                status=t["status"],
+                deps=tuple(t["deps"]),
+                line=i,
+            )
+            for i, (tid, t) in enumerate(self.tasks.items(), start=1)
+        ]
+
+    def resolve(self, ref: str) -> str | None:
+        """按完整编号查找（O(1)），找不到时按数字编号匹配唯一任务"""
+        if ref in self.tasks:
+            return ref
+        number = task_number(ref)
+        if number is None:
+            return None
+        matches = [tid for tid in self.tasks if task_number(tid) == number]
+        return matches[0] if len(matches) == 1 else None
+
+    def dirty(self) -> bool:
+        """存储自上次同步后是否有未渲染的修改"""
+        return self.revision != self.sync.get("revision")
+
+    def save(self) -> None:
+        data = {
+            "version": STATE_VERSION,
+            "revision": self.revision,
+            "updatedAt": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "sync": self.sync,
+            "tasks": self.tasks,
+            "base": self.base,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+
+
+def state_path_for(project_root: Path, workflow: dict) -> Path:
+    return project_root / workflow.get("stateFiles", {}).get("state", DEFAULT_STATE_FILE)
+
+
+def load_state(path: Path) -> WorkflowState:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != STATE_VERSION:
+        print(f"错误: 不支持的 state.json 版本: {data.get('version')}", file=sys.stderr)
+        sys.exit(1)
+    return WorkflowState(
+        path=path, tasks=data.get("tasks", {}), revision=data.get("revision", 0),
+        sync=data.get("sync", {}), base=data.get("base", {}),
+    )
+
+
+def _task_record(task: Task) -> dict:
+    return {
+        "title": task.title,
+        "phase": task.phase,
+        "phaseLabel": task.phase_label,
+        "status": task.status,
+        "deps": list(task.deps),
+    }
+
+
+def tables_digest(tasks: list[Task]) -> str:
+    """任务表内容摘要（不含行号），用于判断 Markdown 侧是否被手动修改"""
+    rows = [[t.id, t.title, t.phase_label, t.status, list(t.deps)] for t in tasks]
+    return hashlib.sha256(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _markdown_stat(status_path: Path) -> dict:
+    stat = status_path.stat()
+    return {"size": stat.st_size, "mtimeNs": stat.st_mtime_ns}
+
+
+def markdown_edited(state: WorkflowState, status_path: Path, project_root: Path) -> list[Task] | None:
+    """TASK_STATUS.md 的任务表自上次同步后被手动修改时返回解析出的任务，否则返回 None
+
+    大小与 mtime 未变时不读取文件；变化时借助 task_status 的解析缓存比较任务表摘要。
+    """
+    if not status_path.exists():
+        return None
+    if _markdown_stat(status_path) == {k: state.sync.get(k) for k in ("size", "mtimeNs")}:
+        return None
+    tasks = load_task_status(status_path, cache_path_for(project_root)).tasks
+    if tables_digest(tasks) == state.sync.get("tablesDigest"):
+        return None
+    return tasks
+
+
+def _record_sync(state: WorkflowState, status_path: Path, rendered: bool = True) -> None:
+    """记录同步点；rendered=False 时 Markdown 中的派生内容与存储不一致，存储保持 dirty 待渲染"""
+    state.sync = {
+        "revision": state.revision if rendered else None,
+        **_markdown_stat(status_path),
+        "tablesDigest": tables_digest(state.task_list()),
+    }
+    state.base = json.loads(json.dumps(state.tasks))
+
+
+def describe_changes(old: dict[str, dict], new: dict[str, dict]) -> list[str]:
+    """两份任务表之间的差异说明（+ 新增 / ~ 修改 / - 删除）"""
+    changes = []
+    for tid, record in new.items():
+        prev = old.get(tid)
+        if prev is None:
+            changes.append(f"+ {tid} {record['title']}")
+            continue
+        for key in ("status", "title", "phaseLabel", "deps"):
+            if prev.get(key) != record[key]:
+                changes.append(f"~ {tid} {key}: {prev.get(key)} → {record[key]}")
+    changes.extend(f"- {tid} {prev['title']}" for tid, prev in old.items() if tid not in new)
+    return changes
+
+
+def merge(state: WorkflowState, tasks: list[Task]) -> tuple[dict[str, dict], list[str]]:
+    """以 base 为基准逐任务三方合并状态存储与 Markdown 任务表，返回 (合并结果, 冲突任务)
+
+    只有一侧改动的任务取改动的一侧；两侧改成相同结果的直接采用；两侧改得不同的记为冲突。
+    顺序沿用 Markdown 任务表，只在状态存储中新增的任务排在末尾。
+    """
+    theirs = {t.id: _task_record(t) for t in tasks}
+    merged: dict[str, dict] = {}
+    conflicts = []
+    for tid in dict.fromkeys([*theirs, *state.tasks]):
+        base, ours, other = state.base.get(tid), state.tasks.get(tid), theirs.get(tid)
+        if other == ours or other == base:
+            value = ours
+        elif ours == base:
+            value = other
+        else:
+            conflicts.append(tid)
+            continue
+        if value is not None:
+            merged[tid] = value
+    return merged, conflicts
+
+
+# ── reconcile ──
+
+
+def reconcile(
+    state: WorkflowState, tasks: list[Task], status_path: Path, phases: list[dict]
+) -> list[str]:
+    """用 Markdown 任务表覆盖状态存储，返回变更说明
+
+    进度总览等派生内容不会随手动修改更新：重新渲染会改变文件时存储保持 dirty，
+    下次 sync / render 时重新生成。
+    """
+    imported = {t.id: _task_record(t) for t in tasks}
+    changes = describe_changes(state.tasks, imported)
+
+    if changes:
+        state.tasks = imported
+        state.revision += 1
+    content, rendered = render_content(state, status_path, phases)
+    _record_sync(state, status_path, rendered=rendered == content)
+    state.save()
+    return changes
+
+
+# ── render ──
+
+
+def _phase_labels(state: WorkflowState, phases: list[dict]) -> dict[int, str]:
+    labels = {i: phase.get("name") or f"Phase {i}" for i, phase in enumerate(phases)}
+    for task in state.tasks.values():
+        labels.setdefault(task["phase"], task["phaseLabel"] or "未分阶段")
+    return labels
+
+
+def render_overview(state: WorkflowState, phases: list[dict]) -> list[str]:
+    """进度总览表：按阶段统计总数（不含已拆分的父任务）/ 完成 / 进行中 / 待开始"""
+    counts: dict[int, list[int]] = {}
+    for task in state.tasks.values():
+        if task["status"] == "split":
+            continue
+        row = counts.setdefault(task["phase"], [0, 0, 0, 0])
+        row[0] += 1
+        if task["status"] == "completed":
+            row[1] += 1
+        elif task["status"] == "in_progress":
+            row[2] += 1
+        elif task["status"] == "pending":
+            row[3] += 1
+
+    labels = _phase_labels(state, phases)
+    lines = list(OVERVIEW_HEADER)
+    total = [0, 0, 0, 0]
+    for phase in sorted(set(labels) | set(counts), key=lambda p: (p < 0, p)):
+        row = counts.get(phase, [0, 0, 0, 0])
+        total = [a + b for a, b in zip(total, row)]
+        lines.append(f"| {labels.get(phase, f'Phase {phase}')} | " + " | ".join(map(str, row)) + " |")
+    lines.append("| **合计** | " + " | ".join(f"**{n}**" for n in total) + " |")
+    return lines
+
+
+def render_task_table(state: WorkflowState) -> list[str]:
+    lines = list(TASK_HEADER)
+    for tid, task in state.tasks.items():
+        deps = ", ".join(task["deps"]) or "无"
+        status = STATUS_CELLS.get(task["status"], task["status"])
+        lines.append(f"| {tid} | {task['title']} | {task['phaseLabel']} | {status} | {deps} |")
+    return lines
+
+
+def _replace_table(lines: list[str], heading: str, table: list[str]) -> bool:
+    """替换 heading 章节下的第一张表（连续的 `|` 行），章节不存在时返回 False"""
+    start = next(
+        (i for i, line in enumerate(lines) if line.startswith("## ") and heading in line), None
+    )
+    if start is None:
+        return False
+    i = start + 1
+    while i < len(lines) and not lines[i].startswith("|") and not lines[i].startswith("## "):
+        i += 1
+    if i < len(lines) and lines[i].startswith("|"):
+        end = i
+        while end < len(lines) and lines[end].startswith("|"):
+            end += 1
+        lines[i:end] = table
+    else:
+        # 章节下还没有表格：紧跟标题插入
+        lines[start + 1:start + 1] = ["", *table]
+    return True
+
+
+def render_content(state: WorkflowState, status_path: Path, phases: list[dict]) -> tuple[str, str]:
+    """TASK_STATUS.md 的当前内容与重新生成两张表后的内容"""
+    with open(status_path, encoding="utf-8", newline="") as f:
+        content = f.read()
+    newline = "\r\n" if "\r\n" in content else "\n"
+    lines = content.split(newline)
+    for heading, table in (
+        (OVERVIEW_SECTION, render_overview(state, phases)),
+        (TASK_SECTION, render_task_table(state)),
+    ):
+        if not _replace_table(lines, heading, table):
+            print(f"错误: TASK_STATUS.md 中缺少「{heading}」章节，无法渲染", file=sys.stderr)
+            sys.exit(1)
+
+    return content, newline.join(lines)
+
+
+def render(state: WorkflowState, status_path: Path, phases: list[dict]) -> bool:
+    """重新生成两张表并写回 TASK_STATUS.md；内容无变化时不写文件，返回是否写入"""
+    content, rendered = render_content(state, status_path, phases)
+    written = rendered != content
+    if written:
+        tmp_path = status_path.with_name(f"{status_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(rendered)
+        os.replace(tmp_path, status_path)
+    _record_sync(state, status_path)
+    state.save()
+    return written
+
+
+# ── 供其他脚本调用 ──
+
+
+def sync(project_root: Path, workflow: dict, state: WorkflowState | None = None) -> WorkflowState:
+    """读取前的自动同步：Markdown 有手动修改 → reconcile；存储有未渲染修改 → render
+
+    两侧都有修改时逐任务合并后重新渲染；同一任务两侧改得不同时报错退出，不丢弃任何一侧。
+    """
+    state = state or load_state(state_path_for(project_root, workflow))
+    status_path = find_status_path(project_root, workflow)
+    if not status_path.exists():
+        return state
+    edited = markdown_edited(state, status_path, project_root)
+    if edited is not None and state.dirty():
+        merged, conflicts = merge(state, edited)
+        if conflicts:
+            print(
+                f"错误: state.json 与 TASK_STATUS.md 对同一任务有不同的修改: {', '.join(conflicts)}",
+                file=sys.stderr,
+            )
+            print(
+                "提示: 运行 workflow_state.py reconcile --force（以 TASK_STATUS.md 为准）"
+                "或 render --force（以 state.json 为准）",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        imported = describe_changes(state.tasks, merged)
+        state.tasks = merged
+        state.revision += 1
+        render(state, status_path, workflow.get("phases", []))
+        print(f"✓ 已合并 TASK_STATUS.md 的 {len(imported)} 处修改并重新生成表格")
+    elif edited is not None:
+        changes = reconcile(state, edited, status_path, workflow.get("phases", []))
+        if changes:
+            print(f"✓ 已从 TASK_STATUS.md 导入 {len(changes)} 处修改到 {state.path.name}")
+        if state.dirty():
+            render(state, status_path, workflow.get("phases", []))
+    elif state.dirty():
+        render(state, status_path, workflow.get("phases", []))
+    return state
+
+
+def load_tasks(project_root: Path, workflow: dict) -> list[Task] | None:
+    """从状态存储读取任务（读取前自动同步）；项目没有 state.json 时返回 None"""
+    path = state_path_for(project_root, workflow)
+    if not path.exists():
+        return None
+    return sync(project_root, workflow, load_state(path)).task_list()
+
+
+def create_state(
+    path: Path, status_path: Path | None = None, phases: list[dict] | None = None
+) -> WorkflowState:
+    """创建状态存储；status_path 已存在时导入其中的任务表"""
+    state = WorkflowState(path=path)
+    if status_path is not None and status_path.exists():
+        reconcile(state, load_task_status(status_path).tasks, status_path, phases or [])
+    else:
+        state.save()
+    return state
+
+
+# ── 命令行 ──
+
+
+def _parse_status_arg(value: str) -> str:
+    if value in STATUS_CELLS:
+        return value
+    status = parse_status(value)
+    if status == "unknown":
+        choices = ", ".join([*STATUS_CELLS, *STATUS_EMOJIS])
+        print(f"错误: 无效的状态 '{value}'（可选: {choices}）", file=sys.stderr)
+        sys.exit(1)
+    return status
+
+
+def _load_workflow(project_root: Path) -> dict:
+    for path in (
+        project_root / "docs" / "workflow" / "workflow.json",
+        project_root / ".claude" / "workflow.json",
+    ):
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    print("错误: 未找到 workflow.json（工作流未初始化）", file=sys.stderr)
+    sys.exit(1)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="结构化工作流 - 结构化状态存储",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name: str, help_text: str) -> argparse.ArgumentParser:
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--path", required=True, help="目标项目根目录路径")
+        return p
+
+    add("show", "输出状态存储（JSON）")
+    add("get", "查询单个任务").add_argument("task", help="任务编号或数字编号")
+    p = add("set", "修改任务状态")
+    p.add_argument("task", help="任务编号或数字编号")
+    p.add_argument("--status", required=True, help="新状态（语义值或 emoji）")
+    p.add_argument("--render", action="store_true", help="修改后立即重新生成 TASK_STATUS.md 的表格")
+    add("render", "由状态存储重新生成 TASK_STATUS.md 的表格").add_argument(
+        "--force", action="store_true", help="覆盖 TASK_STATUS.md 中未导入的手动修改"
+    )
+    add("reconcile", "把 TASK_STATUS.md 的手动修改导入状态存储").add_argument(
+        "--force", action="store_true", help="丢弃状态存储中未渲染的修改"
+    )
+    add("sync", "按需执行 reconcile 或 render")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    project_root = Path(args.path).resolve()
+    if not project_root.is_dir():
+        print(f"错误: 项目目录不存在: {project_root}", file=sys.stderr)
+        sys.exit(1)
+
+    workflow = _load_workflow(project_root)
+    path = state_path_for(project_root, workflow)
+    status_path = find_status_path(project_root, workflow)
+    if not path.exists():
+        if args.command != "reconcile":
+            print(f"错误: 未找到状态存储: {path}", file=sys.stderr)
+            print("提示: 运行 reconcile 由 TASK_STATUS.md 创建", file=sys.stderr)
+            sys.exit(1)
+        state = WorkflowState(path=path)
+    else:
+        state = load_state(path)
+
+    if args.command == "show":
+        json.dump({"revision": state.revision, "dirty": state.dirty(), "tasks": state.tasks},
+                  sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.command == "get":
+        tid = state.resolve(args.task)
+        if tid is None:
+            print(f"错误: 未找到任务: {args.task}", file=sys.stderr)
+            sys.exit(1)
+        json.dump({"id": tid, **state.tasks[tid]}, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.command == "set":
+        tid = state.resolve(args.task)
+        if tid is None:
+            print(f"错误: 未找到任务: {args.task}", file=sys.stderr)
+            sys.exit(1)
+        status = _parse_status_arg(args.status)
+        if state.tasks[tid]["status"] != status:
+            state.tasks[tid]["status"] = status
+            state.revision += 1
+            state.save()
+        print(f"✓ {tid}: {STATUS_CELLS[status]}")
+        if args.render:
+            if markdown_edited(state, status_path, project_root) is not None:
+                print("⚠ TASK_STATUS.md 有未导入的手动修改，未渲染（先运行 reconcile）")
+            else:
+                render(state, status_path, workflow.get("phases", []))
+                print(f"✓ 已重新生成表格: {status_path}")
+    elif args.command == "render":
+        if not args.force and markdown_edited(state, status_path, project_root) is not None:
+            print("错误: TASK_STATUS.md 有未导入的手动修改", file=sys.stderr)
+            print("提示: 先运行 reconcile 导入（两侧都有修改时运行 sync 合并），"
+                  "或加 --force 以状态存储为准覆盖", file=sys.stderr)
+            sys.exit(1)
+        # 以渲染结果而非 dirty 判断：reconcile 导入的手动修改可能让进度总览过期
+        if render(state, status_path, workflow.get("phases", [])):
+            print(f"✓ 已重新生成表格: {status_path}")
+        else:
+            print("✓ 表格已是最新，无需渲染")
+    elif args.command == "reconcile":
+        if not status_path.exists():
+            print(f"错误: 未找到状态文件: {status_path}", file=sys.stderr)
+            sys.exit(1)
+        if state.dirty() and state.sync and not args.force:
+            print("错误: 状态存储有未渲染到 TASK_STATUS.md 的修改", file=sys.stderr)
+            print("提示: 先运行 render（两侧都有修改时运行 sync 合并），"
+                  "或加 --force 以 TASK_STATUS.md 为准覆盖", file=sys.stderr)
+            sys.exit(1)
+        tasks = load_task_status(status_path, cache_path_for(project_root)).tasks
+        changes = reconcile(state, tasks, status_path, workflow.get("phases", []))
+        for change in changes:
+            print(f"  {change}")
+        print(f"✓ 已导入 {len(changes)} 处修改" if changes else "✓ 无需导入，状态存储已是最新")
+        if state.dirty():
+            print("⚠ 进度总览等表格与任务状态不一致，运行 render 重新生成（sync 时自动生成）")
+    else:
+        sync(project_root, workflow, state)
+        print(f"✓ 已同步（revision {state.revision}）")
+
+
+if __name__ == "__main__":
+    main()